@@ -17,82 +17,595 @@ Usage:
     --facts "wrangler pages deploy dist|project: claude-ecosystem-dashboard|URL: claude-ecosystem-dashboard.pages.dev" \
     --concepts "cloudflare,deployment,dashboard,wrangler"
 
+  python3 claude-mem-bridge.py inject --spool ...           # burst bronnen: via de wachtrij + group commit
+  python3 claude-mem-bridge.py flush                        # wachtrij leegschrijven (cron / na een burst)
   python3 claude-mem-bridge.py search "cloudflare deployment"
+  python3 claude-mem-bridge.py search "wrangler" --archive   # ook het archief doorzoeken
+  python3 claude-mem-bridge.py search --fuzzy "dump_analy"   # substring/typo's via trigram index
+  python3 claude-mem-bridge.py archive --older-than 365      # oude observations naar de cold tier
+  python3 claude-mem-bridge.py search --semantic "dashboard naar cloudflare pages gedeployed met wrangler"
+  python3 claude-mem-bridge.py similar 1234
   python3 claude-mem-bridge.py stats
   python3 claude-mem-bridge.py export --format json
+  python3 claude-mem-bridge.py dedupe
+  python3 claude-mem-bridge.py maintain --budget 10      # cron: FTS merge, ANALYZE, checkpoint, vacuum
+  python3 claude-mem-bridge.py compress --vacuum          # opt-in: grote text/narrative in het archief gecomprimeerd
+  python3 claude-mem-bridge.py bench-semantic --n 100000
+
+Schrijven bij contention: elke connectie heeft een busy_timeout (CLAUDE_MEM_BUSY_TIMEOUT, ms) en
+inserts lopen in BEGIN IMMEDIATE transacties met retry + backoff. `inject --spool` zet de observation
+als bestand in de wachtrij (CLAUDE_MEM_SPOOL); het proces dat de flock krijgt wordt de enige writer
+en schrijft de wachtrij in groepen (max GROUP_ROWS rijen of GROUP_LINGER_MS wachten) weg.
+Lukt een directe inject na alle retries niet, dan gaat hij ook naar de wachtrij — er gaat niets verloren.
+
+Compressie (opt-in via `compress`) geldt alleen voor het archief (CLAUDE_MEM_ARCHIVE), dat de bridge zelf
+beheert: text/narrative vanaf COMPRESS_MIN_CHARS tekens staan daar als zlib/zstd BLOB in text_z/narrative_z
+met lege tekstkolommen, de archief-FTS bevat de platte tekst. De hot tier is van de claude-mem plugin
+(viewer, eigen FTS triggers en 'rebuild') en blijft altijd platte tekst; `archive` comprimeert bij het verplaatsen.
 """
 
 import sqlite3
 import argparse
+import fcntl
+import glob
+import hashlib
 import json
+import re
 import time
 import uuid
 import os
+import random
 import sys
+import zlib
+from array import array
 from datetime import datetime
 
-DB_PATH = os.path.expanduser("~/.claude-mem/claude-mem.db")
+try:
+    import numpy as np  # optioneel: versnelt de similarity scan
+except ImportError:
+    np = None
+
+try:
+    import zstandard  # optioneel: betere compressie dan zlib
+except ImportError:
+    zstandard = None
+
+DB_PATH = os.path.expanduser(os.environ.get("CLAUDE_MEM_DB", "~/.claude-mem/claude-mem.db"))
 
 VALID_TYPES = ['decision', 'bugfix', 'feature', 'refactor', 'discovery', 'change']
 VALID_SOURCES = ['claude-chat', 'claude-cli', 'cowork', 'manual', 'auto-sync']
 
+# ── Schrijfpad bij meerdere injectors ──
+BUSY_TIMEOUT_MS = int(os.environ.get("CLAUDE_MEM_BUSY_TIMEOUT", "5000"))
+WRITE_RETRIES = int(os.environ.get("CLAUDE_MEM_RETRIES", "5"))
+SPOOL_DIR = os.path.expanduser(os.environ.get("CLAUDE_MEM_SPOOL", os.path.join(os.path.dirname(DB_PATH), "bridge-spool")))
+GROUP_ROWS = 200        # Max observations per transactie
+GROUP_LINGER_MS = 50    # Zo lang wachten op meer spool bestanden als de groep nog niet vol is
+
+# ── Cold tier: oude observations in een apart (ATTACHed) archief met eigen FTS index ──
+ARCHIVE_PATH = os.path.expanduser(os.environ.get("CLAUDE_MEM_ARCHIVE", os.path.join(os.path.dirname(DB_PATH), "claude-mem-archive.db")))
+ARCHIVE_BATCH = 1000    # Observations per transactie bij het archiveren
+
+# ── Compressie van grote body-velden (opt-in, instelling in bridge_meta) ──
+COMPRESS_MIN_CHARS = 512
+BODY_FIELDS = ("text", "narrative")
+CODEC_ZLIB, CODEC_ZSTD = b"z", b"s"   # eerste byte van elke BLOB
+
+# ── Trigram index (search --fuzzy): FTS5 trigram tokenizer over title + narrative ──
+FUZZY_CANDIDATES = 200  # Kandidaten uit de index (bm25) die op trigram-overlap herrangschikt worden
+FUZZY_MIN_SCORE = 0.3   # Minimaal aandeel query-trigrams dat in de observation moet voorkomen
+TRIGRAM_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS bridge_trigram USING fts5(
+        title, narrative, content='observations', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS bridge_trigram_ai AFTER INSERT ON observations BEGIN
+        INSERT INTO bridge_trigram(rowid, title, narrative) VALUES (new.id, new.title, new.narrative);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bridge_trigram_ad AFTER DELETE ON observations BEGIN
+        INSERT INTO bridge_trigram(bridge_trigram, rowid, title, narrative) VALUES ('delete', old.id, old.title, old.narrative);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bridge_trigram_au AFTER UPDATE OF title, narrative ON observations BEGIN
+        INSERT INTO bridge_trigram(bridge_trigram, rowid, title, narrative) VALUES ('delete', old.id, old.title, old.narrative);
+        INSERT INTO bridge_trigram(rowid, title, narrative) VALUES (new.id, new.title, new.narrative);
+    END""",
+]
+
+OBSERVATION_COLUMNS = [
+    "memory_session_id", "project", "text", "type", "title", "subtitle", "facts", "narrative", "concepts",
+    "files_read", "files_modified", "prompt_number", "created_at", "created_at_epoch", "discovery_tokens",
+    "content_hash", "text_z", "narrative_z",
+]
+SPOOL_REQUIRED = [c for c in OBSERVATION_COLUMNS if not c.endswith("_z")]  # velden uit build_observation
+SOURCE_TAGS = {
+    'claude-chat': '[CHAT]',
+    'claude-cli': '[CLI]',
+    'cowork': '[COWORK]',
+    'manual': '[MANUAL]',
+    'auto-sync': '[SYNC]'
+}
+
+# ── Similarity index (one-permutation MinHash, 64 bins × uint32 = 256 bytes/observation) ──
+SIG_BINS = 64
+SIG_EMPTY = 0xFFFFFFFF
+TOKEN_RE = re.compile(r"[a-zà-ÿ0-9_]{3,}")
+SOURCE_TAG_RE = re.compile(r"^(\[[A-Z]+\]\s*)+")
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'are', 'was', 'not', 'but', 'have', 'has',
+    'een', 'het', 'van', 'voor', 'met', 'dat', 'die', 'niet', 'ook', 'naar', 'wordt', 'zijn', 'maar',
+}
+
 def get_db():
     if not os.path.exists(DB_PATH):
         print(f"❌ Database niet gevonden: {DB_PATH}")
         sys.exit(1)
-    return sqlite3.connect(DB_PATH)
+    db = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        db.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        with_retry(lambda: ensure_schema(db))
+    except BaseException:
+        db.close()
+        raise
+    return db
 
-def inject(args):
-    """Inject a new observation into claude-mem"""
-    db = get_db()
+def is_locked(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def with_retry(fn, retries=None):
+    """Voer fn uit; bij 'database is locked' opnieuw met exponentiële backoff + jitter"""
+    retries = WRITE_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not is_locked(e) or attempt == retries:
+                raise
+            time.sleep(min(2.0, 0.05 * 2 ** attempt) * (0.5 + random.random()))
+
+def ensure_schema(db):
+    """Voeg bridge-kolommen/indexen toe aan de claude-mem tabel (idempotent)"""
+    def migrated():
+        cols = {row[1] for row in db.execute("PRAGMA table_info(observations)")}
+        return {"content_hash", "text_z", "narrative_z"} <= cols and db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'bridge_meta'").fetchone() is not None
+    if migrated():
+        return
+    # Schrijflock vóór de check: gelijktijdige injectors mogen de kolom niet allebei toevoegen
+    db.execute("BEGIN IMMEDIATE")
+    cols = {row[1] for row in db.execute("PRAGMA table_info(observations)")}
+    if "content_hash" not in cols:
+        db.execute("ALTER TABLE observations ADD COLUMN content_hash TEXT")
+    for name in ("text_z", "narrative_z"):
+        if name not in cols:
+            db.execute(f"ALTER TABLE observations ADD COLUMN {name} BLOB")
+    # NULL hashes (oude rijen) botsen niet met elkaar; `dedupe` vult ze op
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_content_hash ON observations(content_hash)")
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS bridge_minhash (
+            obs_id INTEGER PRIMARY KEY,
+            sig BLOB NOT NULL
+        )
+    """)
+    db.execute("CREATE TABLE IF NOT EXISTS bridge_meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.commit()
+
+def get_meta(db, key, default=None):
+    row = db.execute("SELECT value FROM bridge_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(db, key, value):
+    db.execute("INSERT OR REPLACE INTO bridge_meta (key, value) VALUES (?, ?)", (key, value))
+
+def compress_text(value, codec=None):
+    data = (value or "").encode("utf-8")
+    if codec == "zstd" and zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=9).compress(data)
+    return CODEC_ZLIB + zlib.compress(data, 9)
+
+def decompress_text(blob):
+    blob = bytes(blob)
+    if blob[:1] == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd gecomprimeerde observation, maar 'zstandard' is niet geïnstalleerd")
+        return zstandard.ZstdDecompressor().decompress(blob[1:]).decode("utf-8")
+    return zlib.decompress(blob[1:]).decode("utf-8")
+
+def compression_settings(db):
+    """(codec, min_chars) als archief-compressie aan staat, anders None"""
+    if get_meta(db, "compress") != "on":
+        return None
+    return get_meta(db, "codec", "zlib"), int(get_meta(db, "min_chars", COMPRESS_MIN_CHARS))
+
+def plain_body(row):
+    """Rij-dict met text/narrative gedecomprimeerd (lui: alleen voor rijen die getoond/geëxporteerd worden)"""
+    if not row.get("text_z") and not row.get("narrative_z"):
+        return row
+    row = dict(row)
+    for field in BODY_FIELDS:
+        if row.get(f"{field}_z") is not None:
+            row[field] = decompress_text(row[f"{field}_z"])
+    return row
+
+def stored_body(row):
+    """Zoals claude-mem's triggers de rij zien: lege body-velden als ze gecomprimeerd zijn"""
+    return {**row, **{f: "" for f in BODY_FIELDS if row.get(f"{f}_z") is not None}}
+
+def fts_columns(db, schema="main", table="observations_fts"):
+    return [r[1] for r in db.execute(f"PRAGMA {schema}.table_info({table})")]
+
+def fts_tables(db, schema="main"):
+    """FTS indexen op observations die via triggers de opgeslagen kolommen indexeren"""
+    has_trigram = db.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'bridge_trigram'").fetchone()
+    return ["observations_fts", "bridge_trigram"] if has_trigram else ["observations_fts"]
+
+def fts_swap(db, obs_id, old, new, schema="main", tables=None):
+    """Vervang de FTS entries van obs_id: 'delete' met exact de geïndexeerde waarden, dan opnieuw indexeren"""
+    for table in tables or fts_tables(db, schema):
+        cols = fts_columns(db, schema, table)
+        names, marks = ", ".join(cols), ", ".join("?" for _ in cols)
+        db.execute(f"INSERT INTO {schema}.{table} ({table}, rowid, {names}) VALUES ('delete', ?, {marks})",
+                   [obs_id] + [old.get(c) for c in cols])
+        db.execute(f"INSERT INTO {schema}.{table} (rowid, {names}) VALUES (?, {marks})",
+                   [obs_id] + [new.get(c) for c in cols])
+
+def compressed_rows(db, ids, schema="main"):
+    """Volledige rijen (dicts) van de gecomprimeerde observations onder ids"""
+    marks = ", ".join("?" for _ in ids)
+    cur = db.execute(f"SELECT * FROM {schema}.observations WHERE id IN ({marks}) "
+                     f"AND (text_z IS NOT NULL OR narrative_z IS NOT NULL)", list(ids))
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, row)) for row in cur]
+
+def delete_observations(db, ids, schema="main"):
+    """DELETE waarbij gecomprimeerde rijen eerst hun FTS entry terugkrijgen zoals de delete-trigger die verwacht"""
+    for row in compressed_rows(db, ids, schema):
+        fts_swap(db, row["id"], plain_body(row), stored_body(row), schema)
+    marks = ", ".join("?" for _ in ids)
+    db.execute(f"DELETE FROM {schema}.observations WHERE id IN ({marks})", list(ids))
+
+def unpack_rows(db, ids, schema="main"):
+    """Gecomprimeerde rijen terug naar platte tekst (oude versies comprimeerden ook de hot tier)"""
+    for row in compressed_rows(db, ids, schema):
+        plain = plain_body(row)
+        if schema == "main":
+            # FTS entry eerst terug naar wat de update-trigger verwacht, die indexeert dan de platte tekst
+            fts_swap(db, row["id"], plain, stored_body(row))
+        db.execute(f"UPDATE {schema}.observations SET text = ?, narrative = ?, text_z = NULL, narrative_z = NULL "
+                   f"WHERE id = ?", (plain["text"], plain["narrative"], row["id"]))
+
+def pack_archive_rows(db, ids, codec, min_chars):
+    """Comprimeer archiefrijen onder ids. Het archief heeft geen triggers: de archief-FTS houdt de platte tekst."""
+    marks = ", ".join("?" for _ in ids)
+    rows = db.execute(f"SELECT id, text, narrative FROM archive.observations WHERE id IN ({marks}) "
+                      f"AND text_z IS NULL AND narrative_z IS NULL AND LENGTH(text) >= ?", list(ids) + [min_chars]).fetchall()
+    db.executemany("UPDATE archive.observations SET text = '', narrative = '', text_z = ?, narrative_z = ? WHERE id = ?",
+                   [(compress_text(text, codec), compress_text(narrative, codec), obs_id)
+                    for obs_id, text, narrative in rows])
+    return len(rows)
+
+def rebuild_fts(db, table="observations_fts"):
+    """FTS 'rebuild' leest de (lege) opgeslagen kolommen; zet daarna de platte tekst van gecomprimeerde rijen terug"""
+    db.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+    ids = [r[0] for r in db.execute("SELECT id FROM observations WHERE text_z IS NOT NULL OR narrative_z IS NOT NULL")]
+    for i in range(0, len(ids), 500):
+        for row in compressed_rows(db, ids[i:i + 500]):
+            fts_swap(db, row["id"], stored_body(row), plain_body(row), tables=[table])
+
+def ensure_trigram(db):
+    """Maak de trigram index + triggers bij eerste gebruik en vul hem uit de bestaande observations"""
+    if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'bridge_trigram'").fetchone():
+        return
+    print("🔧 Trigram index opbouwen (eenmalig)...")
+    t0 = time.perf_counter()
+    
+    def create():
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'bridge_trigram'").fetchone():
+                for statement in TRIGRAM_SCHEMA:
+                    db.execute(statement)
+                rebuild_fts(db, "bridge_trigram")
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
     
+    previous, db.isolation_level = db.isolation_level, None
+    try:
+        with_retry(create)
+    finally:
+        db.isolation_level = previous
+    print(f"   ✅ klaar in {time.perf_counter() - t0:.1f}s — triggers houden hem voortaan bij\n")
+
+def trigrams(text):
+    text = " ".join((text or "").lower().split())
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def fuzzy_query(db, query, limit):
+    """Kandidaten via de trigram index (OR van alle query-trigrams), gerangschikt op trigram-overlap"""
+    grams = trigrams(query)
+    if not grams:
+        return []
+    match = " OR ".join('"' + g.replace('"', '""') + '"' for g in sorted(grams))
+    candidates = db.execute("""
+        SELECT o.id, o.title, o.project, o.type, o.created_at, o.narrative, o.narrative_z
+        FROM bridge_trigram JOIN observations o ON o.id = bridge_trigram.rowid
+        WHERE bridge_trigram MATCH ?
+        ORDER BY bm25(bridge_trigram) LIMIT ?
+    """, (match, FUZZY_CANDIDATES)).fetchall()
+    
+    scored = []
+    for obs_id, title, project, obs_type, created_at, narrative, narrative_z in candidates:
+        if narrative_z is not None:
+            narrative = decompress_text(narrative_z)
+        title_grams, body_grams = trigrams(title), trigrams(narrative)
+        # Titel-treffers wegen zwaarder: een identifier in de titel is meestal waar men naar zoekt
+        score = max(len(grams & title_grams), len(grams & (title_grams | body_grams)) * 0.9) / len(grams)
+        if score >= FUZZY_MIN_SCORE:
+            scored.append((score, (obs_id, title, project, obs_type, created_at,
+                                   text_snippet(narrative or "", query), score)))
+    scored.sort(key=lambda x: -x[0])
+    return [row for _, row in scored[:limit]]
+
+def content_hash(project, obs_type, title, subtitle, text, facts, concepts):
+    """Stabiele hash over de inhoud — session id, timestamps en narrative-footer tellen niet mee"""
+    parts = [project, obs_type, title, subtitle, text, facts, concepts]
+    normalized = "\x1f".join(" ".join((p or "").split()) for p in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def minhash_signature(text):
+    """One-permutation MinHash: één hash per token, het minimum per bin is de signatuur"""
+    sig = array('I', [SIG_EMPTY]) * SIG_BINS
+    for token in set(TOKEN_RE.findall((text or "").lower())):
+        if token in STOPWORDS:
+            continue
+        h = (zlib.crc32(token.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        b, v = h >> 26, h & 0x03FFFFFF
+        if v < sig[b]:
+            sig[b] = v
+    return sig
+
+def signature_text(title, text, facts):
+    """Tekst waarop de signatuur gebaseerd is (zonder source tags en metadata-footer)"""
+    return f"{SOURCE_TAG_RE.sub('', title or '')} {text or ''} {facts or ''}"
+
+def index_observation(db, obs_id, title, text, facts):
+    sig = minhash_signature(signature_text(title, text, facts))
+    db.execute("INSERT OR REPLACE INTO bridge_minhash (obs_id, sig) VALUES (?, ?)", (obs_id, sig.tobytes()))
+
+def refresh_index(db):
+    """Incrementele sync: signaturen voor nieuwe rijen (bv. van de CLI plugin), weesrijen weg"""
+    rows = db.execute("""
+        SELECT o.id, o.title, o.text, o.facts, o.text_z FROM observations o
+        LEFT JOIN bridge_minhash m ON m.obs_id = o.id
+        WHERE m.obs_id IS NULL
+    """).fetchall()
+    db.executemany(
+        "INSERT INTO bridge_minhash (obs_id, sig) VALUES (?, ?)",
+        ((obs_id, minhash_signature(signature_text(
+            title, decompress_text(text_z) if text_z is not None else text, facts)).tobytes())
+         for obs_id, title, text, facts, text_z in rows)
+    )
+    db.execute("DELETE FROM bridge_minhash WHERE obs_id NOT IN (SELECT id FROM observations)")
+    db.commit()
+    return len(rows)
+
+def load_signatures(db):
+    """Laad alle signaturen als (ids, matrix) — NumPy array als beschikbaar, anders array('I')"""
+    rows = db.execute("SELECT obs_id, sig FROM bridge_minhash ORDER BY obs_id").fetchall()
+    ids = [row[0] for row in rows]
+    blob = b"".join(row[1] for row in rows)
+    if np is not None:
+        return ids, np.frombuffer(blob, dtype=np.uint32).reshape(-1, SIG_BINS)
+    sigs = array('I')
+    sigs.frombytes(blob)
+    return ids, sigs
+
+def rank_similar(ids, sigs, query_sig, limit, exclude_id=None, min_score=0.0):
+    """Geschatte Jaccard: gelijke bins / bins die in minstens één van beide gevuld zijn"""
+    if np is not None:
+        q = np.frombuffer(query_sig.tobytes(), dtype=np.uint32)
+        q_filled = q != SIG_EMPTY
+        matches = ((sigs == q) & q_filled).sum(axis=1)
+        union = ((sigs != SIG_EMPTY) | q_filled).sum(axis=1)
+        scores = np.where(union > 0, matches / np.maximum(union, 1), 0.0)
+        order = np.argsort(-scores, kind="stable")
+        candidates = ((ids[i], float(scores[i])) for i in order)
+    else:
+        scored = []
+        q = list(query_sig)
+        for n, obs_id in enumerate(ids):
+            row = sigs[n * SIG_BINS:(n + 1) * SIG_BINS]
+            matches = union = 0
+            for a, b in zip(q, row):
+                if a != SIG_EMPTY or b != SIG_EMPTY:
+                    union += 1
+                    if a == b:
+                        matches += 1
+            scored.append((obs_id, matches / union if union else 0.0))
+        scored.sort(key=lambda x: -x[1])
+        candidates = iter(scored)
+    
+    results = []
+    for obs_id, score in candidates:
+        if score <= min_score or len(results) >= limit:
+            break
+        if obs_id != exclude_id:
+            results.append((obs_id, score))
+    return results
+
+def print_similar(db, results):
+    for obs_id, score in results:
+        row = db.execute("SELECT title, project, type, created_at FROM observations WHERE id = ?", (obs_id,)).fetchone()
+        if not row:
+            continue
+        print(f"  #{obs_id} | {row[0]}")
+        print(f"    📁 {row[1]} | 🏷️ {row[2]} | 📅 {(row[3] or '')[:10]} | ≈ {score:.2f}")
+        print()
+
+def build_observation(args):
+    """Observation rij (dict met OBSERVATION_COLUMNS) uit inject-argumenten; timestamps = moment van injecteren"""
     session_id = f"{args.source}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
     now = datetime.now()
-    epoch = int(now.timestamp())
     created_at = now.isoformat()
     
     # Tag title with source
-    source_tag = {
-        'claude-chat': '[CHAT]',
-        'claude-cli': '[CLI]',
-        'cowork': '[COWORK]',
-        'manual': '[MANUAL]',
-        'auto-sync': '[SYNC]'
-    }.get(args.source, '[BRIDGE]')
-    
-    title = f"{source_tag} {args.title}"
+    title = f"{SOURCE_TAGS.get(args.source, '[BRIDGE]')} {args.title}"
     
     # Build narrative from text + source metadata
     narrative = args.text or ""
     if args.source:
         narrative += f"\n\n[Source: {args.source} | Injected: {created_at}]"
     
+    project = args.project or "general"
+    obs_type = args.type if args.type in VALID_TYPES else "discovery"
+    return {
+        "memory_session_id": session_id,
+        "project": project,
+        "text": args.text or "",
+        "type": obs_type,
+        "title": title,
+        "subtitle": args.subtitle or "",
+        "facts": args.facts or "",
+        "narrative": narrative,
+        "concepts": args.concepts or "",
+        "files_read": args.files_read or "",
+        "files_modified": args.files_modified or "",
+        "prompt_number": 0,
+        "created_at": created_at,
+        "created_at_epoch": int(now.timestamp()),
+        "discovery_tokens": len(args.text or "") // 4,  # rough token estimate
+        "content_hash": content_hash(project, obs_type, title, args.subtitle, args.text, args.facts, args.concepts),
+    }
+
+def write_observations(db, rows):
+    """Group commit: alle rijen in één BEGIN IMMEDIATE transactie (met retry).
+    Geeft per rij (obs_id, inserted) terug; duplicaten krijgen het id van de bestaande observation."""
+    placeholders = ", ".join("?" for _ in OBSERVATION_COLUMNS)
+    sql = f"""
+        INSERT INTO observations ({", ".join(OBSERVATION_COLUMNS)})
+        VALUES ({placeholders})
+        ON CONFLICT(content_hash) DO NOTHING
+    """
+    
+    def attempt():
+        results = []
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                cur = db.execute(sql, [row.get(c) for c in OBSERVATION_COLUMNS])
+                if cur.rowcount == 0:
+                    existing = db.execute("SELECT id FROM observations WHERE content_hash = ?",
+                                          (row["content_hash"],)).fetchone()
+                    results.append((existing[0] if existing else None, False))
+                    continue
+                index_observation(db, cur.lastrowid, row["title"], row["text"], row["facts"])
+                results.append((cur.lastrowid, True))
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        return results
+    
+    previous, db.isolation_level = db.isolation_level, None  # transacties zelf beheren
     try:
-        db.execute("""
-            INSERT INTO observations 
-            (memory_session_id, project, text, type, title, subtitle, facts, narrative, concepts, 
-             files_read, files_modified, prompt_number, created_at, created_at_epoch, discovery_tokens)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            session_id,
-            args.project or "general",
-            args.text or "",
-            args.type if args.type in VALID_TYPES else "discovery",
-            title,
-            args.subtitle or "",
-            args.facts or "",
-            narrative,
-            args.concepts or "",
-            args.files_read or "",
-            args.files_modified or "",
-            0,
-            created_at,
-            epoch,
-            len(args.text or "") // 4  # rough token estimate
-        ))
-        
-        obs_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
-        db.commit()
+        return with_retry(attempt)
+    finally:
+        db.isolation_level = previous
+
+def spool_observation(row):
+    """Zet een observation atomisch in de wachtrij (tmp + rename), zonder de database aan te raken"""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    name = f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+    tmp = os.path.join(SPOOL_DIR, f".{name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(row, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(SPOOL_DIR, name))
+
+def spooled_files():
+    return sorted(glob.glob(os.path.join(SPOOL_DIR, "*.json")))
+
+def flush_spool(wait=False, max_rows=GROUP_ROWS, linger_ms=GROUP_LINGER_MS):
+    """Schrijf de wachtrij weg als enige writer (flock). Zonder wait: geeft None terug als een ander
+    proces al aan het schrijven is — dat proces pakt onze bestanden ook op."""
+    if not os.path.isdir(SPOOL_DIR):
+        return 0
+    total = None
+    while True:
+        written = _drain_spool(wait, max_rows, linger_ms)
+        if written is None:
+            return total
+        total = (total or 0) + written
+        # Bestanden die net na onze laatste glob gespoold zijn: die writer kreeg de lock niet
+        if not spooled_files():
+            return total
+
+def _drain_spool(wait, max_rows, linger_ms):
+    lock = open(os.path.join(SPOOL_DIR, ".writer.lock"), "w")
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        
+        db = get_db()
+        written = 0
+        try:
+            while True:
+                files = spooled_files()[:max_rows]
+                if 0 < len(files) < max_rows and linger_ms:
+                    # Burst bezig: even wachten zodat meer observations in dezelfde commit vallen
+                    time.sleep(linger_ms / 1000)
+                    files = spooled_files()[:max_rows]
+                if not files:
+                    return written
+                rows, valid = [], []
+                for path in files:
+                    try:
+                        with open(path) as f:
+                            row = json.load(f)
+                        # Vóór de transactie valideren: één kapotte rij mag de hele wachtrij niet blokkeren
+                        missing = [c for c in SPOOL_REQUIRED if c not in row] if isinstance(row, dict) else ["<object>"]
+                        if missing:
+                            raise ValueError(f"ontbrekende velden: {', '.join(missing)}")
+                        rows.append(row)
+                        valid.append(path)
+                    except (ValueError, OSError) as e:
+                        print(f"⚠️  Spool bestand overgeslagen: {os.path.basename(path)} ({e})")
+                        os.replace(path, path + ".bad")
+                results = write_observations(db, rows)
+                for path in valid:
+                    os.remove(path)
+                written += sum(1 for _, inserted in results if inserted)
+        finally:
+            db.close()
+    finally:
+        lock.close()
+
+def inject(args):
+    """Inject a new observation into claude-mem"""
+    row = build_observation(args)
+    title = row["title"]
+    
+    if getattr(args, "spool", False):
+        spool_observation(row)
+        written = flush_spool()
+        print(f"📥 In wachtrij: {title}")
+        if written:
+            print(f"   ✍️  {written} observations weggeschreven (group commit)")
+        return True
+    
+    db = None
+    try:
+        db = get_db()  # ook het openen kan "database is locked" geven → wachtrij
+        (obs_id, inserted), = write_observations(db, [row])
+        
+        if not inserted:
+            print(f"⏭️  Al aanwezig als observation #{obs_id} — overgeslagen")
+            print(f"   Title:   {title}")
+            return None
         
         print(f"✅ Observation #{obs_id} geïnjecteerd")
         print(f"   Source:  {args.source}")
@@ -102,33 +615,111 @@ def inject(args):
         
         return obs_id
         
+    except sqlite3.OperationalError as e:
+        if not is_locked(e):
+            print(f"❌ Error: {e}")
+            return None
+        # Database bleef bezet na alle retries: niet kwijtraken, de volgende writer pakt hem op
+        spool_observation(row)
+        print(f"📥 Database bezet ({e}) — observation in wachtrij gezet: {title}")
+        return True
     except Exception as e:
         print(f"❌ Error: {e}")
         return None
     finally:
-        db.close()
+        if db is not None:
+            db.close()
+
+def flush(args):
+    """Schrijf de spool wachtrij weg (wacht op een eventuele andere writer)"""
+    written = flush_spool(wait=True, max_rows=args.max_rows, linger_ms=args.linger_ms)
+    pending = len(spooled_files()) if os.path.isdir(SPOOL_DIR) else 0
+    print(f"✅ {written} observations weggeschreven, {pending} nog in wachtrij")
+
+def attach_archive(db, create=False):
+    """ATTACH het archief als schema `archive`. Zonder create: False als er (nog) geen archief is."""
+    if not create and not os.path.exists(ARCHIVE_PATH):
+        return False
+    db.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_PATH,))
+    ensure_archive(db)
+    return True
+
+def ensure_archive(db):
+    """Archief-tabellen met dezelfde kolommen als main.observations (ids blijven behouden) + eigen FTS"""
+    columns = [(row[1], row[2]) for row in db.execute("PRAGMA main.table_info(observations)")]
+    fts_columns = [row[1] for row in db.execute("PRAGMA main.table_info(observations_fts)")]
+    existing = {row[1] for row in db.execute("PRAGMA archive.table_info(observations)")}
+    if not existing:
+        defs = ", ".join(f"{name} {decl}".strip() for name, decl in columns if name != "id")
+        db.execute(f"CREATE TABLE archive.observations (id INTEGER PRIMARY KEY, {defs})")
+        db.execute("CREATE INDEX archive.idx_archive_epoch ON observations(created_at_epoch)")
+        db.execute("CREATE INDEX archive.idx_archive_content_hash ON observations(content_hash)")
+        db.execute(f"""
+            CREATE VIRTUAL TABLE archive.observations_fts USING fts5(
+                {", ".join(fts_columns)}, content='observations', content_rowid='id'
+            )
+        """)
+        db.execute("CREATE TABLE archive.bridge_minhash (obs_id INTEGER PRIMARY KEY, sig BLOB NOT NULL)")
+    else:
+        # Kolommen die later aan main zijn toegevoegd
+        for name, decl in columns:
+            if name not in existing:
+                db.execute(f"ALTER TABLE archive.observations ADD COLUMN {name} {decl}")
+    db.commit()
+
+def fts_query(db, schema, query, limit):
+    rows = db.execute(f"""
+        SELECT o.id, o.title, o.project, o.type, o.created_at, 
+               snippet(observations_fts, 3, '>>>', '<<<', '...', 40) as snippet, o.text_z
+        FROM {schema}.observations_fts 
+        JOIN {schema}.observations o ON o.id = observations_fts.rowid
+        WHERE observations_fts MATCH ?
+        ORDER BY o.created_at_epoch DESC
+        LIMIT ?
+    """, (query, limit)).fetchall()
+    # Gecomprimeerde rijen: snippet() ziet de lege kolom, dus zelf een snippet uit de gedecomprimeerde tekst
+    return [row[:5] + (text_snippet(decompress_text(row[6]), query) if row[6] is not None else row[5],)
+            for row in rows]
+
+def text_snippet(text, query, width=40):
+    """Benadering van FTS snippet(): venster rond de eerste zoekterm die in de tekst voorkomt"""
+    lowered = text.lower()
+    for term in TOKEN_RE.findall(query.lower()):
+        pos = lowered.find(term)
+        if pos >= 0:
+            start, end = max(0, pos - width), pos + len(term)
+            return (f"{'...' if start else ''}{text[start:pos]}>>>{text[pos:end]}<<<"
+                    f"{text[end:end + width]}{'...' if end + width < len(text) else ''}")
+    # Geen exacte term (typo): venster rond de eerste query-trigram die wel voorkomt
+    hits = [p for p in (lowered.find(g) for g in trigrams(query)) if p >= 0]
+    if hits:
+        start = max(0, min(hits) - width)
+        return f"{'...' if start else ''}{text[start:start + 2 * width]}..."
+    return text[:2 * width]
 
 def search(args):
-    """Full-text search across all observations"""
+    """Full-text search: eerst de hot tier, het archief alleen met --archive of bij te weinig resultaten"""
+    if getattr(args, "semantic", False):
+        return semantic_search(args)
+    if getattr(args, "fuzzy", False):
+        return fuzzy_search(args)
     db = get_db()
     try:
-        rows = db.execute("""
-            SELECT o.id, o.title, o.project, o.type, o.created_at, 
-                   snippet(observations_fts, 3, '>>>', '<<<', '...', 40) as snippet
-            FROM observations_fts 
-            JOIN observations o ON o.id = observations_fts.rowid
-            WHERE observations_fts MATCH ?
-            ORDER BY o.created_at_epoch DESC
-            LIMIT ?
-        """, (args.query, args.limit or 10)).fetchall()
+        limit = args.limit or 10
+        rows = fts_query(db, "main", args.query, limit)
+        archived = []
+        use_archive = getattr(args, "archive", False) or (len(rows) < limit and not getattr(args, "hot_only", False))
+        if use_archive and attach_archive(db):
+            archived = fts_query(db, "archive", args.query, limit if args.archive else limit - len(rows))
         
-        if not rows:
+        if not rows and not archived:
             print(f"🔍 Geen resultaten voor '{args.query}'")
             return
         
-        print(f"🔍 {len(rows)} resultaten voor '{args.query}':\n")
-        for row in rows:
-            print(f"  #{row[0]} | {row[1]}")
+        print(f"🔍 {len(rows) + len(archived)} resultaten voor '{args.query}'"
+              f"{f' ({len(archived)} uit archief)' if archived else ''}:\n")
+        for row, tier in [(r, "") for r in rows] + [(r, "  🗄️") for r in archived]:
+            print(f"  #{row[0]} | {row[1]}{tier}")
             print(f"    📁 {row[2]} | 🏷️ {row[3]} | 📅 {row[4][:10]}")
             if row[5]:
                 print(f"    💬 {row[5][:120]}")
@@ -137,6 +728,199 @@ def search(args):
     finally:
         db.close()
 
+def fuzzy_search(args):
+    """Substring- en typo-tolerant zoeken via de trigram index (alleen de hot tier)"""
+    db = get_db()
+    try:
+        ensure_trigram(db)
+        if len(" ".join(args.query.split())) < 3:
+            print("❌ --fuzzy heeft minstens 3 tekens nodig")
+            return
+        rows = fuzzy_query(db, args.query, args.limit or 10)
+        
+        if not rows:
+            print(f"🔍 Geen (fuzzy) resultaten voor '{args.query}'")
+            return
+        
+        print(f"🔍 {len(rows)} fuzzy resultaten voor '{args.query}':\n")
+        for obs_id, title, project, obs_type, created_at, snippet, score in rows:
+            print(f"  #{obs_id} | {title}")
+            print(f"    📁 {project} | 🏷️ {obs_type} | 📅 {(created_at or '')[:10]} | ≈ {score:.2f}")
+            if snippet:
+                print(f"    💬 {snippet[:120]}")
+            print()
+    finally:
+        db.close()
+
+def iso_cutoff(value):
+    """argparse type voor --before: ISO datum/tijd → epoch seconden"""
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"geen geldige ISO datum: {value!r} (bijv. 2025-01-31 of 2025-01-31T12:00)")
+
+def archive(args):
+    """Verplaats observations ouder dan de cutoff naar het archief (idempotent, in batches)"""
+    if args.before is not None:
+        cutoff = args.before
+    else:
+        cutoff = int(time.time()) - args.older_than * 86400
+    
+    db = get_db()
+    try:
+        count = db.execute("SELECT COUNT(*) FROM observations WHERE created_at_epoch < ?", (cutoff,)).fetchone()[0]
+        total = db.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        print(f"🗄️  {count}/{total} observations ouder dan {datetime.fromtimestamp(cutoff).date()}")
+        if args.dry_run or count == 0:
+            if args.dry_run:
+                print("🔸 DRY RUN — niets gewijzigd")
+            return
+        
+        size_before = db_size_bytes()
+        attach_archive(db, create=True)
+        columns = [row[1] for row in db.execute("PRAGMA main.table_info(observations)")]
+        fts_columns = [row[1] for row in db.execute("PRAGMA archive.table_info(observations_fts)")]
+        cols, fts_cols = ", ".join(columns), ", ".join(fts_columns)
+        
+        settings = compression_settings(db)
+        moved = 0
+        db.isolation_level = None
+        while True:
+            ids = [row[0] for row in db.execute(
+                "SELECT id FROM main.observations WHERE created_at_epoch < ? ORDER BY id LIMIT ?",
+                (cutoff, ARCHIVE_BATCH))]
+            if not ids:
+                break
+            marks = ", ".join("?" for _ in ids)
+            
+            def move():
+                # Eén transactie over beide databases; al gearchiveerde ids (afgebroken run) niet opnieuw
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    present = {row[0] for row in db.execute(
+                        f"SELECT id FROM archive.observations WHERE id IN ({marks})", ids)}
+                    new = [i for i in ids if i not in present]
+                    if new:
+                        new_marks = ", ".join("?" for _ in new)
+                        db.execute(f"INSERT INTO archive.observations ({cols}) "
+                                   f"SELECT {cols} FROM main.observations WHERE id IN ({new_marks})", new)
+                        db.execute(f"INSERT INTO archive.observations_fts (rowid, {fts_cols}) "
+                                   f"SELECT id, {fts_cols} FROM archive.observations WHERE id IN ({new_marks})", new)
+                        for row in compressed_rows(db, new, "archive"):
+                            fts_swap(db, row["id"], stored_body(row), plain_body(row), "archive")
+                        if settings:
+                            pack_archive_rows(db, new, *settings)
+                    db.execute(f"INSERT OR REPLACE INTO archive.bridge_minhash SELECT * FROM main.bridge_minhash "
+                               f"WHERE obs_id IN ({marks})", ids)
+                    db.execute(f"DELETE FROM main.bridge_minhash WHERE obs_id IN ({marks})", ids)
+                    # claude-mem's delete trigger houdt main.observations_fts bij
+                    delete_observations(db, ids)
+                    db.execute("COMMIT")
+                except BaseException:
+                    if db.in_transaction:
+                        db.execute("ROLLBACK")
+                    raise
+            
+            with_retry(move)
+            moved += len(ids)
+        
+        db.execute("INSERT INTO main.observations_fts(observations_fts) VALUES('optimize')")
+        db.execute("INSERT INTO archive.observations_fts(observations_fts) VALUES('optimize')")
+        db.execute("PRAGMA main.wal_checkpoint(PASSIVE)")
+        archived = db.execute("SELECT COUNT(*) FROM archive.observations").fetchone()[0]
+        print(f"✅ {moved} observations gearchiveerd ({archived} totaal in {ARCHIVE_PATH})")
+        print(f"   Hot tier: {total - moved} observations, {size_before / 1024 / 1024:.2f} MB → "
+              f"{db_size_bytes() / 1024 / 1024:.2f} MB (vrije pagina's: `maintain --full`)")
+    finally:
+        db.close()
+
+def semantic_search(args):
+    """Zoek parafrases van een (langere) tekst via de MinHash index"""
+    db = get_db()
+    try:
+        refresh_index(db)
+        ids, sigs = load_signatures(db)
+        results = rank_similar(ids, sigs, minhash_signature(args.query), args.limit or 10)
+        
+        if not results:
+            print(f"🧬 Geen vergelijkbare observations voor '{args.query[:60]}'")
+            return
+        
+        print(f"🧬 {len(results)} vergelijkbare observations voor '{args.query[:60]}':\n")
+        print_similar(db, results)
+    finally:
+        db.close()
+
+def similar(args):
+    """Toon observations die inhoudelijk lijken op observation <id>"""
+    db = get_db()
+    try:
+        refresh_index(db)
+        row = db.execute("SELECT sig FROM bridge_minhash WHERE obs_id = ?", (args.id,)).fetchone()
+        if not row:
+            print(f"❌ Observation #{args.id} niet gevonden")
+            return
+        
+        query_sig = array('I')
+        query_sig.frombytes(row[0])
+        ids, sigs = load_signatures(db)
+        results = rank_similar(ids, sigs, query_sig, args.limit, exclude_id=args.id, min_score=args.min_score)
+        
+        if not results:
+            print(f"🧬 Geen vergelijkbare observations voor #{args.id}")
+            return
+        
+        print(f"🧬 {len(results)} observations lijken op #{args.id}:\n")
+        print_similar(db, results)
+    finally:
+        db.close()
+
+def bench_semantic(args):
+    """Meet index-opbouw en query latency op een synthetische in-memory database"""
+    rng = random.Random(42)
+    vocab = [f"term{i}" for i in range(args.vocab)]
+    
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE observations (id INTEGER PRIMARY KEY, title TEXT, text TEXT, facts TEXT, narrative TEXT)")
+    ensure_schema(db)  # zelfde bridge-kolommen/tabellen als de echte database
+    db.executemany(
+        "INSERT INTO observations (id, title, text, facts) VALUES (?, ?, ?, '')",
+        ((i, f"obs {i}", " ".join(rng.choices(vocab, k=args.words))) for i in range(1, args.n + 1))
+    )
+    db.commit()
+    
+    t0 = time.perf_counter()
+    refresh_index(db)
+    build = time.perf_counter() - t0
+    
+    load_times, scan_times = [], []
+    for _ in range(args.queries):
+        query_id = rng.randint(1, args.n)
+        t0 = time.perf_counter()
+        ids, sigs = load_signatures(db)
+        t1 = time.perf_counter()
+        row = db.execute("SELECT sig FROM bridge_minhash WHERE obs_id = ?", (query_id,)).fetchone()
+        query_sig = array('I')
+        query_sig.frombytes(row[0])
+        rank_similar(ids, sigs, query_sig, 10, exclude_id=query_id)
+        t2 = time.perf_counter()
+        load_times.append(t1 - t0)
+        scan_times.append(t2 - t1)
+    
+    def pct(values, p):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * p))] * 1000
+    
+    print("=" * 50)
+    print(f"🧬 Semantic index benchmark ({'numpy' if np is not None else 'pure python'})")
+    print("=" * 50)
+    print(f"  Observations: {args.n} × {args.words} woorden (vocab {args.vocab})")
+    print(f"  Index build:  {build:.2f}s ({args.n / build:.0f} obs/s)")
+    print(f"  Index size:   {args.n * SIG_BINS * 4 / 1024 / 1024:.1f} MB")
+    print(f"  Load  p50/p95: {pct(load_times, 0.5):.1f} / {pct(load_times, 0.95):.1f} ms")
+    print(f"  Scan  p50/p95: {pct(scan_times, 0.5):.1f} / {pct(scan_times, 0.95):.1f} ms")
+    db.close()
+
 def stats(args):
     """Show memory statistics"""
     db = get_db()
@@ -155,11 +939,16 @@ def stats(args):
         }
         
         db_size = os.path.getsize(DB_PATH) / 1024 / 1024
+        archived = None
+        if attach_archive(db):
+            archived = db.execute("SELECT COUNT(*) FROM archive.observations").fetchone()[0]
         
         print("=" * 50)
         print("🧠 Claude-Mem Unified Memory Stats")
         print("=" * 50)
         print(f"\n📊 Totaal: {total} observations ({db_size:.1f} MB)")
+        if archived is not None:
+            print(f"🗄️  Archief: {archived} observations ({os.path.getsize(ARCHIVE_PATH) / 1024 / 1024:.1f} MB)")
         
         print(f"\n📡 Per bron:")
         for src, count in sources.items():
@@ -178,12 +967,19 @@ def stats(args):
         db.close()
 
 def export_data(args):
-    """Export all observations as JSON"""
+    """Export all observations (hot tier + archief) as JSON"""
     db = get_db()
     db.row_factory = sqlite3.Row
     try:
         rows = db.execute("SELECT * FROM observations ORDER BY created_at_epoch DESC").fetchall()
         data = [dict(row) for row in rows]
+        if attach_archive(db):
+            data += [dict(row) for row in db.execute(
+                "SELECT * FROM archive.observations ORDER BY created_at_epoch DESC")]
+        data = [plain_body(row) for row in data]
+        for row in data:
+            row.pop("text_z", None)
+            row.pop("narrative_z", None)
         
         output = args.output or f"claude-mem-export-{datetime.now().strftime('%Y%m%d')}.json"
         with open(output, 'w') as f:
@@ -194,27 +990,283 @@ def export_data(args):
     finally:
         db.close()
 
+def dedupe(args):
+    """Voeg bestaande duplicaten samen (oudste blijft) en herbouw de FTS index"""
+    db = get_db()
+    try:
+        rows = db.execute("""
+            SELECT id, project, type, title, subtitle, text, facts, concepts, content_hash, text_z
+            FROM observations ORDER BY id
+        """).fetchall()
+        
+        keep = {}
+        duplicates = []
+        missing = []
+        for obs_id, project, obs_type, title, subtitle, text, facts, concepts, stored, text_z in rows:
+            if text_z is not None:
+                text = decompress_text(text_z)
+            digest = content_hash(project, obs_type, title, subtitle, text, facts, concepts)
+            if digest in keep:
+                duplicates.append((obs_id,))
+            else:
+                keep[digest] = obs_id
+                if stored != digest:
+                    missing.append((digest, obs_id))
+        
+        print(f"🔍 {len(rows)} observations, {len(duplicates)} duplicaten")
+        
+        if args.dry_run:
+            print("🔸 DRY RUN — niets gewijzigd")
+            return
+        
+        # Eerst duplicaten weg, anders botst het vullen van de hash op de unique index
+        ids = [obs_id for (obs_id,) in duplicates]
+        for i in range(0, len(ids), 500):
+            delete_observations(db, ids[i:i + 500])
+        db.executemany("UPDATE observations SET content_hash = ? WHERE id = ?", missing)
+        db.commit()
+        
+        rebuild_fts(db)
+        db.execute("INSERT INTO observations_fts(observations_fts) VALUES('optimize')")
+        db.commit()
+        
+        print(f"✅ {len(duplicates)} duplicaten verwijderd, {len(missing)} hashes bijgewerkt")
+        print(f"   FTS index herbouwd en geoptimaliseerd")
+        
+    finally:
+        db.close()
+
+def db_size_bytes(path=None):
+    """Database + WAL op schijf"""
+    path = path or DB_PATH
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+def probe_latency(db, rounds=5, schema="main"):
+    """Mediane FTS query latency (ms) over termen uit de recentste titels"""
+    titles = db.execute(f"SELECT title FROM {schema}.observations ORDER BY id DESC LIMIT 20").fetchall()
+    terms = []
+    for (title,) in titles:
+        terms.extend(t for t in TOKEN_RE.findall((title or "").lower()) if t not in STOPWORDS)
+    terms = list(dict.fromkeys(terms))[:5] or ["claude"]
+    
+    timings = []
+    for _ in range(rounds):
+        for term in terms:
+            t0 = time.perf_counter()
+            db.execute(f"""
+                SELECT o.id FROM {schema}.observations_fts JOIN {schema}.observations o ON o.id = observations_fts.rowid
+                WHERE observations_fts MATCH ? ORDER BY o.created_at_epoch DESC LIMIT 10
+            """, (f'"{term}"',)).fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def maintain(args):
+    """Onderhoud binnen een tijdsbudget: FTS segmenten mergen, ANALYZE, WAL checkpoint, vacuum"""
+    db = get_db()
+    # Korte busy timeout: liever een stap overslaan dan writers lang blokkeren
+    db.execute(f"PRAGMA busy_timeout = {int(args.busy_timeout * 1000)}")
+    deadline = time.monotonic() + args.budget
+    
+    def remaining():
+        return deadline - time.monotonic()
+    
+    def step(name, fn):
+        if remaining() <= 0:
+            print(f"  ⏭️  {name}: budget op")
+            return
+        t0 = time.perf_counter()
+        try:
+            detail = fn()
+            print(f"  ✅ {name} ({(time.perf_counter() - t0) * 1000:.0f} ms){f' — {detail}' if detail else ''}")
+        except sqlite3.OperationalError as e:
+            print(f"  ⚠️  {name}: {e}")
+    
+    def fts_merge():
+        # Kleine incrementele merges, elk in een eigen korte transactie
+        rounds = 0
+        while remaining() > 0:
+            before = db.total_changes
+            db.execute("INSERT INTO observations_fts(observations_fts, rank) VALUES('merge', ?)", (args.merge_pages,))
+            db.commit()
+            rounds += 1
+            if db.total_changes - before < 2:
+                break
+        if args.full and remaining() > 0:
+            db.execute("INSERT INTO observations_fts(observations_fts) VALUES('optimize')")
+            db.commit()
+            return f"{rounds} merge rondes + optimize"
+        return f"{rounds} merge rondes"
+    
+    def analyze():
+        db.execute("PRAGMA analysis_limit = 1000")
+        db.execute("ANALYZE")
+        db.commit()
+    
+    def checkpoint():
+        mode = "TRUNCATE" if args.full else "PASSIVE"
+        busy, log_frames, done = db.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        if log_frames < 0:
+            return "geen WAL mode"
+        return f"{done}/{log_frames} frames{' (writers actief)' if busy else ''}"
+    
+    def vacuum():
+        auto_vacuum = db.execute("PRAGMA auto_vacuum").fetchone()[0]
+        freelist = db.execute("PRAGMA freelist_count").fetchone()[0]
+        if auto_vacuum == 2:  # INCREMENTAL
+            freed = 0
+            while freed < freelist and remaining() > 0:
+                db.execute(f"PRAGMA incremental_vacuum({args.vacuum_pages})")
+                db.commit()
+                freed += args.vacuum_pages
+            return f"{min(freed, freelist)}/{freelist} vrije pagina's teruggegeven"
+        if args.full:
+            # Eenmalig omzetten zodat volgende runs incrementeel kunnen vacuumen
+            db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            db.execute("VACUUM")
+            return f"volledige VACUUM, auto_vacuum=INCREMENTAL ({freelist} vrije pagina's)"
+        return f"{freelist} vrije pagina's — auto_vacuum staat uit, draai eenmalig met --full"
+    
+    try:
+        size_before = db_size_bytes()
+        latency_before = probe_latency(db)
+        
+        print("=" * 50)
+        print(f"🧹 Claude-Mem onderhoud (budget {args.budget:.0f}s{', full' if args.full else ''})")
+        print("=" * 50)
+        step("FTS merge", fts_merge)
+        step("ANALYZE", analyze)
+        step("WAL checkpoint", checkpoint)
+        step("Vacuum", vacuum)
+        
+        size_after = db_size_bytes()
+        latency_after = probe_latency(db)
+        print(f"\n💾 Grootte: {size_before / 1024 / 1024:.2f} MB → {size_after / 1024 / 1024:.2f} MB")
+        print(f"⚡ FTS query: {latency_before:.2f} ms → {latency_after:.2f} ms")
+    finally:
+        db.close()
+
+def body_bytes(db, schema="main"):
+    """Opslag van de body-velden: (platte tekst, gecomprimeerde BLOBs) in bytes"""
+    return db.execute(f"""
+        SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB)) + LENGTH(CAST(narrative AS BLOB))), 0),
+               COALESCE(SUM(LENGTH(text_z) + LENGTH(narrative_z)), 0)
+        FROM {schema}.observations
+    """).fetchone()
+
+def compress(args):
+    """Zet archief-compressie aan (of uit met --off) en migreer het archief; meet grootte en query speed ervoor/erna.
+    De hot tier is van de claude-mem plugin en blijft platte tekst (eerder gecomprimeerde rijen worden hersteld)."""
+    db = get_db()
+    db.isolation_level = None
+    try:
+        codec = args.codec or ("zstd" if zstandard is not None else "zlib")
+        if codec == "zstd" and zstandard is None:
+            print("❌ zstd gevraagd maar 'zstandard' is niet geïnstalleerd (pip install zstandard)")
+            return
+        
+        def in_batches(select, fn):
+            def batch():
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    ids = [r[0] for r in db.execute(select, (ARCHIVE_BATCH,))]
+                    if ids:
+                        fn(ids)
+                    db.execute("COMMIT")
+                    return len(ids)
+                except BaseException:
+                    if db.in_transaction:
+                        db.execute("ROLLBACK")
+                    raise
+            total = 0
+            while True:
+                n = with_retry(batch)
+                if not n:
+                    return total
+                total += n
+        
+        restored = in_batches("SELECT id FROM main.observations WHERE text_z IS NOT NULL OR narrative_z IS NOT NULL "
+                              "LIMIT ?", lambda ids: unpack_rows(db, ids, "main"))
+        if restored:
+            print(f"♻️  {restored} gecomprimeerde observations in de hot tier hersteld naar platte tekst")
+        
+        def save_settings():
+            db.execute("BEGIN IMMEDIATE")
+            set_meta(db, "compress", "off" if args.off else "on")
+            set_meta(db, "codec", codec)
+            set_meta(db, "min_chars", str(args.min_chars))
+            db.execute("COMMIT")
+        
+        state = "uit" if args.off else f"aan ({codec}, ≥ {args.min_chars} tekens)"
+        if not attach_archive(db):
+            with_retry(save_settings)
+            print(f"🗜️  Archief-compressie {state} — nog geen archief, `archive` comprimeert bij het verplaatsen")
+            return
+        
+        size_before, latency_before = db_size_bytes(ARCHIVE_PATH), probe_latency(db, schema="archive")
+        plain_before, packed_before = body_bytes(db, "archive")
+        
+        if args.off:
+            migrated = in_batches("SELECT id FROM archive.observations WHERE text_z IS NOT NULL OR narrative_z IS NOT NULL "
+                                  "LIMIT ?", lambda ids: unpack_rows(db, ids, "archive"))
+        else:
+            migrated = in_batches(f"SELECT id FROM archive.observations WHERE text_z IS NULL AND narrative_z IS NULL "
+                                  f"AND LENGTH(text) >= {int(args.min_chars)} LIMIT ?",
+                                  lambda ids: pack_archive_rows(db, ids, codec, args.min_chars))
+        with_retry(save_settings)
+        
+        if args.vacuum:
+            db.execute("VACUUM archive")
+        
+        plain_after, packed_after = body_bytes(db, "archive")
+        size_after, latency_after = db_size_bytes(ARCHIVE_PATH), probe_latency(db, schema="archive")
+        
+        # Kosten van lui decomprimeren: een pagina zoekresultaten / export
+        sample = [r[0] for r in db.execute("SELECT text_z FROM archive.observations WHERE text_z IS NOT NULL LIMIT 1000")]
+        t0 = time.perf_counter()
+        for blob in sample:
+            decompress_text(blob)
+        per_row = (time.perf_counter() - t0) / len(sample) * 1e6 if sample else 0
+        
+        mb = 1024 * 1024
+        print("=" * 50)
+        print(f"🗜️  Archief-compressie {state}: {migrated} observations gemigreerd")
+        print("=" * 50)
+        print(f"  Body velden:  {(plain_before + packed_before) / mb:.2f} MB → {(plain_after + packed_after) / mb:.2f} MB")
+        hint = "" if args.vacuum else " (vrije pagina's pas terug na --vacuum)"
+        print(f"  Archief:      {size_before / mb:.2f} MB → {size_after / mb:.2f} MB{hint}")
+        print(f"  FTS query:    {latency_before:.2f} ms → {latency_after:.2f} ms")
+        if sample:
+            print(f"  Decompressie: {per_row:.1f} µs per getoonde rij")
+    finally:
+        db.close()
+
 def batch_inject(args):
-    """Inject multiple observations from a JSON file"""
+    """Inject multiple observations from a JSON file (group commit per GROUP_ROWS)"""
     with open(args.file, 'r') as f:
         items = json.load(f)
     
+    rows = [build_observation(argparse.Namespace(
+        source=item.get('source', 'auto-sync'),
+        project=item.get('project', 'general'),
+        type=item.get('type', 'discovery'),
+        title=item.get('title', 'Untitled'),
+        subtitle=item.get('subtitle', ''),
+        text=item.get('text', ''),
+        facts=item.get('facts', ''),
+        concepts=item.get('concepts', ''),
+        files_read=item.get('files_read', ''),
+        files_modified=item.get('files_modified', '')
+    )) for item in items]
+    
+    db = get_db()
     count = 0
-    for item in items:
-        inject_args = argparse.Namespace(
-            source=item.get('source', 'auto-sync'),
-            project=item.get('project', 'general'),
-            type=item.get('type', 'discovery'),
-            title=item.get('title', 'Untitled'),
-            subtitle=item.get('subtitle', ''),
-            text=item.get('text', ''),
-            facts=item.get('facts', ''),
-            concepts=item.get('concepts', ''),
-            files_read=item.get('files_read', ''),
-            files_modified=item.get('files_modified', '')
-        )
-        if inject(inject_args):
-            count += 1
+    try:
+        for i in range(0, len(rows), GROUP_ROWS):
+            results = write_observations(db, rows[i:i + GROUP_ROWS])
+            count += sum(1 for _, inserted in results if inserted)
+    finally:
+        db.close()
     
     print(f"\n✅ Batch complete: {count}/{len(items)} geïnjecteerd")
 
@@ -234,11 +1286,33 @@ def main():
     p_inject.add_argument("--concepts", default="")
     p_inject.add_argument("--files-read", default="", dest="files_read")
     p_inject.add_argument("--files-modified", default="", dest="files_modified")
+    p_inject.add_argument("--spool", action="store_true", help="Via de wachtrij (group commit door één writer)")
+    
+    # flush
+    p_flush = sub.add_parser("flush", help="Write queued (spooled) observations")
+    p_flush.add_argument("--max-rows", type=int, default=GROUP_ROWS, dest="max_rows")
+    p_flush.add_argument("--linger-ms", type=int, default=GROUP_LINGER_MS, dest="linger_ms")
     
     # search
     p_search = sub.add_parser("search", help="Search memories")
     p_search.add_argument("query")
     p_search.add_argument("--limit", type=int, default=10)
+    p_search.add_argument("--semantic", action="store_true", help="MinHash similarity i.p.v. FTS")
+    p_search.add_argument("--fuzzy", action="store_true", help="Trigram index: substrings en typo's")
+    p_search.add_argument("--archive", action="store_true", help="Ook het archief doorzoeken")
+    p_search.add_argument("--hot-only", action="store_true", dest="hot_only", help="Nooit terugvallen op het archief")
+    
+    # archive
+    p_archive = sub.add_parser("archive", help="Move old observations to the archive database")
+    p_archive.add_argument("--older-than", type=int, default=365, dest="older_than", help="Dagen (default: 365)")
+    p_archive.add_argument("--before", type=iso_cutoff, default=None, help="ISO datum als cutoff (i.p.v. --older-than)")
+    p_archive.add_argument("--dry-run", action="store_true", dest="dry_run")
+    
+    # similar
+    p_similar = sub.add_parser("similar", help="Find observations similar to <id>")
+    p_similar.add_argument("id", type=int)
+    p_similar.add_argument("--limit", type=int, default=10)
+    p_similar.add_argument("--min-score", type=float, default=0.1, dest="min_score")
     
     # stats
     sub.add_parser("stats", help="Show statistics")
@@ -251,18 +1325,58 @@ def main():
     p_batch = sub.add_parser("batch", help="Batch inject from JSON")
     p_batch.add_argument("file")
     
+    # dedupe
+    p_dedupe = sub.add_parser("dedupe", help="Remove duplicate observations and rebuild FTS")
+    p_dedupe.add_argument("--dry-run", action="store_true", dest="dry_run")
+    
+    # maintain
+    p_maintain = sub.add_parser("maintain", help="Optimize FTS, ANALYZE, checkpoint and vacuum")
+    p_maintain.add_argument("--budget", type=float, default=10.0, help="Tijdsbudget in seconden")
+    p_maintain.add_argument("--full", action="store_true", help="FTS optimize, WAL truncate en VACUUM indien nodig")
+    p_maintain.add_argument("--busy-timeout", type=float, default=2.0, dest="busy_timeout")
+    p_maintain.add_argument("--merge-pages", type=int, default=200, dest="merge_pages")
+    p_maintain.add_argument("--vacuum-pages", type=int, default=500, dest="vacuum_pages")
+    
+    # compress
+    p_compress = sub.add_parser("compress", help="Store large archived text/narrative compressed (migration + measurement)")
+    p_compress.add_argument("--off", action="store_true", help="Compressie uitzetten en alles decomprimeren")
+    p_compress.add_argument("--codec", choices=["zlib", "zstd"], default=None, help="Default: zstd als beschikbaar")
+    p_compress.add_argument("--min-chars", type=int, default=COMPRESS_MIN_CHARS, dest="min_chars")
+    p_compress.add_argument("--vacuum", action="store_true", help="VACUUM na de migratie (geeft ruimte terug)")
+    
+    # bench-semantic
+    p_bench = sub.add_parser("bench-semantic", help="Benchmark similarity query latency")
+    p_bench.add_argument("--n", type=int, default=100000)
+    p_bench.add_argument("--words", type=int, default=40)
+    p_bench.add_argument("--vocab", type=int, default=5000)
+    p_bench.add_argument("--queries", type=int, default=20)
+    
     args = parser.parse_args()
     
     if args.command == "inject":
         inject(args)
+    elif args.command == "flush":
+        flush(args)
     elif args.command == "search":
         search(args)
+    elif args.command == "archive":
+        archive(args)
+    elif args.command == "similar":
+        similar(args)
     elif args.command == "stats":
         stats(args)
     elif args.command == "export":
         export_data(args)
     elif args.command == "batch":
         batch_inject(args)
+    elif args.command == "dedupe":
+        dedupe(args)
+    elif args.command == "maintain":
+        maintain(args)
+    elif args.command == "compress":
+        compress(args)
+    elif args.command == "bench-semantic":
+        bench_semantic(args)
     else:
         parser.print_help()
 
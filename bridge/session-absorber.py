@@ -26,7 +26,8 @@ import os
 import sys
 from datetime import datetime
 
-BRIDGE = os.path.expanduser("~/Projects/Claude-Ecosystem-Dashboard/bridge/claude-mem-bridge.py")
+BRIDGE = os.path.expanduser(os.environ.get(
+    "CLAUDE_MEM_BRIDGE", "~/Projects/Claude-Ecosystem-Dashboard/bridge/claude-mem-bridge.py"))
 
 def get_clipboard():
     """Get content from macOS clipboard"""
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+CCC Offline Benchmark
+Start lokale stand-ins voor de Cloudflare Worker, Anthropic en Perplexity en meet
+end-to-end throughput van de scripts zonder live services.
+
+Scenario's:
+  dump     → dump_analyzer.run_once over N synthetische dump items
+  monitor  → perplexity_monitor.run_monitor over alle topics
+  api      → local_api routes onder concurrente GET load
+  absorb   → session-absorber.absorb_session in een tijdelijke claude-mem database
+
+Gebruik:
+  python3 scripts/benchmark.py                          # Alle scenario's
+  python3 scripts/benchmark.py --only dump,api          # Selectie
+  python3 scripts/benchmark.py --llm-latency 0.5 --error-rate 0.05 --payload 4000
+  python3 scripts/benchmark.py --iterations 5 --output logs/benchmarks.jsonl
+
+Output: één JSON record per run, toegevoegd aan logs/benchmarks.jsonl (met git commit),
+zodat performance-wijzigingen over tijd vergeleken kunnen worden.
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(SCRIPT_DIR))  # metrics / perplexity_monitor imports
+DEFAULT_OUTPUT = PROJECT_DIR / "logs" / "benchmarks.jsonl"
+SCENARIOS = ["dump", "monitor", "api", "absorb"]
+
+# Minimale kopie van het claude-mem schema (observations + external-content FTS5 + triggers)
+CLAUDE_MEM_SCHEMA = """
+CREATE TABLE observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, memory_session_id TEXT NOT NULL, project TEXT NOT NULL,
+    text TEXT, type TEXT NOT NULL, title TEXT, subtitle TEXT, facts TEXT, narrative TEXT, concepts TEXT,
+    files_read TEXT, files_modified TEXT, prompt_number INTEGER, created_at TEXT NOT NULL,
+    created_at_epoch INTEGER NOT NULL, discovery_tokens INTEGER DEFAULT 0
+);
+CREATE VIRTUAL TABLE observations_fts USING fts5(
+    title, subtitle, narrative, text, facts, concepts, content='observations', content_rowid='id'
+);
+CREATE TRIGGER observations_ai AFTER INSERT ON observations BEGIN
+    INSERT INTO observations_fts(rowid, title, subtitle, narrative, text, facts, concepts)
+    VALUES (new.id, new.title, new.subtitle, new.narrative, new.text, new.facts, new.concepts);
+END;
+CREATE TRIGGER observations_ad AFTER DELETE ON observations BEGIN
+    INSERT INTO observations_fts(observations_fts, rowid, title, subtitle, narrative, text, facts, concepts)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.narrative, old.text, old.facts, old.concepts);
+END;
+CREATE TRIGGER observations_au AFTER UPDATE ON observations BEGIN
+    INSERT INTO observations_fts(observations_fts, rowid, title, subtitle, narrative, text, facts, concepts)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.narrative, old.text, old.facts, old.concepts);
+    INSERT INTO observations_fts(rowid, title, subtitle, narrative, text, facts, concepts)
+    VALUES (new.id, new.title, new.subtitle, new.narrative, new.text, new.facts, new.concepts);
+END;
+"""
+
+WORDS = ("cloudflare worker deploy dashboard sqlite memory sync claude python react api "
+         "scam phishing extension chrome token budget latency cache index query").split()
+
+
+# ── Fake services ──
+class FakeServices:
+    """Eén HTTP server die Worker, Anthropic, Perplexity en webpagina's nabootst"""
+
+    def __init__(self, llm_latency, worker_latency, jitter, error_rate, payload, seed):
+        self.llm_latency = llm_latency
+        self.worker_latency = worker_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payload = payload
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.items = []
+        self.leases = {}   # item id → (token, expires) — zelfde semantiek als dump_leases in de Worker
+        self.counts = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _delay(self, base):
+        with self.lock:
+            delay = self.rng.gauss(base, base * self.jitter) if base else 0
+            fail = self.rng.random() < self.error_rate
+        time.sleep(max(0.0, delay))
+        return fail
+
+    def lease_op(self, op, body):
+        """Nabootsing van /api/dump/claim|renew|complete (aanroepen onder self.lock)"""
+        now = time.time()
+        ttl = body.get("ttl", 300)
+        by_id = {item["id"]: item for item in self.items}
+        if op == "claim":
+            token = uuid.uuid4().hex
+            claimed = []
+            for item in self.items:
+                if len(claimed) >= body.get("limit", 10):
+                    break
+                lease = self.leases.get(item["id"])
+                pending = not item.get("analysis") or item.get("analyzed_by") == "MM4-streaming"
+                if pending and (lease is None or lease[1] <= now):
+                    self.leases[item["id"]] = (token, now + ttl)
+                    claimed.append(dict(item))
+            return {"token": token, "owner": body.get("worker"), "expires": int(now + ttl), "items": claimed}
+        if op == "renew":
+            renewed = []
+            for item_id in body.get("ids", []):
+                lease = self.leases.get(item_id)
+                if lease and lease[0] == body.get("token") and lease[1] > now:
+                    self.leases[item_id] = (lease[0], now + ttl)
+                    renewed.append(item_id)
+                    if item_id in body.get("partial", {}):
+                        by_id[item_id].update(analysis=body["partial"][item_id], analyzed_by="MM4-streaming")
+            return {"renewed": renewed, "lost": [i for i in body.get("ids", []) if i not in renewed]}
+        # complete — fencing: alleen schrijven als de lease nog van deze token is
+        committed = []
+        for result in body.get("results", []):
+            lease = self.leases.get(result["id"])
+            if lease and lease[0] == body.get("token") and result["id"] in by_id:
+                by_id[result["id"]].update(analysis=result["analysis"], analyzed=True,
+                                           analyzed_by=result.get("analyzed_by"), analyzed_at=result.get("analyzed_at"))
+                del self.leases[result["id"]]
+                committed.append(result["id"])
+        for item_id in body.get("release", []):
+            if self.leases.get(item_id, (None,))[0] == body.get("token"):
+                del self.leases[item_id]
+        return {"committed": committed,
+                "rejected": [r["id"] for r in body.get("results", []) if r["id"] not in committed]}
+
+    def _text(self, n):
+        with self.lock:
+            words = self.rng.choices(WORDS, k=max(1, n // 7))
+        return " ".join(words)[:n]
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, data, status=200, content_type="application/json"):
+                body = json.dumps(data).encode("utf-8") if content_type == "application/json" else data
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if urlparse(self.path).path == "/api/dump":
+                    services._count("worker_get_dump")
+                    services._delay(services.worker_latency)
+                    with services.lock:
+                        items = list(services.items)
+                    self._send({"items": items})
+                elif self.path.startswith("/page/"):
+                    services._count("page")
+                    services._delay(services.worker_latency)
+                    html = f"<html><head><title>Page {self.path}</title></head><body><p>{services._text(services.payload * 4)}</p></body></html>"
+                    self._send(html.encode("utf-8"), content_type="text/html")
+                else:
+                    self._send({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = self._body()
+                path = urlparse(self.path).path
+                if path == "/api/dump":
+                    services._count("worker_post_dump")
+                    services._delay(services.worker_latency)
+                    with services.lock:
+                        services.items = body.get("items", [])
+                    self._send({"count": len(body.get("items", []))})
+                elif path in ("/api/dump/claim", "/api/dump/renew", "/api/dump/complete"):
+                    services._count("worker_" + path.rsplit("/", 1)[1])
+                    services._delay(services.worker_latency)
+                    with services.lock:
+                        self._send(services.lease_op(path.rsplit("/", 1)[1], body))
+                elif self.path.startswith("/api/ai") or self.path.startswith("/v1/messages"):
+                    services._count("anthropic")
+                    if services._delay(services.llm_latency):
+                        services._count("anthropic_error")
+                        self._send({"type": "error", "error": {"type": "overloaded_error", "message": "injected"}}, 529)
+                        return
+                    self._send({
+                        "content": [{"type": "text", "text": "- " + services._text(services.payload)}],
+                        "usage": {"input_tokens": len(json.dumps(body)) // 4, "output_tokens": services.payload // 4},
+                        "model": body.get("model", "fake"),
+                    })
+                elif self.path.startswith("/chat/completions"):
+                    services._count("perplexity")
+                    if services._delay(services.llm_latency):
+                        services._count("perplexity_error")
+                        self._send({"error": "rate limited"}, 429)
+                        return
+                    self._send({
+                        "choices": [{"message": {"content": "- " + services._text(services.payload)}}],
+                        "citations": [f"https://example.com/{i}" for i in range(5)],
+                        "related_questions": ["q1", "q2"],
+                        "usage": {"total_tokens": services.payload // 3},
+                        "model": "sonar",
+                    })
+                else:
+                    self._send({"error": "not found"}, 404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ── Helpers ──
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def timing_stats(durations):
+    return {
+        "runs": len(durations),
+        "p50_sec": round(pct(durations, 0.5), 4),
+        "p95_sec": round(pct(durations, 0.95), 4),
+        "mean_sec": round(sum(durations) / len(durations), 4) if durations else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ── Scenario's ──
+def bench_dump(args, fakes, tmp):
+    """dump_analyzer.run_once over een verse batch pending items per iteratie"""
+    try:
+        dump_analyzer = load_module("dump_analyzer", SCRIPT_DIR / "dump_analyzer.py")
+    except ImportError as e:
+        return {"skipped": f"import mislukt: {e}"}
+    dump_analyzer.TRACE_FILE = tmp / "dump_traces.jsonl"
+
+    rng = random.Random(args.seed)
+    types = ["note", "twitter", "instagram", "article", "link", "github"]
+    durations = []
+    for it in range(args.iterations):
+        items = []
+        for n in range(args.items):
+            item_type = rng.choice(types)
+            content = f"{fakes.url}/page/{n}" if item_type in ("article", "link", "github") else f"{' '.join(rng.choices(WORDS, k=12))}"
+            items.append({"id": f"bench-{it}-{n}", "type": item_type, "content": content,
+                          "memo": rng.choice(["", "focus op kosten"])})
+        with fakes.lock:
+            fakes.items = items
+            fakes.leases = {}
+        t0 = time.perf_counter()
+        with quiet(not args.verbose):
+            dump_analyzer.run_once()
+        durations.append(time.perf_counter() - t0)
+
+    with fakes.lock:
+        analyzed = sum(1 for item in fakes.items if item.get("analyzed"))
+    stats = timing_stats(durations)
+    stats["analyzed_last_run"] = analyzed
+    stats["items_per_sec"] = round(args.items / stats["mean_sec"], 2) if stats["mean_sec"] else None
+    return stats
+
+
+def bench_monitor(args, fakes, tmp):
+    """perplexity_monitor.run_monitor over alle topics (rate limit delay op 0)"""
+    monitor = load_module("perplexity_monitor", SCRIPT_DIR / "perplexity_monitor.py")
+    sys.modules["perplexity_monitor"] = monitor
+    durations = []
+    for _ in range(args.iterations):
+        t0 = time.perf_counter()
+        with quiet(not args.verbose):
+            monitor.run_monitor(providers=["perplexity"])
+        durations.append(time.perf_counter() - t0)
+
+    stats = timing_stats(durations)
+    stats["topics_per_sec"] = round(len(monitor.TOPICS) / stats["mean_sec"], 2) if stats["mean_sec"] else None
+    return stats
+
+
+def bench_api(args, fakes, tmp):
+    """local_api GET routes onder concurrente load"""
+    if "perplexity_monitor" not in sys.modules:
+        monitor = load_module("perplexity_monitor", SCRIPT_DIR / "perplexity_monitor.py")
+        sys.modules["perplexity_monitor"] = monitor
+        with quiet(not args.verbose):
+            monitor.run_monitor(providers=["perplexity"])  # Zorg voor een gevulde feed
+    local_api = load_module("local_api", SCRIPT_DIR / "local_api.py")
+    local_api.LocalAPIHandler.log_message = lambda *a: None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), local_api.LocalAPIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def fetch(route):
+        t0 = time.perf_counter()
+        with urlopen(base + route, timeout=10) as r:
+            size = len(r.read())
+        return time.perf_counter() - t0, size
+
+    results = {}
+    try:
+        for route in args.routes:
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                samples = list(pool.map(lambda _: fetch(route), range(args.requests)))
+            wall = time.perf_counter() - t0
+            latencies = [s[0] for s in samples]
+            results[route] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / wall, 1),
+                "p50_ms": round(pct(latencies, 0.5) * 1000, 2),
+                "p95_ms": round(pct(latencies, 0.95) * 1000, 2),
+                "bytes": samples[0][1] if samples else 0,
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def bench_absorb(args, fakes, tmp):
+    """session-absorber.absorb_session in een tijdelijke claude-mem database"""
+    db_path = tmp / "claude-mem.db"
+    db = sqlite3.connect(db_path)
+    db.executescript(CLAUDE_MEM_SCHEMA)
+    db.close()
+    os.environ["CLAUDE_MEM_DB"] = str(db_path)
+    os.environ["CLAUDE_MEM_BRIDGE"] = str(PROJECT_DIR / "bridge" / "claude-mem-bridge.py")
+    absorber = load_module("session_absorber", PROJECT_DIR / "bridge" / "session-absorber.py")
+
+    rng = random.Random(args.seed)
+    durations = []
+    for n in range(args.sessions):
+        sentences = []
+        for _ in range(40):
+            verb = rng.choice(["We decided", "Fixed", "Discovered that", "Deployed", "Changed"])
+            sentences.append(f"{verb} {' '.join(rng.choices(WORDS, k=14))} in /src/app{n}.py.")
+        text = f"Title: bench session {n}\n" + " ".join(sentences)
+        t0 = time.perf_counter()
+        with quiet(not args.verbose):
+            absorber.absorb_session(text, "bench", verbose=False)
+        durations.append(time.perf_counter() - t0)
+
+    db = sqlite3.connect(db_path)
+    observations = db.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+    db.close()
+    stats = timing_stats(durations)
+    stats["observations"] = observations
+    stats["sessions_per_sec"] = round(len(durations) / sum(durations), 2) if durations else None
+    return stats
+
+
+# ── Main ──
+def main():
+    parser = argparse.ArgumentParser(description="CCC offline benchmark met lokale stand-ins")
+    parser.add_argument("--only", type=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+                        default=SCENARIOS, help=f"Komma-gescheiden scenario's ({', '.join(SCENARIOS)})")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--items", type=int, default=20, help="Dump items per iteratie")
+    parser.add_argument("--sessions", type=int, default=5, help="Sessies voor absorb")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per API route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--routes", type=lambda v: v.split(","),
+                        default=["/health", "/api/intelligence/feed", "/api/intelligence/history", "/metrics"])
+    parser.add_argument("--llm-latency", type=float, default=0.2, dest="llm_latency", help="Seconden per LLM call")
+    parser.add_argument("--worker-latency", type=float, default=0.02, dest="worker_latency")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relatieve standaardafwijking van de latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, dest="error_rate")
+    parser.add_argument("--payload", type=int, default=1500, help="Tekens per LLM antwoord")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--verbose", action="store_true", help="Toon output van de scripts")
+    args = parser.parse_args()
+
+    unknown = [s for s in args.only if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Onbekende scenario's: {', '.join(unknown)}")
+
+    fakes = FakeServices(args.llm_latency, args.worker_latency, args.jitter,
+                         args.error_rate, args.payload, args.seed).start()
+
+    with tempfile.TemporaryDirectory(prefix="ccc-bench-") as tmp:
+        tmp = Path(tmp)
+        # Vóór het importeren van de scripts: alle endpoints naar de stand-ins
+        os.environ.update({
+            "CCC_WORKER_API": fakes.url,
+            "ANTHROPIC_API_URL": f"{fakes.url}/v1/messages",
+            "ANTHROPIC_API_KEY": "bench-key",
+            "PERPLEXITY_API_URL": f"{fakes.url}/chat/completions",
+            "PERPLEXITY_API_KEY": "bench-key",
+            "INTEL_OUTPUT_DIR": str(tmp / "data"),
+            "CCC_OUTBOX_DB": str(tmp / "dump_outbox.db"),
+            "INTEL_RATE_LIMIT_DELAY": "0",
+        })
+
+        print("=" * 60)
+        print("⏱  CCC Offline Benchmark")
+        print(f"   LLM {args.llm_latency}s ±{args.jitter:.0%}, worker {args.worker_latency}s, "
+              f"errors {args.error_rate:.0%}, payload {args.payload} chars")
+        print("=" * 60)
+
+        results = {}
+        runners = {"dump": bench_dump, "monitor": bench_monitor, "api": bench_api, "absorb": bench_absorb}
+        for name in SCENARIOS:
+            if name not in args.only:
+                continue
+            print(f"\n▶ {name}...")
+            try:
+                results[name] = runners[name](args, fakes, tmp)
+            except Exception as e:
+                results[name] = {"error": str(e)}
+            print(f"  {json.dumps(results[name], ensure_ascii=False)}")
+
+    fakes.stop()
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "service_calls": fakes.counts,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    print(f"\n💾 Resultaten toegevoegd aan {args.output}")
+
+
+if __name__ == "__main__":
+    main()
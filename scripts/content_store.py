@@ -0,0 +1,194 @@
+"""
+Versioned content store voor intelligence topics
+Bewaart elke scan-uitkomst per topic als regel-delta t.o.v. de vorige versie,
+met een novelty score (nieuwe bronnen, gewijzigde bullet points).
+
+Opslag: <OUTPUT_DIR>/versions/<topic_id>.jsonl — één record per versie:
+  {"version": 3, "scanned_at": "...", "hash": "...", "delta": [["=", 4], ["-", 1], ["+", ["- nieuw punt"]]],
+   "citations": [...], "new_citations": [...], "added_bullets": [...], "removed_bullets": [...], "novelty": 0.4}
+Elke KEYFRAME_EVERY versies staat de volledige tekst in "base" i.p.v. "delta",
+zodat reconstructie begrensd blijft.
+
+Gebruik:
+  from content_store import record_version, changes_since, content_at
+  record_version("phishing_trends", content, citations, scanned_at)
+  changes_since("phishing_trends", since="2026-02-01T00:00:00+00:00")   # of since=3 (versienummer)
+  content_at("phishing_trends", version=3)                        # → {"version", "content", ...}
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = Path(os.environ.get("INTEL_OUTPUT_DIR", SCRIPT_DIR.parent / "public" / "data"))
+VERSIONS_DIR = OUTPUT_DIR / "versions"
+
+KEYFRAME_EVERY = 20
+BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+_lock = threading.Lock()
+
+
+def _path(topic_id):
+    return VERSIONS_DIR / f"{topic_id}.jsonl"
+
+
+def _read(topic_id):
+    path = _path(topic_id)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_delta(old_lines, new_lines):
+    """Regel-delta: ["=", n] behouden, ["-", n] overslaan, ["+", [regels]] invoegen"""
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(old_lines, ops):
+    out, pos = [], 0
+    for op, arg in ops:
+        if op == "=":
+            out.extend(old_lines[pos:pos + arg])
+            pos += arg
+        elif op == "-":
+            pos += arg
+        else:
+            out.extend(arg)
+    return out
+
+
+def _bullets(lines):
+    return {BULLET_RE.sub("", line).strip() for line in lines if BULLET_RE.match(line)}
+
+
+def _reconstruct(records, version):
+    """Tekstregels van een versie: laatste keyframe ≤ version + deltas daarna"""
+    lines = None
+    for record in records:
+        if record["version"] > version:
+            break
+        if "base" in record:
+            lines = list(record["base"])
+        elif lines is not None:
+            lines = apply_delta(lines, record["delta"])
+    return lines
+
+
+def record_version(topic_id, content, citations, scanned_at=None):
+    """Sla een nieuwe versie op en geef het record terug. Identieke tekst: geen nieuwe versie, wel een record
+    met het bestaande versienummer en novelty 0 (deze scan bracht niets nieuws)."""
+    scanned_at = scanned_at or datetime.now(timezone.utc).isoformat()
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    new_lines = content.splitlines()
+
+    with _lock:
+        records = _read(topic_id)
+        previous = records[-1] if records else None
+        if previous and previous["hash"] == digest:
+            return {**previous, "scanned_at": scanned_at, "citations": list(citations), "new_citations": [],
+                    "added_bullets": [], "removed_bullets": [], "novelty": 0.0}
+
+        old_lines = _reconstruct(records, previous["version"]) if previous else []
+        old_citations = set(previous["citations"]) if previous else set()
+        old_bullets, new_bullets = _bullets(old_lines), _bullets(new_lines)
+
+        added = [b for b in new_bullets if b not in old_bullets]
+        removed = [b for b in old_bullets if b not in new_bullets]
+        new_citations = [c for c in citations if c not in old_citations]
+        total = len(new_bullets) + len(citations)
+        novelty = round((len(added) + len(new_citations)) / total, 3) if total else 0.0
+
+        version = previous["version"] + 1 if previous else 1
+        record = {"version": version, "scanned_at": scanned_at, "hash": digest}
+        if previous is None or version % KEYFRAME_EVERY == 1:
+            record["base"] = new_lines
+        else:
+            record["delta"] = make_delta(old_lines, new_lines)
+        record.update({
+            "citations": list(citations),
+            "new_citations": new_citations,
+            "added_bullets": sorted(added),
+            "removed_bullets": sorted(removed),
+            "novelty": novelty if previous else 1.0,
+        })
+
+        path = _path(topic_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+
+def _since_filter(since):
+    """since: versienummer (int of cijferstring) of ISO timestamp"""
+    if since is None:
+        return None
+    if isinstance(since, int) or str(since).isdigit():
+        return lambda r: r["version"] > int(since)
+    ts = datetime.fromisoformat(str(since).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return lambda r: datetime.fromisoformat(r["scanned_at"]) > ts
+
+
+def changes_since(topic_id, since=None):
+    """Wijzigingen na `since` (of alleen de laatste versie). Deltas zijn t.o.v. de vorige versie;
+    keyframes worden als delta vanaf de vorige versie teruggegeven zodat de client alleen diffs ontvangt."""
+    with _lock:
+        records = _read(topic_id)
+    if not records:
+        return {"topic": topic_id, "latest_version": 0, "changes": []}
+
+    keep = _since_filter(since) or (lambda r: r is records[-1])
+    changes = []
+    for record in records:
+        if not keep(record):
+            continue
+        delta = record.get("delta")
+        if delta is None:
+            previous = _reconstruct(records, record["version"] - 1) or []
+            delta = make_delta(previous, record["base"])
+        changes.append({
+            "version": record["version"],
+            "scanned_at": record["scanned_at"],
+            "novelty": record["novelty"],
+            "added_bullets": record["added_bullets"],
+            "removed_bullets": record["removed_bullets"],
+            "new_citations": record["new_citations"],
+            "delta": delta,
+        })
+    return {"topic": topic_id, "latest_version": records[-1]["version"], "changes": changes}
+
+
+def content_at(topic_id, version=None):
+    """Volledige tekst van een versie (standaard: de laatste), of None"""
+    with _lock:
+        records = _read(topic_id)
+    if not records:
+        return None
+    version = records[-1]["version"] if version is None else int(version)
+    if version > records[-1]["version"]:
+        return None
+    lines = _reconstruct(records, version)
+    if lines is None:
+        return None
+    record = records[version - 1]
+    return {"topic": topic_id, "version": version, "scanned_at": record["scanned_at"],
+            "novelty": record["novelty"], "content": "\n".join(lines)}
@@ -4,19 +4,24 @@ DUMP ANALYZER — Lokale analyse daemon voor CCC Dump items
 Draait op Mac Mini M4, pollt de cloud, analyseert alles lokaal.
 
 Flow:
-  1. Haal dump items op van Cloudflare Worker (GET /api/dump)
-  2. Filter items zonder analyse (analyzed == false)
-  3. Per type: download content, analyseer met Claude API
-  4. Schrijf resultaten terug naar cloud (POST /api/dump)
+  1. Claim pending items met een lease (POST /api/dump/claim) — of, bij een oudere Worker,
+     haal alle dump items op (GET /api/dump) en filter items zonder analyse
+  2. Per type: download content, analyseer met Claude API (lease wordt intussen verlengd)
+  3. Schrijf resultaten terug (POST /api/dump/complete, alleen onder geldige lease — of POST /api/dump)
+  Meerdere analyzers (Mac Mini + tweede machine) verdelen zo het werk zonder dubbel analyseren.
 
 Gebruik:
   python3 scripts/dump_analyzer.py              # Eenmalig draaien
   python3 scripts/dump_analyzer.py --daemon     # Continue polling (elke 60s)
   python3 scripts/dump_analyzer.py --interval 30  # Custom interval
+  python3 scripts/dump_analyzer.py --profile      # cProfile rond de run, gesorteerde stats
+  python3 scripts/dump_analyzer.py --trace /tmp/traces.jsonl  # Spans naar ander bestand
+  python3 scripts/dump_analyzer.py --batch-size 1  # Korte items niet bundelen
+  python3 scripts/dump_analyzer.py --stream        # Deelanalyse live naar de cloud tijdens generatie (lease mode)
 
 Types:
-  youtube   → yt-dlp transcript → Claude analyse
-  article   → Webpagina tekst → Claude samenvatting
+  youtube   → yt-dlp transcript → Claude analyse (lang: chunks parallel → samenvoegen)
+  article   → Webpagina tekst → Claude samenvatting (lang: chunks parallel → samenvoegen)
   link      → Webpagina tekst → Claude samenvatting
   instagram → URL context → Claude analyse
   twitter   → URL context → Claude analyse
@@ -29,21 +34,67 @@ import os
 import sys
 import time
 import signal
+import socket
+import sqlite3
 import argparse
+import re
 import subprocess
+import threading
+import contextvars
 import httpx
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 # ── Config ──
-WORKER_API = "https://claude-control-center.franky-f29.workers.dev"
-ANTHROPIC_API = "https://api.anthropic.com/v1/messages"
+# Endpoints overschrijfbaar via env (benchmark/tests tegen lokale stand-ins)
+WORKER_API = os.environ.get("CCC_WORKER_API", "https://claude-control-center.franky-f29.workers.dev")
+ANTHROPIC_API = os.environ.get("ANTHROPIC_API_URL", "https://api.anthropic.com/v1/messages")
 ANTHROPIC_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"
 MAX_TOKENS = 2000
+# Model routing: eerste regel die past wint. Velden: types, min_chars/max_chars (prompt), memo (True/False)
+# Overschrijfbaar met --routes <json> of CCC_MODEL_ROUTES=<pad>
+ROUTES = [
+    {"name": "chunk", "types": ["chunk"], "model": FAST_MODEL, "max_tokens": 600},
+    {"name": "batch", "types": ["batch"], "model": MODEL, "max_tokens": 4800},
+    {"name": "short-generic", "types": ["note", "instagram", "twitter"], "memo": False, "max_chars": 1500,
+     "model": FAST_MODEL, "max_tokens": 600},
+    {"name": "short-targeted", "types": ["note", "instagram", "twitter"], "max_chars": 1500,
+     "model": MODEL, "max_tokens": 800},
+    {"name": "long", "min_chars": 6000, "model": MODEL, "max_tokens": MAX_TOKENS},
+    {"name": "default", "model": MODEL, "max_tokens": MAX_TOKENS},
+]
 POLL_INTERVAL = 60  # seconds
+# Korte items (alleen URL + memo) bundelen in één prompt; 1 = elk item apart
+BATCH_TYPES = ("instagram", "twitter", "note")
+BATCH_SIZE = 8
+BATCH_ITEM_TOKENS = 600
+# Streaming: deelanalyse tijdens generatie naar de cloud (--stream)
+STREAM = False
+STREAM_FLUSH_SECONDS = 2.0
+STREAMING_MARKER = "MM4-streaming"
+# Leases: meerdere analyzers naast elkaar, elk item door precies één (Worker /api/dump/claim)
+WORKER_ID = os.environ.get("CCC_ANALYZER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEASE_TTL = 300  # seconds
+CLAIM_LIMIT = 20
+# Lange transcripts/artikelen: chunks parallel samenvatten (map), dan samenvoegen (reduce)
+MAX_SOURCE_CHARS = 200_000
+CHUNK_CHARS = 6000
+CHUNK_OVERLAP = 200
+MAP_WORKERS = 4
 # Als geen lokale key, gebruik Worker als proxy
 USE_WORKER_PROXY = not bool(ANTHROPIC_KEY)
+LOG_DIR = Path(__file__).parent.parent / "logs"
+TRACE_FILE = LOG_DIR / "dump_traces.jsonl"
+PROFILE_FILE = LOG_DIR / "dump_analyzer.prof"
+# Outbox: elke afgeronde analyse eerst lokaal, dan pas naar de cloud
+OUTBOX_DB = Path(os.environ.get("CCC_OUTBOX_DB", LOG_DIR / "dump_outbox.db"))
+OUTBOX_BATCH = 50
+OUTBOX_MAX_BACKOFF = 600  # seconds
+OUTBOX_KEEP_DAYS = 30
 
 # ── Logging ──
 def log(msg):
@@ -54,12 +105,107 @@ def log_err(msg):
     ts = datetime.now().strftime("%H:%M:%S")
     print(f"[{ts}] ERROR: {msg}", file=sys.stderr)
 
+# ── Tracing ──
+# Elke span → één JSONL regel in TRACE_FILE; per cycle ook een p50/p95 samenvatting
+_trace_item = contextvars.ContextVar("trace_item", default={})
+_trace_lock = threading.Lock()
+cycle_spans = []
+cycle_id = None
+
+@contextmanager
+def span(stage, **attrs):
+    """Meet een stage; attrs (bytes, prompt_chars, ...) mogen binnen de span aangevuld worden."""
+    record = {"stage": stage, **_trace_item.get(), **attrs}
+    t0 = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = str(e)[:200]
+        raise
+    finally:
+        record["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        record["ts"] = datetime.now().isoformat(timespec="milliseconds")
+        record["cycle"] = cycle_id
+        with _trace_lock:
+            cycle_spans.append(record)
+            try:
+                TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                with open(TRACE_FILE, "a") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
+@contextmanager
+def trace_item(item):
+    """Koppel alle spans binnen dit blok aan een dump item (id + type)."""
+    token = _trace_item.set({"item_id": item.get("id"), "item_type": item.get("type", "note"),
+                             "memo": bool((item.get("memo") or "").strip())})
+    try:
+        yield
+    finally:
+        _trace_item.reset(token)
+
+def start_cycle():
+    global cycle_id
+    with _trace_lock:
+        cycle_spans.clear()
+        cycle_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def print_cycle_summary():
+    """Tabel met p50/p95 per stage en per item type voor de afgelopen cycle."""
+    with _trace_lock:
+        spans = list(cycle_spans)
+    if not spans:
+        return
+
+    def table(title, groups):
+        log(f"⏱  {title:<22} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'totaal s':>9}")
+        for name, values in sorted(groups.items(), key=lambda kv: -sum(kv[1])):
+            log(f"   {name:<22} {len(values):>4} {_pct(values, 0.5):>9.0f} {_pct(values, 0.95):>9.0f} {sum(values) / 1000:>9.1f}")
+
+    by_stage, by_type = {}, {}
+    for record in spans:
+        by_stage.setdefault(record["stage"], []).append(record["ms"])
+        if record["stage"] == "item":
+            by_type.setdefault(record.get("item_type", "?"), []).append(record["ms"])
+    table("stage", by_stage)
+    if by_type:
+        table("item type", by_type)
+
+    by_route, tokens = {}, {}
+    for record in spans:
+        if record["stage"] == "ask_claude" and record.get("model_route"):
+            by_route.setdefault(record["model_route"], []).append(record["ms"])
+            t = tokens.setdefault(record["model_route"], [0, 0])
+            t[0] += record.get("input_tokens") or 0
+            t[1] += record.get("output_tokens") or 0
+    if by_route:
+        table("model route", by_route)
+        for name, (tin, tout) in sorted(tokens.items()):
+            log(f"   {name:<22} {tin:>8} in {tout:>8} out tokens")
+
+    calls = [r for r in spans if r["stage"] == "ask_claude" and r.get("input_tokens") is not None]
+    if calls:
+        cache_read = sum(r.get("cache_read_tokens") or 0 for r in calls)
+        cache_write = sum(r.get("cache_write_tokens") or 0 for r in calls)
+        uncached = sum(r["input_tokens"] or 0 for r in calls)
+        total = cache_read + cache_write + uncached
+        share = f"{cache_read / total:.0%}" if total else "0%"
+        log(f"🧊 Prompt cache: {cache_read} read / {cache_write} write / {uncached} ongecached input tokens "
+            f"over {len(calls)} calls ({share} uit cache)")
+
 # ── Cloud API ──
 def get_dump_items():
     """Haal alle dump items op van de cloud."""
     try:
-        r = httpx.get(f"{WORKER_API}/api/dump", timeout=15)
-        data = r.json()
+        with span("get_dump_items") as sp:
+            r = httpx.get(f"{WORKER_API}/api/dump", timeout=15)
+            sp["bytes"] = len(r.content)
+            data = r.json()
         return data.get("items", [])
     except Exception as e:
         log_err(f"GET dump failed: {e}")
@@ -68,25 +214,251 @@ def get_dump_items():
 def save_dump_items(items):
     """Sla alle dump items op naar de cloud."""
     try:
-        r = httpx.post(f"{WORKER_API}/api/dump", json={"items": items, "source": "MM4-analyzer"}, timeout=15)
-        data = r.json()
+        with span("save_dump_items", items=len(items)) as sp:
+            r = httpx.post(f"{WORKER_API}/api/dump", json={"items": items, "source": "MM4-analyzer"}, timeout=15)
+            r.raise_for_status()
+            sp["bytes"] = len(r.request.content)
+            data = r.json()
         log(f"Saved {data.get('count', '?')} items to cloud")
         return True
     except Exception as e:
         log_err(f"POST dump failed: {e}")
         return False
 
+# ── Leases (multi-analyzer) ──
+def claim_items(limit=None):
+    """Claim pending items met een lease. None = Worker zonder lease-endpoints → klassieke flow."""
+    limit = limit or CLAIM_LIMIT
+    try:
+        with span("claim_items", limit=limit) as sp:
+            r = httpx.post(f"{WORKER_API}/api/dump/claim",
+                           json={"worker": WORKER_ID, "limit": limit, "ttl": LEASE_TTL}, timeout=15)
+            if r.status_code in (404, 501):
+                return None
+            data = r.json()
+            sp["items"] = len(data.get("items", []))
+        return data
+    except Exception as e:
+        log_err(f"Claim failed: {e}")
+        return {"token": None, "items": []}
+
+def renew_lease(token, ids, partial=None):
+    """Verleng de lease; geeft de ids terug die we kwijt zijn (verlopen en door een ander geclaimd)."""
+    try:
+        body = {"token": token, "ids": ids, "ttl": LEASE_TTL}
+        if partial:
+            body["partial"] = partial
+        with span("renew_lease", items=len(ids)):
+            r = httpx.post(f"{WORKER_API}/api/dump/renew", json=body, timeout=15)
+            return set(r.json().get("lost", []))
+    except Exception as e:
+        log_err(f"Lease renew failed: {e}")
+        return set()
+
+def complete_items(token, results, release):
+    """Schrijf resultaten onder de lease weg en geef onafgemaakte items vrij.
+    Geeft (committed, rejected), of (None, None) als de Worker onbereikbaar is."""
+    try:
+        with span("complete_items", items=len(results)) as sp:
+            r = httpx.post(f"{WORKER_API}/api/dump/complete",
+                           json={"token": token, "results": results, "release": release}, timeout=30)
+            r.raise_for_status()
+            sp["bytes"] = len(r.request.content)
+            data = r.json()
+        return data.get("committed", []), data.get("rejected", [])
+    except Exception as e:
+        log_err(f"Complete failed: {e}")
+        return None, None
+
+class LeaseKeeper:
+    """Houdt een lease levend (renew elke TTL/3) zolang er geanalyseerd wordt."""
+
+    def __init__(self, token, ids):
+        self.token = token
+        self.ids = list(ids)
+        self.lost = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(LEASE_TTL / 3):
+            self._renew()
+
+    def _renew(self, partial=None):
+        ids = [i for i in self.ids if i not in self.lost]
+        if ids:
+            lost = renew_lease(self.token, ids, partial)
+            if lost - self.lost:
+                log(f"  ⚠️  Lease kwijt voor {len(lost - self.lost)} items (verlopen, door andere analyzer geclaimd)")
+            self.lost |= lost
+
+    def publish_partial(self, item):
+        """Streaming writeback onder de lease (verlengt meteen)."""
+        self._renew({item["id"]: item["analysis"]})
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+# ── Outbox ──
+# Item ids komen als JSON-waarde binnen (int of string) en gaan zo ook weer terug
+_outbox_lock = threading.Lock()
+
+def _outbox():
+    OUTBOX_DB.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(OUTBOX_DB, timeout=10)
+    db.row_factory = sqlite3.Row
+    db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+        item_key TEXT PRIMARY KEY,
+        analysis TEXT NOT NULL,
+        analyzed_by TEXT,
+        analyzed_at TEXT,
+        lease_token TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt REAL NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        flushed_at REAL
+    )""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, next_attempt)")
+    return db
+
+def _key(item_id):
+    return json.dumps(item_id)
+
+def outbox_put(item, lease_token=None):
+    """Leg een afgeronde analyse vast vóór hij naar de cloud gaat (opnieuw vastleggen = opnieuw versturen)."""
+    with _outbox_lock:
+        db = _outbox()
+        with db:
+            db.execute("""INSERT INTO outbox (item_key, analysis, analyzed_by, analyzed_at, lease_token, created_at)
+                          VALUES (?, ?, ?, ?, ?, ?)
+                          ON CONFLICT(item_key) DO UPDATE SET analysis = excluded.analysis,
+                              analyzed_by = excluded.analyzed_by, analyzed_at = excluded.analyzed_at,
+                              lease_token = excluded.lease_token, status = 'pending', attempts = 0,
+                              next_attempt = 0, flushed_at = NULL""",
+                       (_key(item["id"]), item["analysis"], item.get("analyzed_by"), item.get("analyzed_at"),
+                        lease_token, time.time()))
+        db.close()
+
+def outbox_lookup(ids):
+    """{id: row} voor items met een afgeronde analyse die nog nooit in de cloud is beland (status 'pending').
+    Geflushte rijen tellen niet mee: staat zo'n item weer zonder analyse in de cloud, dan is hij bewust
+    gereset (♻️ in het dashboard) en hoort er een verse analyse te komen. Geweigerde rijen evenmin."""
+    if not ids:
+        return {}
+    with _outbox_lock:
+        db = _outbox()
+        keys = [_key(i) for i in ids]
+        rows = db.execute(f"""SELECT * FROM outbox WHERE item_key IN ({','.join('?' * len(keys))})
+                              AND status = 'pending'
+                              AND analysis IS NOT NULL AND analysis != ''""", keys).fetchall()
+        db.close()
+    return {json.loads(r["item_key"]): dict(r) for r in rows}
+
+def outbox_mark(ids, status):
+    if not ids:
+        return
+    with _outbox_lock:
+        db = _outbox()
+        with db:
+            db.executemany("UPDATE outbox SET status = ?, flushed_at = ? WHERE item_key = ?",
+                           [(status, time.time(), _key(i)) for i in ids])
+        db.close()
+
+def outbox_backoff(ids):
+    """Exponentiële backoff per item: 10s, 20s, 40s … max OUTBOX_MAX_BACKOFF."""
+    if not ids:
+        return
+    now = time.time()
+    with _outbox_lock:
+        db = _outbox()
+        with db:
+            db.executemany(f"""UPDATE outbox SET attempts = attempts + 1,
+                               next_attempt = ? + MIN({OUTBOX_MAX_BACKOFF}, 10 * (1 << MIN(attempts, 10)))
+                               WHERE item_key = ?""", [(now, _key(i)) for i in ids])
+        db.close()
+
+def outbox_due():
+    with _outbox_lock:
+        db = _outbox()
+        rows = db.execute("SELECT * FROM outbox WHERE status = 'pending' AND next_attempt <= ? ORDER BY created_at",
+                          (time.time(),)).fetchall()
+        with db:
+            db.execute("DELETE FROM outbox WHERE status != 'pending' AND flushed_at < ?",
+                       (time.time() - OUTBOX_KEEP_DAYS * 86400,))
+        db.close()
+    return [{**dict(r), "id": json.loads(r["item_key"])} for r in rows]
+
+def _outbox_result(row):
+    return {"id": row["id"], "analysis": row["analysis"], "analyzed_by": row["analyzed_by"],
+            "analyzed_at": row["analyzed_at"]}
+
+def flush_outbox(lease_mode):
+    """Verstuur achtergebleven analyses in batches; mislukt → backoff, niets gaat verloren."""
+    rows = outbox_due()
+    if not rows:
+        return
+    log(f"📮 Outbox: {len(rows)} analyses nog niet in de cloud — opnieuw versturen")
+    with span("flush_outbox", items=len(rows)):
+        for start in range(0, len(rows), OUTBOX_BATCH):
+            batch = rows[start:start + OUTBOX_BATCH]
+            if lease_mode:
+                _flush_leased(batch)
+            elif not _flush_full_list(batch):
+                # Worker onbereikbaar: rest van de outbox ook uitstellen
+                outbox_backoff([r["id"] for r in rows[start + OUTBOX_BATCH:]])
+                return
+
+def _flush_leased(batch):
+    # Zonder token wachten tot het item opnieuw geclaimd wordt; analyze_pending vult het dan uit de outbox
+    by_token = {}
+    for row in batch:
+        if row["lease_token"]:
+            by_token.setdefault(row["lease_token"], []).append(row)
+    for token, group in by_token.items():
+        committed, rejected = complete_items(token, [_outbox_result(r) for r in group], [])
+        if committed is None:
+            outbox_backoff([r["id"] for r in group])
+            continue
+        outbox_mark(committed, "flushed")
+        outbox_mark(rejected, "rejected")
+
+def _flush_full_list(batch):
+    items = get_dump_items()
+    ids = [r["id"] for r in batch]
+    if not items:
+        outbox_backoff(ids)
+        return False
+    by_id = {r["id"]: r for r in batch}
+    for item in items:
+        row = by_id.get(item.get("id"))
+        if row and (not item.get("analysis") or item.get("analyzed_by") == STREAMING_MARKER):
+            item.pop("analyzing", None)
+            item.update(_outbox_result(row), analyzed=True)
+    if not save_dump_items(items):
+        outbox_backoff(ids)
+        return False
+    outbox_mark(ids, "flushed")
+    return True
+
 # ── Content Fetchers ──
 def fetch_youtube_transcript(url):
     """Haal YouTube transcript op via yt-dlp."""
     try:
         # Probeer eerst auto-generated subtitles
-        result = subprocess.run(
-            ["yt-dlp", "--skip-download", "--write-auto-sub", "--sub-lang", "en,nl",
-             "--convert-subs", "srt", "--print", "title", "--print", "description",
-             "-o", "/tmp/yt_dump_%(id)s", url],
-            capture_output=True, text=True, timeout=30
-        )
+        with span("yt_dlp") as sp:
+            result = subprocess.run(
+                ["yt-dlp", "--skip-download", "--write-auto-sub", "--sub-lang", "en,nl",
+                 "--convert-subs", "srt", "--print", "title", "--print", "description",
+                 "-o", "/tmp/yt_dump_%(id)s", url],
+                capture_output=True, text=True, timeout=30
+            )
+            sp["bytes"] = len(result.stdout)
         title = ""
         description = ""
         lines = result.stdout.strip().split("\n")
@@ -106,23 +478,25 @@ def fetch_youtube_transcript(url):
             for sf in sub_files:
                 os.remove(sf)
             # Strip SRT formatting (nummers + timestamps)
-            clean_lines = []
-            for line in transcript.split("\n"):
-                line = line.strip()
-                if not line:
-                    continue
-                if line.isdigit():
-                    continue
-                if "-->" in line:
-                    continue
-                if line not in clean_lines[-3:] if clean_lines else True:
-                    clean_lines.append(line)
-            transcript = " ".join(clean_lines)
+            with span("extract_srt", bytes=len(transcript)) as sp:
+                clean_lines = []
+                for line in transcript.split("\n"):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line.isdigit():
+                        continue
+                    if "-->" in line:
+                        continue
+                    if line not in clean_lines[-3:] if clean_lines else True:
+                        clean_lines.append(line)
+                transcript = " ".join(clean_lines)
+                sp["chars_out"] = len(transcript)
 
         return {
             "title": title[:200] if title else "",
             "description": description[:500] if description else "",
-            "transcript": transcript[:8000] if transcript else "",
+            "transcript": transcript[:MAX_SOURCE_CHARS] if transcript else "",
         }
     except FileNotFoundError:
         log("yt-dlp niet gevonden — installeer met: brew install yt-dlp")
@@ -135,67 +509,82 @@ def fetch_webpage_text(url):
     """Haal tekst op van een webpagina."""
     try:
         headers = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) CCC-Analyzer/1.0"}
-        r = httpx.get(url, headers=headers, timeout=15, follow_redirects=True)
-        html = r.text
+        with span("fetch_webpage") as sp:
+            r = httpx.get(url, headers=headers, timeout=15, follow_redirects=True)
+            html = r.text
+            sp["bytes"] = len(r.content)
+            sp["status"] = r.status_code
 
         # Simpele HTML → tekst extractie (geen beautifulsoup nodig)
-        import re
-        # Verwijder scripts en styles
-        html = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL | re.IGNORECASE)
-        # Verwijder HTML tags
-        text = re.sub(r"<[^>]+>", " ", html)
-        # Decode HTML entities
-        text = text.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
-        text = text.replace("&quot;", '"').replace("&#39;", "'").replace("&nbsp;", " ")
-        # Normaliseer whitespace
-        text = re.sub(r"\s+", " ", text).strip()
-
-        # Extract title
-        title_match = re.search(r"<title[^>]*>(.*?)</title>", r.text, re.IGNORECASE | re.DOTALL)
-        title = title_match.group(1).strip() if title_match else ""
+        with span("extract_html", bytes=len(html)) as sp:
+            # Verwijder scripts en styles
+            html = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
+            html = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL | re.IGNORECASE)
+            # Verwijder HTML tags
+            text = re.sub(r"<[^>]+>", " ", html)
+            # Decode HTML entities
+            text = text.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+            text = text.replace("&quot;", '"').replace("&#39;", "'").replace("&nbsp;", " ")
+            # Normaliseer whitespace
+            text = re.sub(r"\s+", " ", text).strip()
+
+            # Extract title
+            title_match = re.search(r"<title[^>]*>(.*?)</title>", r.text, re.IGNORECASE | re.DOTALL)
+            title = title_match.group(1).strip() if title_match else ""
+            sp["chars_out"] = len(text)
 
         return {
             "title": title[:200],
-            "text": text[:8000],
+            "text": text[:MAX_SOURCE_CHARS],
         }
     except Exception as e:
         log_err(f"Webpage fetch failed for {url}: {e}")
         return {"title": "", "text": ""}
 
+# ── Model routing ──
+def pick_route(kind, chars, memo):
+    """Eerste regel uit ROUTES die past op type, promptlengte en memo."""
+    for rule in ROUTES:
+        if "types" in rule and kind not in rule["types"]:
+            continue
+        if chars < rule.get("min_chars", 0) or chars > rule.get("max_chars", float("inf")):
+            continue
+        if "memo" in rule and rule["memo"] != memo:
+            continue
+        return rule
+    return {"name": "fallback", "model": MODEL, "max_tokens": MAX_TOKENS}
+
+def load_routes(path):
+    """Routetabel uit JSON (lijst van regels); elke regel heeft minstens name en model."""
+    with open(path) as f:
+        routes = json.load(f)
+    if not isinstance(routes, list) or not all(isinstance(r, dict) and "name" in r and "model" in r for r in routes):
+        raise ValueError(f"{path}: verwacht een lijst van regels met 'name' en 'model'")
+    return routes
+
 # ── Claude API ──
-def ask_claude(prompt, max_tokens=MAX_TOKENS):
-    """Vraag Claude om analyse — via Worker proxy of direct."""
+def ask_claude(prompt, max_tokens=None, stream=None, kind=None):
+    """Vraag Claude om analyse — via Worker proxy of direct.
+    Model en max_tokens komen uit ROUTES (kind: item type uit de trace-context, of "chunk"/"batch");
+    een expliciete max_tokens gaat voor. stream=None: streamen zodra er een writeback actief is."""
+    on_text = _stream_sink.get() if stream is not False else None
+    ctx = _trace_item.get()
+    route = pick_route(kind or ctx.get("item_type", "note"), len(prompt), ctx.get("memo", False))
+    model = route["model"]
+    max_tokens = max_tokens or route.get("max_tokens") or MAX_TOKENS
     try:
-        if USE_WORKER_PROXY:
-            # Gebruik de bestaande Worker /api/ai als proxy
-            r = httpx.post(
-                f"{WORKER_API}/api/ai",
-                json={
-                    "messages": [{"role": "user", "content": prompt}],
-                    "model": MODEL,
-                    "max_tokens": max_tokens,
-                },
-                timeout=60,
-            )
-        else:
-            # Direct naar Anthropic API
-            r = httpx.post(
-                ANTHROPIC_API,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": ANTHROPIC_KEY,
-                    "anthropic-version": "2023-06-01",
-                },
-                json={
-                    "model": MODEL,
-                    "max_tokens": max_tokens,
-                    "messages": [{"role": "user", "content": prompt}],
-                },
-                timeout=60,
-            )
-
-        data = r.json()
+        with span("ask_claude", prompt_chars=len(prompt), max_tokens=max_tokens, model=model,
+                  model_route=route["name"], route="worker" if USE_WORKER_PROXY else "direct",
+                  stream=bool(on_text)) as sp:
+            if on_text:
+                data = _stream_claude(prompt, max_tokens, on_text, sp, model)
+            else:
+                data = _post_claude(prompt, max_tokens, model)
+            usage = data.get("usage", {})
+            sp["input_tokens"] = usage.get("input_tokens")
+            sp["output_tokens"] = usage.get("output_tokens")
+            sp["cache_read_tokens"] = usage.get("cache_read_input_tokens", 0)
+            sp["cache_write_tokens"] = usage.get("cache_creation_input_tokens", 0)
         if "content" in data:
             return "".join(b.get("text", "") for b in data["content"] if b.get("type") == "text")
         if "error" in data:
@@ -205,28 +594,158 @@ def ask_claude(prompt, max_tokens=MAX_TOKENS):
         log_err(f"Claude API failed: {e}")
         return f"Analyse fout: {e}"
 
+def _claude_request(prompt, max_tokens, model=MODEL):
+    """URL, headers en body voor één Messages request — via Worker proxy of direct."""
+    # System prompt als apart blok met cache_control: Anthropic cachet de prefix vanaf 1024 tokens (Sonnet);
+    # daaronder wordt de marker genegeerd en blijven de cache-tellers 0
+    system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    body = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if USE_WORKER_PROXY:
+        # Gebruik de bestaande Worker /api/ai als proxy (geeft system en stream ongewijzigd door)
+        return f"{WORKER_API}/api/ai", {}, body
+    # Direct naar Anthropic API
+    headers = {
+        "Content-Type": "application/json",
+        "x-api-key": ANTHROPIC_KEY,
+        "anthropic-version": "2023-06-01",
+    }
+    return ANTHROPIC_API, headers, body
+
+def _post_claude(prompt, max_tokens, model=MODEL):
+    """Eén Messages request en geef de JSON terug."""
+    url, headers, body = _claude_request(prompt, max_tokens, model)
+    r = httpx.post(url, headers=headers, json=body, timeout=60)
+    return r.json()
+
+def _stream_claude(prompt, max_tokens, on_text, sp, model=MODEL):
+    """Zelfde request met stream=true: SSE events lezen, on_text(tekst tot nu) per delta.
+    Geeft dezelfde vorm terug als de niet-streaming JSON (content + usage)."""
+    url, headers, body = _claude_request(prompt, max_tokens, model)
+    t0 = time.perf_counter()
+    text, usage = "", {}
+    with httpx.stream("POST", url, headers=headers, json={**body, "stream": True}, timeout=60) as r:
+        if r.status_code != 200:
+            return json.loads(r.read())
+        for line in r.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            kind = event.get("type")
+            if kind == "message_start":
+                usage.update(event.get("message", {}).get("usage", {}))
+            elif kind == "content_block_delta" and event.get("delta", {}).get("type") == "text_delta":
+                if not text:
+                    sp["first_token_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                text += event["delta"]["text"]
+                on_text(text)
+            elif kind == "message_delta":
+                usage.update(event.get("usage", {}))
+            elif kind == "error":
+                return {"error": event.get("error", {})}
+    return {"content": [{"type": "text", "text": text}], "usage": usage}
+
+# ── Streaming writeback ──
+# Actieve writeback voor het item dat nu geanalyseerd wordt (None = niet streamen)
+_stream_sink = contextvars.ContextVar("stream_sink", default=None)
+
+@contextmanager
+def streaming_to(item, publish=None):
+    """Binnen dit blok streamt ask_claude en gaat de deeltekst gethrottled naar de cloud.
+    publish(item): writeback van alleen dit item (lease renew met partial). Zonder publish geen streaming:
+    de hele lijst pushen (POST /api/dump) zou items wissen die intussen in het dashboard zijn toegevoegd."""
+    if not STREAM or publish is None:
+        yield
+        return
+    last = [float("-inf")]
+
+    def writeback(text):
+        # Eerste delta meteen, daarna hooguit elke STREAM_FLUSH_SECONDS
+        now = time.monotonic()
+        if now - last[0] < STREAM_FLUSH_SECONDS:
+            return
+        last[0] = now
+        item["analysis"] = text + " ⏳"
+        item["analyzing"] = True
+        item["analyzed_by"] = STREAMING_MARKER
+        publish(item)
+
+    token = _stream_sink.set(writeback)
+    try:
+        yield
+    finally:
+        _stream_sink.reset(token)
+
 # ── Targeted vs Generic prompt builder ──
+# Vaste instructies als system prompt: identiek over alle calls, dus cachebaar als prefix zodra hij groot genoeg is
+SYSTEM_PROMPT = """Je analyseert items uit de CCC Dump: links, video's, artikelen, social posts en notities.
+
+Regels voor elk antwoord:
+- KORT en BONDIG, in het Nederlands. Max 5 bullet points.
+- Geen inleidingen, geen conclusies, geen proza. Alleen bullet points.
+- Staat er een FOCUS bij het item: extraheer ALLEEN wat relevant is voor die focus. Concreet en praktisch.
+- Geen FOCUS: eerst wat het is (1 zin), daarna de kern-items/takeaways (3-4 bullets)."""
+
 def build_targeted_prompt(memo, content_desc, content_text):
-    """Als memo aanwezig: targeted extraction. Anders: korte analyse."""
+    """Als memo aanwezig: targeted extraction (FOCUS). Anders: korte analyse volgens SYSTEM_PROMPT."""
     if memo and memo.strip():
-        return f"""KORT en BONDIG. Max 5 bullet points. Geen inleidingen, geen conclusies.
-
-FOCUS: {memo}
-Extraheer ALLEEN wat relevant is voor bovenstaande focus.
+        return f"""FOCUS: {memo}
 
 {content_desc}
-{content_text}
+{content_text}"""
+    return f"""{content_desc}
+{content_text}"""
 
-Geef alleen bullet points in het Nederlands. Concreet en praktisch."""
-    else:
-        return f"""KORT en BONDIG in het Nederlands. Max 5 bullet points.
-- Wat is dit? (1 zin)
-- Kern-items/takeaways (3-4 bullets)
+# ── Map-reduce voor lange content ──
+def split_chunks(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Knip op zinsgrenzen (of spatie) in stukken van max `size` tekens, met kleine overlap."""
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(". ", start + size // 2, end)
+            if cut < 0:
+                cut = text.rfind(" ", start + size // 2, end)
+            if cut > start:
+                end = cut + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
 
-{content_desc}
-{content_text}
+def summarize_long(item, content_desc, label, text):
+    """Kort genoeg → één call zoals voorheen. Anders chunks parallel (map) en één reduce-call."""
+    memo = item.get("memo", "")
+    if len(text) <= CHUNK_CHARS:
+        return ask_claude(build_targeted_prompt(memo, content_desc, f"\n{label}: {text}"))
+
+    chunks = split_chunks(text)
+    focus = f"\nFOCUS: {memo}" if memo and memo.strip() else ""
+
+    def map_chunk(k, chunk):
+        prompt = f"""{content_desc}{focus}
+
+Dit is deel {k}/{len(chunks)} van de {label.lower()}. Vat dit deel samen in max 8 bullets.
+Houd concrete feiten, namen, cijfers en tools vast; laat herhaling en opvulling weg.
+
+{chunk}"""
+        return ask_claude(prompt, stream=False, kind="chunk")
 
-Alleen bullet points. Geen inleidingen, geen proza."""
+    with span("map_reduce", chunks=len(chunks), chars=len(text)):
+        # Elke thread krijgt een kopie van de context, zodat spans aan het item gekoppeld blijven
+        with ThreadPoolExecutor(max_workers=MAP_WORKERS) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, map_chunk, k, chunk)
+                       for k, chunk in enumerate(chunks, 1)]
+            partials = [f.result() for f in futures]
+
+        joined = "\n\n".join(f"Deel {k}:\n{p}" for k, p in enumerate(partials, 1))
+        content_text = f"\nSamenvattingen van {len(chunks)} delen ({label.lower()}, {len(text)} tekens):\n{joined}"
+        return ask_claude(build_targeted_prompt(memo, content_desc, content_text))
 
 # ── Analyzers per type ──
 def analyze_youtube(item):
@@ -237,12 +756,9 @@ def analyze_youtube(item):
 Titel: {yt_data['title']}
 Beschrijving: {yt_data['description'][:300]}"""
 
-    content_text = ""
-    if yt_data["transcript"]:
-        content_text = f"\nTranscript (fragment): {yt_data['transcript'][:5000]}"
-
-    prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
-    return ask_claude(prompt)
+    if not yt_data["transcript"]:
+        return ask_claude(build_targeted_prompt(item.get("memo", ""), content_desc, ""))
+    return summarize_long(item, content_desc, "Transcript", yt_data["transcript"])
 
 def analyze_article(item):
     """Analyseer artikel/webpagina — targeted als memo aanwezig."""
@@ -250,10 +766,7 @@ def analyze_article(item):
 
     content_desc = f"""URL: {item['content']}
 Titel: {page['title']}"""
-    content_text = f"\nContent: {page['text'][:5000]}"
-
-    prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
-    return ask_claude(prompt)
+    return summarize_long(item, content_desc, "Content", page["text"])
 
 def analyze_link(item):
     """Analyseer een generieke link — targeted als memo aanwezig."""
@@ -266,19 +779,21 @@ Titel: {page['title']}"""
     prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
     return ask_claude(prompt)
 
+def instagram_prompt(item):
+    content_desc = f"Instagram URL: {item['content']}"
+    return build_targeted_prompt(item.get("memo", ""), content_desc, "")
+
 def analyze_instagram(item):
     """Analyseer Instagram post — targeted als memo aanwezig."""
-    content_desc = f"Instagram URL: {item['content']}"
-    content_text = ""
-    prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
-    return ask_claude(prompt, max_tokens=800)
+    return ask_claude(instagram_prompt(item))
+
+def twitter_prompt(item):
+    content_desc = f"Twitter/X URL: {item['content']}"
+    return build_targeted_prompt(item.get("memo", ""), content_desc, "")
 
 def analyze_twitter(item):
     """Analyseer Twitter/X post — targeted als memo aanwezig."""
-    content_desc = f"Twitter/X URL: {item['content']}"
-    content_text = ""
-    prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
-    return ask_claude(prompt, max_tokens=800)
+    return ask_claude(twitter_prompt(item))
 
 def analyze_github(item):
     """Analyseer GitHub link — targeted als memo aanwezig."""
@@ -291,21 +806,21 @@ Titel: {page['title']}"""
     prompt = build_targeted_prompt(item.get("memo", ""), content_desc, content_text)
     return ask_claude(prompt)
 
-def analyze_note(item):
-    """Analyseer een notitie/tekst — targeted als memo aanwezig."""
+def note_prompt(item):
     content = item.get("content", "") or item.get("memo", "")
     memo = item.get("memo", "")
 
     # Voor notes is memo vaak de content zelf
     if memo and memo != content:
         content_desc = f"Notitie: {content}"
-        content_text = ""
-        prompt = build_targeted_prompt(memo, content_desc, content_text)
-    else:
-        prompt = f"""Analyseer deze notitie kort in het Nederlands.
+        return build_targeted_prompt(memo, content_desc, "")
+    return f"""Analyseer deze notitie kort in het Nederlands.
 Notitie: {content}
 Beschrijf kort de kernpunten en eventuele actiepunten."""
-    return ask_claude(prompt, max_tokens=800)
+
+def analyze_note(item):
+    """Analyseer een notitie/tekst — targeted als memo aanwezig."""
+    return ask_claude(note_prompt(item))
 
 # Type → analyzer mapping
 ANALYZERS = {
@@ -318,17 +833,110 @@ ANALYZERS = {
     "note": analyze_note,
 }
 
+# Korte types: prompt zonder fetch, geschikt om te bundelen
+SHORT_PROMPTS = {
+    "instagram": instagram_prompt,
+    "twitter": twitter_prompt,
+    "note": note_prompt,
+}
+
+# ── Batching ──
+BATCH_MARKER = re.compile(r"^<<<ITEM (\d+)>>>\s*$", re.MULTILINE)
+
+def build_batch_prompt(prompts):
+    """Bundel losse opdrachten; elk antwoord begint met een eigen scheidingsregel."""
+    parts = [f"""Hieronder staan {len(prompts)} losse opdrachten. Beantwoord ze elk apart, volgens de vaste regels.
+Begin elk antwoord met exact de regel <<<ITEM n>>> (n = nummer van de opdracht), in dezelfde volgorde.
+Geen tekst vóór <<<ITEM 1>>> en geen tekst die bij meerdere items hoort."""]
+    for n, prompt in enumerate(prompts, 1):
+        parts.append(f"<<<ITEM {n}>>>\n{prompt}")
+    return "\n\n".join(parts)
+
+def split_batch_response(text, count):
+    """{n: antwoord} voor elk item dat een niet-leeg antwoord heeft; dubbele/onbekende nummers → weggelaten."""
+    markers = list(BATCH_MARKER.finditer(text))
+    answers, seen = {}, set()
+    for k, m in enumerate(markers):
+        n = int(m.group(1))
+        end = markers[k + 1].start() if k + 1 < len(markers) else len(text)
+        body = text[m.end():end].strip()
+        if n in seen:
+            answers.pop(n, None)
+            continue
+        seen.add(n)
+        if 1 <= n <= count and body:
+            answers[n] = body
+    return answers
+
+def analyze_batch(batch):
+    """Eén call voor meerdere korte items. Geeft {item_id: analyse} voor de items die te parsen waren."""
+    prompts = [SHORT_PROMPTS[i.get("type", "note")](i) for i in batch]
+    with span("batch", items=len(batch)) as sp:
+        text = ask_claude(build_batch_prompt(prompts), max_tokens=BATCH_ITEM_TOKENS * len(batch),
+                          stream=False, kind="batch")
+        answers = split_batch_response(text, len(batch))
+        sp["parsed"] = len(answers)
+    return {batch[n - 1]["id"]: answer for n, answer in answers.items()}
+
 # ── Main Loop ──
-def analyze_pending(items):
+def mark_analyzed(item, analysis, lease_token=None):
+    item.pop("analyzing", None)
+    item["analysis"] = analysis
+    item["analyzed"] = True
+    item["analyzed_by"] = "MM4-local"
+    item["analyzed_at"] = datetime.now().isoformat()
+    outbox_put(item, lease_token)
+
+def analyze_pending(items, publish=None, lease_token=None):
     """Analyseer alle items die nog geen analyse hebben."""
     changed = False
-    pending = [i for i in items if not i.get("analysis") and not i.get("analyzing")]
+    # Een achtergebleven streaming-marker betekent: vorige run brak af tijdens het streamen
+    pending = [i for i in items if i.get("analyzed_by") == STREAMING_MARKER
+               or (not i.get("analysis") and not i.get("analyzing"))]
 
     if not pending:
         return items, False
 
+    # Al eerder geanalyseerd maar nooit in de cloud beland → uit de outbox, geen nieuwe LLM call
+    known = outbox_lookup([i["id"] for i in pending if "id" in i])
+    if known:
+        for item in pending:
+            row = known.get(item.get("id"))
+            if row:
+                item.pop("analyzing", None)
+                item.update(_outbox_result({**row, "id": item["id"]}), analyzed=True)
+                outbox_put(item, lease_token)
+        log(f"♻️  {len(known)} analyses hergebruikt uit de outbox")
+        pending = [i for i in pending if i.get("id") not in known]
+        changed = True
+
+    if not pending:
+        return items, changed
+
     log(f"📋 {len(pending)} items te analyseren")
 
+    # Korte items eerst gebundeld; wat niet uit het antwoord te halen is gaat alsnog los
+    batchable = [i for i in pending if i.get("type", "note") in BATCH_TYPES and i.get("id")]
+    batched = set()
+    if BATCH_SIZE > 1 and len(batchable) > 1:
+        for start in range(0, len(batchable), BATCH_SIZE):
+            batch = batchable[start:start + BATCH_SIZE]
+            log(f"  📦 Batch van {len(batch)} korte items")
+            try:
+                results = analyze_batch(batch)
+            except Exception as e:
+                log_err(f"  Batch mislukt: {e}")
+                results = {}
+            for item in batch:
+                if item["id"] in results:
+                    mark_analyzed(item, results[item["id"]], lease_token)
+                    batched.add(item["id"])
+                    changed = True
+            if len(results) < len(batch):
+                log(f"  ↩️  {len(batch) - len(results)} items niet te parsen — los analyseren")
+        log(f"  ✅ Batches klaar ({len(batched)}/{len(batchable)} items)")
+        pending = [i for i in pending if i.get("id") not in batched]
+
     for item in pending:
         item_type = item.get("type", "note")
         content_preview = (item.get("content", "") or item.get("memo", ""))[:50]
@@ -337,15 +945,17 @@ def analyze_pending(items):
 
         analyzer = ANALYZERS.get(item_type, analyze_note)
         try:
-            analysis = analyzer(item)
-            item["analysis"] = analysis
-            item["analyzed"] = True
-            item["analyzed_by"] = "MM4-local"
-            item["analyzed_at"] = datetime.now().isoformat()
+            with trace_item(item), streaming_to(item, publish), span("item") as sp:
+                analysis = analyzer(item)
+                sp["analysis_chars"] = len(analysis)
+            mark_analyzed(item, analysis, lease_token)
             changed = True
             log(f"  ✅ Analyse klaar ({len(analysis)} chars)")
         except Exception as e:
             log_err(f"  Analyse mislukt voor {item.get('id')}: {e}")
+            item.pop("analyzing", None)
+            if item.get("analyzed_by") == STREAMING_MARKER:
+                item.pop("analyzed_by")
             item["analysis"] = f"Analyse fout: {e}"
             item["analyzed"] = True
             changed = True
@@ -355,7 +965,20 @@ def analyze_pending(items):
 def run_once():
     """Eenmalige run: haal items, analyseer, sla op."""
     log("🚀 Dump Analyzer gestart")
+    start_cycle()
+    try:
+        return _run_cycle()
+    finally:
+        print_cycle_summary()
+
+def _run_cycle():
+    claim = claim_items()
+    flush_outbox(lease_mode=claim is not None)
+    if claim is not None:
+        return _run_lease_cycle(claim)
 
+    if STREAM:
+        log("ℹ️  Worker zonder leases: --stream staat uit deze cycle (alleen per-item writeback onder een lease)")
     items = get_dump_items()
     if not items:
         log("Geen items gevonden")
@@ -363,10 +986,17 @@ def run_once():
 
     log(f"📦 {len(items)} items opgehaald van cloud")
 
+    before = {i.get("id") for i in items if i.get("analyzed") and i.get("analysis")
+              and i.get("analyzed_by") != STREAMING_MARKER}
     items, changed = analyze_pending(items)
 
     if changed:
-        save_dump_items(items)
+        fresh = [i["id"] for i in items if i.get("analyzed_by") == "MM4-local" and i.get("id") not in before]
+        if save_dump_items(items):
+            outbox_mark(fresh, "flushed")
+        else:
+            outbox_backoff(fresh)
+            log(f"📮 {len(fresh)} analyses blijven in de outbox tot de Worker weer bereikbaar is")
         analyzed_count = sum(1 for i in items if i.get("analyzed_by") == "MM4-local")
         log(f"✅ Klaar — {analyzed_count} items geanalyseerd door MM4")
     else:
@@ -374,10 +1004,47 @@ def run_once():
 
     return sum(1 for i in items if not i.get("analysis"))
 
+def _run_lease_cycle(claim):
+    """Claim → analyseer → complete, zolang er volle batches te claimen zijn."""
+    total = 0
+    while True:
+        items = claim.get("items", [])
+        if not items:
+            if not total:
+                log("Geen items te claimen")
+            return 0
+
+        ids = [i["id"] for i in items]
+        log(f"🔒 {len(items)} items geclaimd door {WORKER_ID} (lease {LEASE_TTL}s)")
+        with LeaseKeeper(claim["token"], ids) as lease:
+            items, _ = analyze_pending(items, publish=lease.publish_partial, lease_token=claim["token"])
+
+        results = [{"id": i["id"], "analysis": i["analysis"], "analyzed_by": i.get("analyzed_by"),
+                    "analyzed_at": i.get("analyzed_at")}
+                   for i in items if i.get("analyzed") and i.get("analysis") and i["id"] not in lease.lost]
+        done = {r["id"] for r in results}
+        committed, rejected = complete_items(claim["token"], results, [i for i in ids if i not in done])
+        if committed is None:
+            # Analyses staan in de outbox; volgende cycle opnieuw (lease blijft tot TTL van ons)
+            outbox_backoff(list(done))
+            log(f"📮 {len(done)} analyses in de outbox — Worker onbereikbaar")
+            return len(ids)
+        outbox_mark(committed, "flushed")
+        outbox_mark(rejected, "rejected")
+        total += len(committed)
+        log(f"✅ {len(committed)} items opgeslagen" + (f", {len(rejected)} geweigerd (lease verlopen)" if rejected else ""))
+
+        if len(items) < CLAIM_LIMIT:
+            return len(ids) - len(committed)
+        claim = claim_items()
+        if claim is None:
+            return 0
+
 def run_daemon(interval):
     """Daemon mode: poll elke N seconden."""
     log(f"🔄 Daemon mode — polling elke {interval}s")
-    log(f"   Model: {MODEL}")
+    routes = ", ".join(f"{r['name']}→{r['model']}" for r in ROUTES)
+    log(f"   Model: {MODEL} (routes: {routes})")
     log(f"   API: {'Geconfigureerd' if ANTHROPIC_KEY else 'NIET GECONFIGUREERD'}")
     log(f"   Stop met Ctrl+C")
 
@@ -411,14 +1078,40 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="CCC Dump Analyzer — lokale analyse op Mac Mini M4")
     parser.add_argument("--daemon", action="store_true", help="Continue polling mode")
     parser.add_argument("--interval", type=int, default=POLL_INTERVAL, help=f"Poll interval in seconden (default: {POLL_INTERVAL})")
+    parser.add_argument("--profile", action="store_true", help=f"Draai onder cProfile, stats naar {PROFILE_FILE}")
+    parser.add_argument("--trace", type=Path, default=TRACE_FILE, help=f"JSONL trace bestand (default: {TRACE_FILE})")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"Stream antwoorden en schrijf deelanalyses elke {STREAM_FLUSH_SECONDS:.0f}s terug naar de cloud (vereist lease-endpoints)")
+    parser.add_argument("--routes", type=Path, default=os.environ.get("CCC_MODEL_ROUTES"),
+                        help="JSON routetabel (lijst van regels: name, model, max_tokens, types, min_chars, max_chars, memo)")
+    parser.add_argument("--worker-id", default=WORKER_ID, help=f"Naam voor leases bij meerdere analyzers (default: {WORKER_ID})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Max korte items ({', '.join(BATCH_TYPES)}) per call, 1 = niet bundelen (default: {BATCH_SIZE})")
     args = parser.parse_args()
+    TRACE_FILE = args.trace
+    BATCH_SIZE = args.batch_size
+    STREAM = args.stream
+    WORKER_ID = args.worker_id
+    if args.routes:
+        ROUTES = load_routes(args.routes)
 
     if USE_WORKER_PROXY:
         log("🔄 Geen lokale API key — gebruik Worker proxy")
     else:
         log("🔑 Lokale Anthropic API key gevonden")
 
-    if args.daemon:
-        run_daemon(args.interval)
+    run = (lambda: run_daemon(args.interval)) if args.daemon else run_once
+
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(run)
+        finally:
+            PROFILE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(PROFILE_FILE)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+            log(f"📈 Profiel opgeslagen: {PROFILE_FILE}")
     else:
-        run_once()
+        run()
@@ -0,0 +1,172 @@
+"""
+Geïndexeerde scan-geschiedenis (SQLite) voor intelligence topics
+intelligence_history.json blijft bestaan (laatste 500, voor schattingen en oude clients);
+deze store bewaart alles en beantwoordt gefilterde queries en aggregaten server-side.
+
+Gebruik:
+  from history_store import record, query, aggregates
+  record({"id": "phishing_trends", "timestamp": "...", "tokens": 1200})
+  query(topic="phishing_trends", since="2026-02-01", limit=50, cursor=None)  # → {"items", "next_cursor"}
+  aggregates(since="2026-01-01")  # → tokens per dag/topic + scans per week
+  tokens_since(86400)             # → tokens van de laatste 24 uur (budget)
+
+Bij de eerste verbinding wordt een bestaande intelligence_history.json geïmporteerd.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = Path(os.environ.get("INTEL_OUTPUT_DIR", SCRIPT_DIR.parent / "public" / "data"))
+HISTORY_FILE = OUTPUT_DIR / "intelligence_history.json"
+HISTORY_DB = Path(os.environ.get("INTEL_HISTORY_DB", OUTPUT_DIR / "intelligence_history.db"))
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_epoch ON history(epoch);
+CREATE INDEX IF NOT EXISTS idx_history_topic_epoch ON history(topic, epoch);
+"""
+
+
+def to_epoch(ts):
+    """ISO timestamp of datum → unix seconden (UTC als er geen tijdzone is)"""
+    parsed = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _row(entry):
+    extra = {k: v for k, v in entry.items() if k not in ("id", "timestamp", "tokens")}
+    return (entry["id"], entry["timestamp"], to_epoch(entry["timestamp"]), entry.get("tokens", 0),
+            json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def get_db():
+    HISTORY_DB.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(HISTORY_DB, timeout=5)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    if db.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None:
+        _import_json(db)
+    return db
+
+
+def _import_json(db):
+    if not HISTORY_FILE.exists():
+        return
+    try:
+        with open(HISTORY_FILE) as f:
+            entries = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return
+    rows = []
+    for entry in entries:
+        try:
+            rows.append(_row(entry))
+        except (KeyError, TypeError, ValueError):
+            continue
+    with db:
+        db.executemany("INSERT INTO history (topic, timestamp, epoch, tokens, extra) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def record(entry):
+    """Voeg één history entry ({id, timestamp, tokens, ...}) toe"""
+    db = get_db()
+    try:
+        with db:
+            db.execute("INSERT INTO history (topic, timestamp, epoch, tokens, extra) VALUES (?, ?, ?, ?, ?)",
+                       _row(entry))
+    finally:
+        db.close()
+
+
+def _filters(topic=None, since=None, until=None):
+    clauses, params = [], []
+    if topic:
+        clauses.append("topic = ?")
+        params.append(topic)
+    if since:
+        clauses.append("epoch >= ?")
+        params.append(to_epoch(since))
+    if until:
+        clauses.append("epoch < ?")
+        params.append(to_epoch(until))
+    return clauses, params
+
+
+def query(topic=None, since=None, until=None, limit=DEFAULT_LIMIT, cursor=None):
+    """Nieuwste eerst, keyset-paginatie: geef next_cursor terug als cursor voor de volgende pagina"""
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    clauses, params = _filters(topic, since, until)
+    if cursor:
+        clauses.append("seq < ?")
+        params.append(int(cursor))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    db = get_db()
+    try:
+        rows = db.execute(f"SELECT seq, topic, timestamp, tokens, extra FROM history {where} "
+                          f"ORDER BY seq DESC LIMIT ?", params + [limit + 1]).fetchall()
+    finally:
+        db.close()
+
+    items = []
+    for r in rows[:limit]:
+        item = {"id": r["topic"], "timestamp": r["timestamp"], "tokens": r["tokens"]}
+        if r["extra"]:
+            item.update(json.loads(r["extra"]))
+        items.append(item)
+    next_cursor = rows[limit - 1]["seq"] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def tokens_since(seconds, now=None):
+    """Som van de tokens in de laatste `seconds` seconden (voor het token budget)"""
+    now = now or datetime.now(timezone.utc)
+    db = get_db()
+    try:
+        return db.execute("SELECT COALESCE(SUM(tokens), 0) FROM history WHERE epoch >= ?",
+                          (int(now.timestamp()) - seconds,)).fetchone()[0]
+    finally:
+        db.close()
+
+
+def aggregates(topic=None, since=None, until=None):
+    """Tokens + scans per dag per topic en per week (UTC, week begint op maandag: %Y-W%W)"""
+    clauses, params = _filters(topic, since, until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    db = get_db()
+    try:
+        per_day = db.execute(
+            f"SELECT date(epoch, 'unixepoch') AS day, topic, SUM(tokens) AS tokens, COUNT(*) AS scans "
+            f"FROM history {where} GROUP BY day, topic ORDER BY day, topic", params).fetchall()
+        per_week = db.execute(
+            f"SELECT strftime('%Y-W%W', epoch, 'unixepoch') AS week, SUM(tokens) AS tokens, COUNT(*) AS scans "
+            f"FROM history {where} GROUP BY week ORDER BY week", params).fetchall()
+        totals = db.execute(
+            f"SELECT COUNT(*) AS scans, COALESCE(SUM(tokens), 0) AS tokens FROM history {where}", params).fetchone()
+    finally:
+        db.close()
+
+    return {
+        "tokens_per_day": [dict(r) for r in per_day],
+        "scans_per_week": [dict(r) for r in per_week],
+        "total_scans": totals["scans"],
+        "total_tokens": totals["tokens"],
+    }
@@ -7,20 +7,45 @@ Biedt endpoints voor Perplexity intelligence scanning en data access.
 Gebruik:
   python3 scripts/local_api.py              # Start op port 4900
   python3 scripts/local_api.py --port 4901  # Custom port
+  python3 scripts/local_api.py --static     # Ook dashboard (dist/) serveren op dezelfde port
 
 Endpoints:
   GET  /health                    → Server status
   GET  /api/intelligence/feed     → Huidige intelligence feed
-  POST /api/intelligence/scan     → Trigger scan (body: {"topics": [0,1,2]} of leeg voor alle)
-  GET  /api/intelligence/history  → Scan geschiedenis
+  POST /api/intelligence/scan     → Scan job in de wachtrij (body: {"topics": [0,1,2], "priority": 5} of leeg voor alle)
+  GET  /api/intelligence/history  → Scan geschiedenis (zonder parameters: laatste 500 als array)
+  GET  /api/intelligence/history?topic=&since=&until=&limit=&cursor=  → Gefilterd, nieuwste eerst, {"items", "next_cursor"}
+  GET  /api/intelligence/history/aggregate?topic=&since=&until=      → Tokens per dag/topic, scans per week
+  GET  /api/intelligence/jobs     → Recente scan jobs
+  GET  /api/intelligence/jobs/<id>         → Status van één job
+  GET  /api/intelligence/changes?topic=<id>&since=<iso|versie>  → Wat is er nieuw sinds X (deltas + novelty)
+  GET  /api/intelligence/versions/<id>?version=<n>              → Volledige tekst van een versie
+  DELETE /api/intelligence/jobs/<id>       → Job annuleren (ook: POST /api/intelligence/jobs/<id>/cancel)
+  GET  /metrics                   → Prometheus metrics (requests, latency, provider tokens, scans)
+
+Alle JSON endpoints: gzip/brotli via Accept-Encoding (gecachete bodies), ?fields=a,b of ?fields=-content
+(projectie per entry/item). Lijsten (history-array, jobs, topics): ?offset=&limit=, totaal in X-Total-Count.
+
+Met --static: hashed assets (assets/index-*.js) uit het geheugen met Cache-Control: immutable en
+voorgecomprimeerde gzip/br varianten (.gz/.br sidecars worden gebruikt als ze er zijn); index.html en
+data/*.json altijd revalideren (no-cache + ETag → 304). Bestanden > 2 MB gaan via sendfile.
 """
 
+import gzip
+import heapq
+import itertools
+import hashlib
 import json
+import mimetypes
 import os
+import posixpath
+import re
 import sys
 import time
+import uuid
 import argparse
 import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
@@ -29,30 +54,545 @@ from urllib.parse import urlparse, parse_qs
 # Import monitor functions
 SCRIPT_DIR = Path(__file__).parent
 sys.path.insert(0, str(SCRIPT_DIR))
-from perplexity_monitor import load_api_key, query_perplexity, TOPICS, OUTPUT_DIR, OUTPUT_FILE, HISTORY_FILE, save_feed, load_existing_feed, append_history
+from perplexity_monitor import (
+    TOPICS, OUTPUT_DIR, OUTPUT_FILE, HISTORY_FILE, DEFAULT_PROVIDERS, RATE_LIMIT_DELAY,
+    load_provider_keys, query_topic, save_feed_entry, save_feed_meta, append_history,
+    load_history, budget_remaining, estimate_topic_tokens, build_entry, brotli,
+)
+from metrics import Counter, Histogram, render as render_metrics
+from content_store import changes_since, content_at
+import history_store
 
 PROJECT_DIR = SCRIPT_DIR.parent
 PORT = 4900
-
-# Track scanning state
-scan_lock = threading.Lock()
+MAX_FINISHED_JOBS = 100  # Afgeronde jobs die opvraagbaar blijven
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_CACHE_SIZE = 64
+STATIC_DIR = None                        # --static: dist/ serveren naast de API
+STATIC_MEMORY_MAX = 2 * 1024 * 1024      # Grotere bestanden via sendfile i.p.v. uit het geheugen
+STATIC_CACHE_SIZE = 512                  # Max assets in het geheugen (LRU)
+# Alleen echte content-hashes: Vite "-[base64url]{8}" (met minstens één cijfer/hoofdletter) of hex "[.-][0-9a-f]{8,}"
+HASHED_ASSET_RE = re.compile(
+    r"(?:-(?=[A-Za-z0-9_-]{0,7}[0-9A-Z])[A-Za-z0-9_-]{8}|[.-][0-9a-f]{8,})\.(?:js|css|woff2?|png|svg|jpg|webp)$")
+
+# ── Scan job queue ──
+# Eén worker draait jobs op prioriteit; overlappende verzoeken worden samengevoegd
+jobs_lock = threading.Condition()
+scan_jobs = {}          # job_id → job dict
+job_queue = []          # heap van (-priority, seq, job_id); verouderde entries worden overgeslagen
+job_seq = itertools.count()
+worker_thread = None
+
+# ── Metrics ──
+HTTP_REQUESTS = Counter("ccc_http_requests_total", "HTTP requests per route/status", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("ccc_http_request_duration_seconds", "HTTP request latency per route", ["method", "route"])
+SCAN_DURATION = Histogram("intel_scan_duration_seconds", "Duur van een scan job", ["status"],
+                          buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+SCAN_JOBS = Counter("intel_scan_jobs_total", "Scan jobs per uitkomst", ["status"])
+
+
+KNOWN_ROUTES = frozenset({
+    "/health", "/metrics",
+    "/api/intelligence/feed", "/api/intelligence/history", "/api/intelligence/history/aggregate",
+    "/api/intelligence/status", "/api/intelligence/jobs", "/api/intelligence/changes",
+    "/api/intelligence/topics", "/api/intelligence/scan",
+})
+
+def route_label(path):
+    """Beperk label-cardinaliteit: job ids → :id, onbekende paden → 'other', geen pad → 'invalid'"""
+    if path is None:
+        return "invalid"
+    path = urlparse(path).path
+    if path.startswith("/api/intelligence/jobs/"):
+        return "/api/intelligence/jobs/:id" + ("/cancel" if path.endswith("/cancel") else "")
+    if path.startswith("/api/intelligence/versions/"):
+        return "/api/intelligence/versions/:topic"
+    if STATIC_DIR is not None and not path.startswith("/api/") and path not in ("/health", "/metrics"):
+        return "/assets/:file" if path.startswith("/assets/") else "static"
+    return path if path in KNOWN_ROUTES else "other"
+
+# ── Response compressie, projectie, paginatie ──
+_compress_cache = OrderedDict()   # (cache_key, encoding) → bytes, LRU
+_compress_lock = threading.Lock()
+
+def negotiate_encoding(accept, available=None):
+    """br > gzip > identity volgens Accept-Encoding (q=0 = geweigerd). available: beschikbare varianten."""
+    offered = {}
+    for part in (accept or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if available is None:
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in ("br", "gzip"):
+        if encoding not in available:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+def compress_body(body, encoding, cache_key=None, sidecar=None):
+    """Gecomprimeerde body; met cache_key uit/naar de LRU cache. sidecar: verse .gz/.br van perplexity_monitor."""
+    key = (cache_key, encoding)
+    if cache_key is not None:
+        with _compress_lock:
+            if key in _compress_cache:
+                _compress_cache.move_to_end(key)
+                return _compress_cache[key]
+    if sidecar is not None:
+        data = sidecar
+    elif encoding == "br":
+        data = brotli.compress(body, quality=5)
+    else:
+        data = gzip.compress(body, 6, mtime=0)
+    if cache_key is not None:
+        with _compress_lock:
+            _compress_cache[key] = data
+            while len(_compress_cache) > COMPRESS_CACHE_SIZE:
+                _compress_cache.popitem(last=False)
+    return data
+
+def apply_fields(record, fields):
+    """fields: ["id", "topic"] (alleen deze) of ["-content"] (alles behalve deze)"""
+    if not fields or not isinstance(record, dict):
+        return record
+    include = [f for f in fields if not f.startswith("-")]
+    exclude = {f[1:] for f in fields if f.startswith("-")}
+    if include:
+        return {k: v for k, v in record.items() if k in include and k not in exclude}
+    return {k: v for k, v in record.items() if k not in exclude}
+
+def paginate(records, params):
+    """offset/limit op een lijst → (pagina, totaal)"""
+    offset = max(0, int(params.get("offset", 0)))
+    limit = params.get("limit")
+    page = records[offset:offset + int(limit)] if limit is not None else records[offset:]
+    return page, len(records)
+
+# ── Statische dashboard build (dist/) ──
+_static_cache = OrderedDict()   # genormaliseerd pad t.o.v. STATIC_DIR → asset dict (body + gz/br varianten of stat), LRU
+_static_lock = threading.Lock()
+
+def _load_asset(file, rel, stat):
+    """Lees een bestand uit dist/ in: gecomprimeerde varianten uit .gz/.br sidecars (vite/precompress) of zelf gemaakt"""
+    content_type = mimetypes.guess_type(file.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json", "image/svg+xml"):
+        content_type += "; charset=utf-8"
+    asset = {
+        "path": file, "type": content_type, "mtime": stat.st_mtime_ns, "size": stat.st_size,
+        "immutable": rel.startswith("assets/") and bool(HASHED_ASSET_RE.search(rel)),
+        "variants": {},
+    }
+    if stat.st_size > STATIC_MEMORY_MAX:
+        asset["etag"] = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        return asset
+
+    body = file.read_bytes()
+    asset["body"] = body
+    asset["etag"] = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+    compressible = not content_type.startswith(("image/", "font/")) or "svg" in content_type
+    if compressible and len(body) >= COMPRESS_MIN_BYTES:
+        for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            sidecar = file.with_name(file.name + suffix)
+            if sidecar.exists() and sidecar.stat().st_mtime_ns >= stat.st_mtime_ns:
+                asset["variants"][encoding] = sidecar.read_bytes()
+            elif encoding == "gzip":
+                asset["variants"][encoding] = gzip.compress(body, 9, mtime=0)
+            elif brotli is not None:
+                asset["variants"][encoding] = brotli.compress(body, quality=11)
+    return asset
+
+def static_asset(url_path):
+    """Asset voor een URL pad, of None. Hashed assets blijven in het geheugen zonder stat per request;
+    overige bestanden (index.html, data/*.json) worden op mtime/size gecontroleerd en zo nodig opnieuw ingelezen."""
+    # ./x.js, a/../x.js en //x.js zijn hetzelfde bestand: één cache entry
+    rel = posixpath.normpath("/" + url_path).lstrip("/") or "index.html"
+    with _static_lock:
+        asset = _static_cache.get(rel)
+        if asset is not None:
+            _static_cache.move_to_end(rel)
+    if asset is not None and asset["immutable"]:
+        return asset
+
+    file = (STATIC_DIR / rel).resolve()
+    if STATIC_DIR not in file.parents:
+        return None
+    try:
+        stat = file.stat()
+    except OSError:
+        return None
+    if not file.is_file():
+        return None
+    if asset is not None and (asset["mtime"], asset["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return asset
+
+    rel = file.relative_to(STATIC_DIR).as_posix()  # na de containment check: echte bestandsnaam (symlinks opgelost)
+    asset = _load_asset(file, rel, stat)
+    with _static_lock:
+        _static_cache[rel] = asset
+        _static_cache.move_to_end(rel)
+        while len(_static_cache) > STATIC_CACHE_SIZE:
+            _static_cache.popitem(last=False)
+    return asset
+
+def preload_static():
+    """Lees de hele build vooraf in zodat de eerste requests geen disk I/O doen"""
+    count = 0
+    for file in STATIC_DIR.rglob("*"):
+        if file.is_file() and file.suffix not in (".gz", ".br"):
+            if static_asset("/" + file.relative_to(STATIC_DIR).as_posix()) is not None:
+                count += 1
+    return count
+
+# Laatste scan resultaat (compatibel met /api/intelligence/status van het dashboard)
 scan_status = {"scanning": False, "last_scan": None, "progress": "", "error": None}
 
 
+def _job_view(job):
+    """Snapshot voor serialisatie buiten de lock (aanroepen onder jobs_lock): results en topics gekopieerd"""
+    view = {k: v for k, v in job.items() if k != "cancel_requested"}
+    view["results"] = {topic_id: dict(result) for topic_id, result in job["results"].items()}
+    view["topics"] = list(job["topics"])
+    return view
+
+def _set_result(job, topic_id, result, tokens=0):
+    with jobs_lock:
+        job["results"][topic_id] = result
+        job["tokens_used"] += tokens
+
+
+def _prune_jobs():
+    finished = [j for j in scan_jobs.values() if j["status"] in ("done", "cancelled", "error")]
+    finished.sort(key=lambda j: j["finished_at"] or "")
+    for job in finished[:-MAX_FINISHED_JOBS]:
+        del scan_jobs[job["id"]]
+
+
+def start_scan_worker():
+    global worker_thread
+    with jobs_lock:
+        if worker_thread is None or not worker_thread.is_alive():
+            worker_thread = threading.Thread(target=_scan_worker, daemon=True, name="scan-worker")
+            worker_thread.start()
+
+
+def submit_scan(topic_indices, priority=0):
+    """Zet een scan in de wachtrij of deel een bestaande job.
+
+    - Draaiende job dekt alle gevraagde topics → aansluiten bij die job
+    - Wachtende job met overlappende topics → topics samenvoegen, hoogste prioriteit wint
+    - Anders → nieuwe job
+    Geeft (job, coalesced) terug.
+    """
+    topics = sorted(set(topic_indices)) if topic_indices is not None else list(range(len(TOPICS)))
+    wanted = set(topics)
+    start_scan_worker()
+
+    with jobs_lock:
+        for job in scan_jobs.values():
+            if job["status"] == "running" and not job["cancel_requested"] and wanted <= set(job["topics"]):
+                job["requesters"] += 1
+                return job, True
+
+        for job in scan_jobs.values():
+            if job["status"] == "queued" and wanted & set(job["topics"]):
+                job["topics"] = sorted(set(job["topics"]) | wanted)
+                job["requesters"] += 1
+                if priority > job["priority"]:
+                    job["priority"] = priority
+                    heapq.heappush(job_queue, (-priority, next(job_seq), job["id"]))
+                return job, True
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "topics": topics,
+            "priority": priority,
+            "status": "queued",
+            "requesters": 1,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": "In wachtrij",
+            "results": {},
+            "tokens_used": 0,
+            "error": None,
+            "cancel_requested": False,
+        }
+        scan_jobs[job["id"]] = job
+        heapq.heappush(job_queue, (-priority, next(job_seq), job["id"]))
+        _prune_jobs()
+        jobs_lock.notify()
+        return job, False
+
+
+def cancel_job(job_id):
+    """Annuleer namens één aanvrager; de job stopt pas als niemand hem nog wil"""
+    with jobs_lock:
+        job = scan_jobs.get(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return job
+        job["requesters"] -= 1
+        if job["requesters"] > 0:
+            return job
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            job["progress"] = "Geannuleerd"
+            job["finished_at"] = datetime.now(timezone.utc).isoformat()
+        else:
+            job["cancel_requested"] = True  # Worker stopt na het huidige topic
+        return job
+
+
+def queue_position(job_id):
+    with jobs_lock:
+        queued = sorted((-j["priority"], j["created_at"], j["id"])
+                        for j in scan_jobs.values() if j["status"] == "queued")
+        ids = [entry[2] for entry in queued]
+        return ids.index(job_id) + 1 if job_id in ids else 0
+
+
+def current_status():
+    with jobs_lock:
+        active = [j for j in scan_jobs.values() if j["status"] in ("queued", "running")]
+        running = next((j for j in active if j["status"] == "running"), None)
+        status = dict(scan_status)
+        status["scanning"] = bool(active)
+        status["queued"] = sum(1 for j in active if j["status"] == "queued")
+        if running:
+            status["progress"] = running["progress"]
+            status["job_id"] = running["id"]
+        return status
+
+
+def _scan_worker():
+    while True:
+        with jobs_lock:
+            while True:
+                while not job_queue:
+                    jobs_lock.wait()
+                _, _, job_id = heapq.heappop(job_queue)
+                job = scan_jobs.get(job_id)
+                if job is not None and job["status"] == "queued":
+                    break
+            job["status"] = "running"
+            job["started_at"] = datetime.now(timezone.utc).isoformat()
+        _run_job(job)
+
+
+def _run_job(job):
+    """Voer één scan job uit — draait alleen in de worker thread"""
+    global scan_status
+    scan_start = time.monotonic()
+    try:
+        keys = load_provider_keys(DEFAULT_PROVIDERS)
+        if not keys:
+            raise RuntimeError("Geen API key gevonden voor " + ", ".join(DEFAULT_PROVIDERS))
+        now = datetime.now(timezone.utc).isoformat()
+        success_count = 0
+
+        scanned = 0
+        with jobs_lock:
+            topics = list(job["topics"])  # Vast zodra de job draait; submit_scan voegt alleen bij wachtende jobs samen
+        for idx, topic_index in enumerate(topics):
+            topic = TOPICS[topic_index]
+            # cancel_job zet cancel_requested onder dezelfde lock: check en voortgang atomair
+            with jobs_lock:
+                if job["cancel_requested"]:
+                    break
+                job["progress"] = f"{topic['icon']} {topic['topic']} ({idx+1}/{len(topics)})"
+
+            # Token budget: uitstellen i.p.v. het budget overschrijden
+            history = load_history()
+            remaining = budget_remaining()
+            estimate = estimate_topic_tokens(topic["id"], history)
+            if remaining is not None and estimate > remaining:
+                _set_result(job, topic["id"], {"success": False, "deferred": True,
+                                               "error": f"Budget: schatting {estimate} > resterend {remaining}"})
+                scanned += 1
+                continue
+
+            result = query_topic(topic, keys)
+
+            if result["success"]:
+                entry = build_entry(topic, result, now)
+                save_feed_entry(topic["id"], entry)
+                append_history({"id": topic["id"], "timestamp": now, "tokens": result["tokens_used"]})
+                _set_result(job, topic["id"], {"success": True, "tokens": result["tokens_used"],
+                                               "version": entry["version"], "novelty": entry["novelty"]},
+                            tokens=result["tokens_used"])
+                success_count += 1
+            else:
+                _set_result(job, topic["id"], {"success": False, "error": result["error"]})
+
+            scanned += 1
+            # Rate limit friendly
+            if scanned < len(topics):
+                time.sleep(RATE_LIMIT_DELAY)
+
+        if success_count:
+            with jobs_lock:
+                tokens_used = job["tokens_used"]
+            save_feed_meta({
+                "last_scan": now,
+                "total_tokens_this_scan": tokens_used,
+                "topics_scanned": success_count,
+                "total_topics": len(TOPICS),
+                "version": "1.0"
+            })
+
+        finished = datetime.now(timezone.utc).isoformat()
+        with jobs_lock:
+            job["status"] = "cancelled" if job["cancel_requested"] else "done"
+            job["duration_sec"] = round(time.monotonic() - scan_start, 1)
+            job["finished_at"] = finished
+            job["progress"] = f"✅ {success_count}/{len(topics)} topics, {job['tokens_used']} tokens"
+            if job["status"] == "cancelled":
+                job["progress"] = f"Geannuleerd na {scanned}/{len(topics)} topics"
+            scan_status = {"scanning": False, "last_scan": now, "progress": job["progress"], "error": None}
+
+    except Exception as e:
+        with jobs_lock:
+            job["status"] = "error"
+            job["error"] = str(e)
+            job["finished_at"] = datetime.now(timezone.utc).isoformat()
+            scan_status = {"scanning": False, "last_scan": None, "progress": "", "error": str(e)}
+
+    finally:
+        with jobs_lock:
+            status = job["status"]
+        SCAN_DURATION.observe(time.monotonic() - scan_start, status=status)
+        SCAN_JOBS.inc(status=status)
+
+
 class LocalAPIHandler(BaseHTTPRequestHandler):
     """Handle API requests from CCC dashboard"""
 
+    def handle_one_request(self):
+        """Meet elke request: telling per route/status + latency histogram"""
+        self._status = None
+        t0 = time.perf_counter()
+        super().handle_one_request()
+        if self._status is not None:
+            # Bij een te lange/ongeldige request line (414/400) is self.path nooit gezet
+            route = route_label(getattr(self, "path", None))
+            HTTP_REQUESTS.inc(method=self.command, route=route, status=str(self._status))
+            HTTP_LATENCY.observe(time.perf_counter() - t0, method=self.command, route=route)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
     def _cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, DELETE, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
-
-    def _json_response(self, data, status=200):
+        self.send_header("Access-Control-Expose-Headers", "X-Total-Count")
+
+    def _send_body(self, body, content_type, status=200, cache_key=None, headers=None, source=None):
+        """Body met Accept-Encoding negotiatie; source: bestand waarvan .gz/.br sidecars hergebruikt mogen worden."""
+        encoding = None
+        if len(body) >= COMPRESS_MIN_BYTES:
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+        if encoding:
+            sidecar = None
+            if source is not None:
+                candidate = source.with_name(source.name + (".br" if encoding == "br" else ".gz"))
+                try:
+                    if candidate.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                        sidecar = candidate.read_bytes()
+                except OSError:
+                    pass
+            body = compress_body(body, encoding, cache_key, sidecar)
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self._cors_headers()
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        self.wfile.write(body)
+
+    def _json_response(self, data, status=200, cache_key=None, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send_body(body, "application/json", status, cache_key, headers)
+
+    def _list_response(self, records):
+        """Lijst met ?fields= projectie en ?offset=&limit= paginatie (totaal in X-Total-Count)"""
+        page, total = paginate(records, self.params)
+        self._json_response([apply_fields(r, self.fields) for r in page], headers={"X-Total-Count": str(total)})
+
+    def _json_file_response(self, path, default, shape=None):
+        """JSON bestand: zonder projectie/paginatie ongeparsed doorsturen (compressie gecachet op mtime)."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return shape(default) if shape else self._json_response(default)
+        try:
+            if shape is None:
+                body = path.read_bytes()
+            else:
+                with open(path) as f:
+                    data = json.load(f)
+        except (OSError, ValueError) as e:
+            # Corrupt/half geschreven bestand is een serverfout, geen ongeldige request
+            print(f"⚠️ {path.name} niet leesbaar: {e}")
+            return self._json_response({"error": f"{path.stem} unavailable"}, 500)
+        if shape is None:
+            return self._send_body(body, "application/json",
+                                   cache_key=(str(path), stat.st_mtime_ns, stat.st_size), source=path)
+        return shape(data)
+
+    def _static_response(self, path, head=False):
+        """Bestand uit dist/; onbekende paden zonder extensie vallen terug op index.html (SPA). False = niet gevonden."""
+        asset = static_asset(path)
+        if asset is None and "." not in path.rsplit("/", 1)[-1]:
+            asset = static_asset("/index.html")
+        if asset is None:
+            return False
+
+        cache_control = "public, max-age=31536000, immutable" if asset["immutable"] else "no-cache"
+        if self.headers.get("If-None-Match") == asset["etag"]:
+            self.send_response(304)
+            self.send_header("ETag", asset["etag"])
+            self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            return True
+
+        encoding = negotiate_encoding(self.headers.get("Accept-Encoding"), asset["variants"])
+        body = asset["variants"][encoding] if encoding else asset.get("body")
+        self.send_response(200)
+        self.send_header("Content-Type", asset["type"])
+        self.send_header("Content-Length", str(len(body) if body is not None else asset["size"]))
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("ETag", asset["etag"])
+        if asset["variants"]:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if head:
+            return True
+        if body is not None:
+            self.wfile.write(body)
+        else:
+            with open(asset["path"], "rb") as f:
+                self.connection.sendfile(f)
+        return True
+
+    def do_HEAD(self):
+        path = urlparse(self.path).path
+        if STATIC_DIR is None or path.startswith("/api/") or not self._static_response(path, head=True):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
 
     def do_OPTIONS(self):
         self.send_response(204)
@@ -62,41 +602,122 @@ class LocalAPIHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         parsed = urlparse(self.path)
         path = parsed.path
-
+        self.params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        self.fields = [f.strip() for f in self.params.get("fields", "").split(",") if f.strip()]
+        try:
+            for key in ("offset", "limit"):
+                if key in self.params:
+                    int(self.params[key])
+        except ValueError:
+            self._json_response({"error": "Invalid query parameter"}, 400)
+            return
+        self._route_get(parsed, path)
+
+    def _route_get(self, parsed, path):
         if path == "/health":
             self._json_response({
                 "status": "ok",
                 "server": "SDK-HRM Local API",
                 "version": "1.0",
                 "time": datetime.now(timezone.utc).isoformat(),
-                "scanning": scan_status["scanning"],
+                "scanning": current_status()["scanning"],
                 "topics_available": len(TOPICS)
             })
 
+        elif path == "/metrics":
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
         elif path == "/api/intelligence/feed":
-            if OUTPUT_FILE.exists():
-                with open(OUTPUT_FILE) as f:
-                    self._json_response(json.load(f))
-            else:
-                self._json_response({"entries": {}, "meta": {}})
+            def project_feed(feed):
+                feed["entries"] = {k: apply_fields(v, self.fields) for k, v in feed.get("entries", {}).items()}
+                self._json_response(feed)
+            self._json_file_response(OUTPUT_FILE, {"entries": {}, "meta": {}},
+                                     project_feed if self.fields else None)
+
+        elif (path == "/api/intelligence/history" and "offset" not in self.params
+              and {"topic", "since", "until", "limit", "cursor"} & self.params.keys()):
+            params = self.params
+            try:
+                result = history_store.query(
+                    topic=params.get("topic"), since=params.get("since"), until=params.get("until"),
+                    limit=params.get("limit"), cursor=params.get("cursor"))
+            except ValueError:
+                self._json_response({"error": "Invalid since/until/limit/cursor"}, 400)
+                return
+            result["items"] = [apply_fields(r, self.fields) for r in result["items"]]
+            self._json_response(result)
+
+        elif path == "/api/intelligence/history/aggregate":
+            params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            try:
+                self._json_response(history_store.aggregates(
+                    topic=params.get("topic"), since=params.get("since"), until=params.get("until")))
+            except ValueError:
+                self._json_response({"error": "Invalid since/until"}, 400)
 
         elif path == "/api/intelligence/history":
-            if HISTORY_FILE.exists():
-                with open(HISTORY_FILE) as f:
-                    self._json_response(json.load(f))
-            else:
-                self._json_response([])
+            # Legacy array (laatste 500); met ?offset= of ?fields= gepagineerd/geprojecteerd
+            paged = self.fields or "offset" in self.params
+            self._json_file_response(HISTORY_FILE, [], self._list_response if paged else None)
 
         elif path == "/api/intelligence/status":
-            self._json_response(scan_status)
+            self._json_response(current_status())
+
+        elif path == "/api/intelligence/jobs":
+            with jobs_lock:
+                jobs = sorted(scan_jobs.values(), key=lambda j: j["created_at"], reverse=True)
+                views = [_job_view(j) for j in jobs]
+            self._list_response(views)
+
+        elif path.startswith("/api/intelligence/jobs/"):
+            job_id = path.rsplit("/", 1)[1]
+            with jobs_lock:
+                job = scan_jobs.get(job_id)
+                view = _job_view(job) if job else None
+            if view is None:
+                self._json_response({"error": "Job not found"}, 404)
+            else:
+                view["position"] = queue_position(job_id)
+                self._json_response(view)
+
+        elif path == "/api/intelligence/changes":
+            params = parse_qs(parsed.query)
+            topic_id = params.get("topic", [None])[0]
+            if topic_id not in {t["id"] for t in TOPICS}:
+                self._json_response({"error": "Unknown or missing topic"}, 400)
+                return
+            try:
+                self._json_response(changes_since(topic_id, params.get("since", [None])[0]))
+            except ValueError:
+                self._json_response({"error": "since must be an ISO timestamp or version number"}, 400)
+
+        elif path.startswith("/api/intelligence/versions/"):
+            topic_id = path.rsplit("/", 1)[1]
+            version = parse_qs(parsed.query).get("version", [None])[0]
+            if version is not None and not version.isdigit():
+                self._json_response({"error": "version must be a number"}, 400)
+                return
+            snapshot = content_at(topic_id, version)
+            if snapshot is None:
+                self._json_response({"error": "Version not found"}, 404)
+            else:
+                self._json_response(snapshot)
 
         elif path == "/api/intelligence/topics":
-            self._json_response([
+            self._list_response([
                 {"index": i, "id": t["id"], "topic": t["topic"], "icon": t["icon"],
                  "category": t["category"], "frequency": t["frequency"]}
                 for i, t in enumerate(TOPICS)
             ])
 
+        elif STATIC_DIR is not None and not path.startswith("/api/") and self._static_response(path):
+            pass
+
         else:
             self._json_response({"error": "Not found"}, 404)
 
@@ -116,95 +737,51 @@ class LocalAPIHandler(BaseHTTPRequestHandler):
                     pass
 
             topic_indices = body.get("topics", None)  # None = all topics
-
-            if scan_status["scanning"]:
-                self._json_response({"error": "Scan already in progress", "status": scan_status}, 409)
+            try:
+                priority = int(body.get("priority", 0))
+            except (TypeError, ValueError):
+                priority = 0
+
+            if topic_indices is not None and (
+                not isinstance(topic_indices, list)
+                or not all(isinstance(i, int) and 0 <= i < len(TOPICS) for i in topic_indices)
+            ):
+                self._json_response({"error": f"topics moet een lijst van indices 0-{len(TOPICS)-1} zijn"}, 400)
                 return
 
-            # Start scan in background thread
-            thread = threading.Thread(target=self._run_scan, args=(topic_indices,), daemon=True)
-            thread.start()
+            job, coalesced = submit_scan(topic_indices, priority)
 
             self._json_response({
-                "status": "started",
-                "topics": topic_indices if topic_indices else list(range(len(TOPICS))),
-                "message": f"Scanning {len(topic_indices) if topic_indices else len(TOPICS)} topics..."
+                "status": "coalesced" if coalesced else "queued",
+                "job_id": job["id"],
+                "topics": job["topics"],
+                "priority": job["priority"],
+                "position": queue_position(job["id"]),
+                "message": f"Scanning {len(job['topics'])} topics..."
             })
 
+        elif path.startswith("/api/intelligence/jobs/") and path.endswith("/cancel"):
+            self._cancel(path[:-len("/cancel")].rsplit("/", 1)[1])
+
         else:
             self._json_response({"error": "Not found"}, 404)
 
-    def _run_scan(self, topic_indices=None):
-        """Run Perplexity scan in background"""
-        global scan_status
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if path.startswith("/api/intelligence/jobs/"):
+            self._cancel(path.rsplit("/", 1)[1])
+        else:
+            self._json_response({"error": "Not found"}, 404)
 
-        with scan_lock:
-            scan_status = {"scanning": True, "last_scan": None, "progress": "Starting...", "error": None}
-
-            try:
-                api_key = load_api_key()
-                feed = load_existing_feed()
-                total_tokens = 0
-                success_count = 0
-                now = datetime.now(timezone.utc).isoformat()
-
-                topics_to_scan = []
-                for i, topic in enumerate(TOPICS):
-                    if topic_indices is not None and i not in topic_indices:
-                        continue
-                    topics_to_scan.append((i, topic))
-
-                for idx, (i, topic) in enumerate(topics_to_scan):
-                    scan_status["progress"] = f"{topic['icon']} {topic['topic']} ({idx+1}/{len(topics_to_scan)})"
-
-                    result = query_perplexity(api_key, topic)
-
-                    if result["success"]:
-                        entry = {
-                            "id": topic["id"],
-                            "topic": topic["topic"],
-                            "category": topic["category"],
-                            "icon": topic["icon"],
-                            "frequency": topic["frequency"],
-                            "content": result["content"],
-                            "citations": result["citations"],
-                            "related_questions": result.get("related_questions", []),
-                            "tokens_used": result["tokens_used"],
-                            "scanned_at": now,
-                            "model": result["model"]
-                        }
-                        feed["entries"][topic["id"]] = entry
-                        append_history({"id": topic["id"], "timestamp": now, "tokens": result["tokens_used"]})
-                        total_tokens += result["tokens_used"]
-                        success_count += 1
-
-                    # Rate limit friendly
-                    if idx < len(topics_to_scan) - 1:
-                        time.sleep(1)
-
-                feed["meta"] = {
-                    "last_scan": now,
-                    "total_tokens_this_scan": total_tokens,
-                    "topics_scanned": success_count,
-                    "total_topics": len(TOPICS),
-                    "version": "1.0"
-                }
-                save_feed(feed)
-
-                scan_status = {
-                    "scanning": False,
-                    "last_scan": now,
-                    "progress": f"✅ {success_count}/{len(topics_to_scan)} topics, {total_tokens} tokens",
-                    "error": None
-                }
-
-            except Exception as e:
-                scan_status = {
-                    "scanning": False,
-                    "last_scan": None,
-                    "progress": "",
-                    "error": str(e)
-                }
+    def _cancel(self, job_id):
+        job = cancel_job(job_id)
+        if job is None:
+            self._json_response({"error": "Job not found"}, 404)
+            return
+        with jobs_lock:
+            view = _job_view(job)
+            view["cancel_requested"] = job["cancel_requested"]
+        self._json_response(view)
 
     def log_message(self, format, *args):
         """Custom log format"""
@@ -215,10 +792,21 @@ class LocalAPIHandler(BaseHTTPRequestHandler):
 def main():
     parser = argparse.ArgumentParser(description="SDK-HRM Local API Server")
     parser.add_argument("--port", type=int, default=PORT, help=f"Port (default: {PORT})")
+    parser.add_argument("--static", nargs="?", const=str(PROJECT_DIR / "dist"), metavar="DIR",
+                        help="Serveer ook de dashboard build (default: dist/)")
     args = parser.parse_args()
 
+    global STATIC_DIR
+    if args.static:
+        STATIC_DIR = Path(args.static).resolve()
+        if not (STATIC_DIR / "index.html").exists():
+            print(f"❌ Geen index.html in {STATIC_DIR} — eerst 'npm run build'")
+            sys.exit(1)
+        loaded = preload_static()
+
     # Ensure output directory exists
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    start_scan_worker()
 
     server = HTTPServer(("127.0.0.1", args.port), LocalAPIHandler)
     print("=" * 50)
@@ -226,6 +814,8 @@ def main():
     print(f"   http://localhost:{args.port}")
     print(f"   {len(TOPICS)} intelligence topics beschikbaar")
     print(f"   Output: {OUTPUT_DIR}")
+    if STATIC_DIR is not None:
+        print(f"   Dashboard: {STATIC_DIR} ({loaded} bestanden in geheugen)")
     print("=" * 50)
     print(f"\nEndpoints:")
     print(f"  GET  /health")
@@ -233,6 +823,9 @@ def main():
     print(f"  GET  /api/intelligence/topics")
     print(f"  GET  /api/intelligence/status")
     print(f"  POST /api/intelligence/scan")
+    print(f"  GET  /api/intelligence/jobs[/<id>]")
+    print(f"  DEL  /api/intelligence/jobs/<id>")
+    print(f"  GET  /metrics")
     print(f"\nCtrl+C om te stoppen\n")
 
     try:
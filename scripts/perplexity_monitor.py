@@ -7,32 +7,92 @@ Gebruik:
   python3 scripts/perplexity_monitor.py              # Alle topics
   python3 scripts/perplexity_monitor.py --topic 0     # Alleen topic 0
   python3 scripts/perplexity_monitor.py --dry-run     # Zonder API call
+  python3 scripts/perplexity_monitor.py --providers perplexity,anthropic --strategy merge
+  python3 scripts/perplexity_monitor.py --due --daily-budget 20000   # Cron: alleen verlopen topics, binnen budget
 
 Output: public/data/intelligence_feed.json
+        (+ .gz/.br sidecars met --precompress, per-topic delen in public/data/feed_parts/)
 """
 
+import gzip
 import json
 import os
 import sys
+import tempfile
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from datetime import datetime, timezone
 from pathlib import Path
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError, URLError
 
+from metrics import Counter, Histogram
+from content_store import record_version
+import history_store
+
+try:
+    import brotli  # optioneel: .br sidecar naast .gz
+except ImportError:
+    brotli = None
+
 # ── Config ──
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_DIR = SCRIPT_DIR.parent
-OUTPUT_DIR = PROJECT_DIR / "public" / "data"
+OUTPUT_DIR = Path(os.environ.get("INTEL_OUTPUT_DIR", PROJECT_DIR / "public" / "data"))
 OUTPUT_FILE = OUTPUT_DIR / "intelligence_feed.json"
 HISTORY_FILE = OUTPUT_DIR / "intelligence_history.json"
+FEED_PARTS_DIR = OUTPUT_DIR / "feed_parts"
+FEED_VERSION = "1.0"
+FEED_COMPACT = False       # --compact: geen indent (kleiner voor de dashboard fetch)
+FEED_PRECOMPRESS = False   # --precompress: .gz (en .br) sidecar voor statische serving
 ENV_FILE = Path.home() / ".env"
 
-PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+# Endpoints overschrijfbaar via env (benchmark/tests tegen lokale stand-ins)
+PERPLEXITY_API_URL = os.environ.get("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
 MODEL = "sonar"
 MAX_TOKENS = 600
 TEMPERATURE = 0.2
+RATE_LIMIT_DELAY = float(os.environ.get("INTEL_RATE_LIMIT_DELAY", "1"))  # Seconden tussen topics
+
+# ── Token budget (0 = geen limiet) — rollend venster over history_store (SQLite, volledig) ──
+DAILY_TOKEN_BUDGET = int(os.environ.get("INTEL_DAILY_TOKEN_BUDGET", "0"))      # Laatste 24 uur
+MONTHLY_TOKEN_BUDGET = int(os.environ.get("INTEL_MONTHLY_TOKEN_BUDGET", "0"))  # Laatste 30 dagen
+DEFAULT_TOPIC_ESTIMATE = 1500   # Schatting voor een topic zonder geschiedenis
+ESTIMATE_SAMPLES = 5            # Aantal recente scans per topic voor de schatting
+FREQUENCY_SECONDS = {"daily": 86400, "weekly": 7 * 86400, "monthly": 30 * 86400}
+
+SYSTEM_PROMPT = (
+    "You are an intelligence analyst for SDK-HRM, an AI-powered security product. "
+    "Provide concise, actionable intelligence. Use bullet points. "
+    "Always include specific names, dates, and numbers when available. "
+    "End with 1-2 sentences on relevance for a browser-based scam detection product."
+)
+
+# ── Providers ──
+# style "openai": Perplexity-compatibel chat/completions formaat (ook voor lokale stand-ins)
+# style "anthropic": Messages API (zelfde endpoint als dump_analyzer)
+ANTHROPIC_API_URL = os.environ.get("ANTHROPIC_API_URL", "https://api.anthropic.com/v1/messages")
+ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
+
+PROVIDERS = {
+    "perplexity": {"style": "openai", "url": PERPLEXITY_API_URL, "model": MODEL,
+                   "env_key": "PERPLEXITY_API_KEY", "timeout": 30},
+    "anthropic": {"style": "anthropic", "url": ANTHROPIC_API_URL, "model": ANTHROPIC_MODEL,
+                  "env_key": "ANTHROPIC_API_KEY", "timeout": 45},
+    "local": {"style": "openai", "url": os.environ.get("INTEL_LOCAL_URL", "http://127.0.0.1:4999/chat/completions"),
+              "model": MODEL, "env_key": None, "timeout": 10},
+}
+DEFAULT_PROVIDERS = ["perplexity"]
+MIN_CONTENT_CHARS = 200  # Korter antwoord telt niet als "acceptabel" voor strategy=first
+
+# ── Metrics (zichtbaar via GET /metrics in local_api) ──
+PROVIDER_REQUESTS = Counter("intel_provider_requests_total", "Provider queries per uitkomst",
+                            ["provider", "topic", "status"])
+PROVIDER_LATENCY = Histogram("intel_provider_latency_seconds", "Latency per provider query",
+                             ["provider", "topic"])
+PROVIDER_TOKENS = Counter("intel_provider_tokens_total", "Tokens verbruikt per provider/topic",
+                          ["provider", "topic"])
 
 # ── Intelligence Topics ──
 TOPICS = [
@@ -103,38 +163,59 @@ TOPICS = [
 ]
 
 
-def load_api_key():
-    """Load Perplexity API key from ~/.env"""
+def load_env_value(name):
+    """Lees een key uit de omgeving of ~/.env — None als niet gevonden"""
+    if os.environ.get(name):
+        return os.environ[name]
     if not ENV_FILE.exists():
-        print(f"❌ .env file niet gevonden: {ENV_FILE}")
-        sys.exit(1)
+        return None
 
     with open(ENV_FILE) as f:
         for line in f:
             line = line.strip()
-            if line.startswith("PERPLEXITY_API_KEY="):
+            if line.startswith(f"{name}="):
                 key = line.split("=", 1)[1].strip()
                 if key:
                     return key
+    return None
+
+
+def load_api_key():
+    """Load Perplexity API key from ~/.env"""
+    key = load_env_value("PERPLEXITY_API_KEY")
+    if key:
+        return key
+
+    if not ENV_FILE.exists():
+        print(f"❌ .env file niet gevonden: {ENV_FILE}")
+        sys.exit(1)
 
     print("❌ PERPLEXITY_API_KEY niet gevonden in ~/.env")
     print("   Voeg toe: PERPLEXITY_API_KEY=pplx-xxxxxxxxxxxxxxxx")
     sys.exit(1)
 
 
-def query_perplexity(api_key, topic_config):
+def load_provider_keys(providers):
+    """Keys per provider; providers zonder key worden overgeslagen"""
+    keys = {}
+    for name in providers:
+        env_key = PROVIDERS[name]["env_key"]
+        key = load_env_value(env_key) if env_key else ""
+        if key is None:
+            print(f"   ⚠️  {name}: {env_key} niet gevonden — overgeslagen")
+            continue
+        keys[name] = key
+    return keys
+
+
+def query_perplexity(api_key, topic_config, url=PERPLEXITY_API_URL, timeout=30, model=MODEL):
     """Query Perplexity API for a single topic"""
     payload = {
-        "model": MODEL,
+        "model": model,
         "messages": [
             {
                 "role": "system",
-                "content": (
-                    "You are an intelligence analyst for SDK-HRM, an AI-powered security product. "
-                    "Provide concise, actionable intelligence. Use bullet points. "
-                    "Always include specific names, dates, and numbers when available. "
-                    "End with 1-2 sentences on relevance for a browser-based scam detection product."
-                )
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
@@ -151,16 +232,17 @@ def query_perplexity(api_key, topic_config):
     }
 
     headers = {
-        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
         "Accept": "application/json"
     }
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
 
     data = json.dumps(payload).encode("utf-8")
-    req = Request(PERPLEXITY_API_URL, data=data, headers=headers, method="POST")
+    req = Request(url, data=data, headers=headers, method="POST")
 
     try:
-        with urlopen(req, timeout=30) as resp:
+        with urlopen(req, timeout=timeout) as resp:
             result = json.loads(resp.read().decode("utf-8"))
 
         content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -174,16 +256,141 @@ def query_perplexity(api_key, topic_config):
             "citations": citations[:5],  # Max 5 bronnen
             "related_questions": related[:3],
             "tokens_used": usage.get("total_tokens", 0),
-            "model": result.get("model", MODEL)
+            "model": result.get("model", model)
         }
 
     except HTTPError as e:
         error_body = e.read().decode("utf-8") if e.fp else str(e)
-        return {"success": False, "error": f"HTTP {e.code}: {error_body[:200]}"}
+        return {"success": False, "error": f"HTTP {e.code}: {error_body[:200]}", "status": str(e.code)}
     except URLError as e:
-        return {"success": False, "error": f"Network error: {str(e)}"}
+        return {"success": False, "error": f"Network error: {str(e)}", "status": "network"}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e), "status": "error"}
+
+
+def query_anthropic(api_key, topic_config, url=ANTHROPIC_API_URL, timeout=45, model=ANTHROPIC_MODEL):
+    """Query Anthropic Messages API for a single topic (zonder live web search, dus geen citations)"""
+    payload = {
+        "model": model,
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "system": SYSTEM_PROMPT,
+        "messages": [{"role": "user", "content": topic_config["query"]}],
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "x-api-key": api_key,
+        "anthropic-version": "2023-06-01",
+    }
+
+    data = json.dumps(payload).encode("utf-8")
+    req = Request(url, data=data, headers=headers, method="POST")
+
+    try:
+        with urlopen(req, timeout=timeout) as resp:
+            result = json.loads(resp.read().decode("utf-8"))
+
+        content = "".join(b.get("text", "") for b in result.get("content", []) if b.get("type") == "text")
+        usage = result.get("usage", {})
+
+        return {
+            "success": True,
+            "content": content,
+            "citations": [],
+            "related_questions": [],
+            "tokens_used": usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
+            "model": result.get("model", model)
+        }
+
+    except HTTPError as e:
+        error_body = e.read().decode("utf-8") if e.fp else str(e)
+        return {"success": False, "error": f"HTTP {e.code}: {error_body[:200]}", "status": str(e.code)}
+    except URLError as e:
+        return {"success": False, "error": f"Network error: {str(e)}", "status": "network"}
+    except Exception as e:
+        return {"success": False, "error": str(e), "status": "error"}
+
+
+def query_provider(name, api_key, topic_config):
+    """Query één provider volgens zijn style/url/timeout config"""
+    config = PROVIDERS[name]
+    query = query_anthropic if config["style"] == "anthropic" else query_perplexity
+    t0 = time.monotonic()
+    result = query(api_key, topic_config, url=config["url"], timeout=config["timeout"], model=config["model"])
+    elapsed = time.monotonic() - t0
+    result["provider"] = name
+    result["latency_ms"] = int(elapsed * 1000)
+
+    topic_id = topic_config["id"]
+    PROVIDER_LATENCY.observe(elapsed, provider=name, topic=topic_id)
+    PROVIDER_REQUESTS.inc(provider=name, topic=topic_id, status="200" if result["success"] else result["status"])
+    if result["success"]:
+        PROVIDER_TOKENS.inc(result["tokens_used"], provider=name, topic=topic_id)
+    return result
+
+
+def merge_results(results):
+    """Combineer succesvolle antwoorden: content per provider, citations ontdubbeld, tokens opgeteld"""
+    primary = results[0]
+    if len(results) == 1:
+        return primary
+
+    citations = []
+    for r in results:
+        for c in r["citations"]:
+            if c not in citations:
+                citations.append(c)
+
+    content = primary["content"]
+    for r in results[1:]:
+        content += f"\n\n---\n**Aanvulling ({r['provider']}):**\n{r['content']}"
+
+    return {
+        "success": True,
+        "content": content,
+        "citations": citations[:5],
+        "related_questions": primary.get("related_questions", []),
+        "tokens_used": sum(r["tokens_used"] for r in results),
+        "model": "+".join(r["model"] for r in results),
+        "provider": "+".join(r["provider"] for r in results),
+        "latency_ms": max(r["latency_ms"] for r in results),
+    }
+
+
+def query_topic(topic_config, keys, strategy="first"):
+    """Vraag alle providers tegelijk.
+
+    strategy "first": eerste acceptabele antwoord wint, de rest wordt niet afgewacht.
+    strategy "merge": wacht op alle providers (binnen hun timeout) en voeg samen.
+    """
+    providers = list(keys)
+    if len(providers) == 1:
+        return query_provider(providers[0], keys[providers[0]], topic_config)
+
+    pool = ThreadPoolExecutor(max_workers=len(providers))
+    futures = {pool.submit(query_provider, name, keys[name], topic_config): name for name in providers}
+    deadline = max(PROVIDERS[name]["timeout"] for name in providers) + 5
+    results = []
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            result = future.result()
+            if strategy == "first" and result["success"] and len(result["content"]) >= MIN_CONTENT_CHARS:
+                return result
+            results.append(result)
+    except FuturesTimeout:
+        pass
+    finally:
+        # Trage providers lopen op de achtergrond af tot hun eigen urlopen timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    ok = [r for r in results if r["success"]]
+    if not ok:
+        errors = "; ".join(f"{r['provider']}: {r['error']}" for r in results) or "timeout"
+        return {"success": False, "error": errors}
+    ok.sort(key=lambda r: providers.index(r["provider"]))
+    if strategy == "merge":
+        return merge_results(ok)
+    return max(ok, key=lambda r: len(r["content"]))
 
 
 def load_existing_feed():
@@ -197,22 +404,148 @@ def load_existing_feed():
     return {"version": "1.0", "entries": {}, "meta": {}}
 
 
-def save_feed(feed_data):
-    """Save intelligence feed as JSON"""
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(feed_data, f, indent=2, ensure_ascii=False)
+def atomic_write_bytes(path, data):
+    """Schrijf naar een temp file in dezelfde map en rename — lezers zien nooit een half bestand"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp maakt 0600, de static server moet kunnen lezen
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def encode_json(data, compact=False):
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def write_sidecars(path, data, precompress):
+    """Schrijf .gz/.br naast path, of ruim verouderde sidecars op"""
+    sidecars = {path.with_name(path.name + ".gz"): lambda d: gzip.compress(d, 9, mtime=0)}
+    if brotli is not None:
+        sidecars[path.with_name(path.name + ".br")] = brotli.compress
+    for sidecar, compress in sidecars.items():
+        if precompress:
+            atomic_write_bytes(sidecar, compress(data))
+        elif sidecar.exists():
+            sidecar.unlink()
+
+
+def save_feed(feed_data, compact=None, precompress=None):
+    """Save intelligence feed as JSON (atomisch)"""
+    compact = FEED_COMPACT if compact is None else compact
+    precompress = FEED_PRECOMPRESS if precompress is None else precompress
+    data = encode_json(feed_data, compact)
+    atomic_write_bytes(OUTPUT_FILE, data)
+    write_sidecars(OUTPUT_FILE, data, precompress)
+    # Houd per-topic delen in sync zodat save_feed_entry geen verouderde topics terugzet
+    if FEED_PARTS_DIR.exists():
+        split_feed(feed_data)
+
+
+def split_feed(feed_data):
+    """Schrijf elk huidig topic (en meta) als apart, compact geserialiseerd deel; verweesde delen weg"""
+    current = {t["id"] for t in TOPICS}
+    entries = {tid: entry for tid, entry in feed_data.get("entries", {}).items() if tid in current}
+    for topic_id, entry in entries.items():
+        atomic_write_bytes(FEED_PARTS_DIR / f"{topic_id}.json", encode_json(entry, compact=True))
+    atomic_write_bytes(FEED_PARTS_DIR / "_meta.json", encode_json(feed_data.get("meta", {}), compact=True))
+    for part in FEED_PARTS_DIR.glob("*.json"):
+        if not part.name.startswith("_") and part.stem not in entries:
+            part.unlink()
+
+
+def assemble_feed(precompress=None, compact=None):
+    """Bouw de feed uit de delen van de huidige TOPICS. Compact: bytes concateneren — andere topics worden
+    niet opnieuw geserialiseerd. Zonder --compact zelfde indent-formaat als save_feed (delen worden geparsed)."""
+    compact = FEED_COMPACT if compact is None else compact
+    precompress = FEED_PRECOMPRESS if precompress is None else precompress
+    meta_path = FEED_PARTS_DIR / "_meta.json"
+    meta = meta_path.read_bytes() if meta_path.exists() else b"{}"
+    parts = {}
+    for topic_id in sorted(t["id"] for t in TOPICS):
+        part = FEED_PARTS_DIR / f"{topic_id}.json"
+        if part.exists():
+            parts[topic_id] = part.read_bytes()
+    if compact:
+        data = (b'{"version":' + json.dumps(FEED_VERSION).encode("utf-8") + b',"entries":{'
+                + b",".join(json.dumps(tid).encode("utf-8") + b":" + body for tid, body in parts.items())
+                + b'},"meta":' + meta + b"}")
+    else:
+        data = encode_json({"version": FEED_VERSION,
+                            "entries": {tid: json.loads(body) for tid, body in parts.items()},
+                            "meta": json.loads(meta)})
+    atomic_write_bytes(OUTPUT_FILE, data)
+    write_sidecars(OUTPUT_FILE, data, precompress)
+
+
+def _ensure_feed_parts():
+    if not FEED_PARTS_DIR.exists():
+        split_feed(load_existing_feed())
+
+
+def save_feed_entry(topic_id, entry):
+    """Werk één topic bij: alleen dat deel wordt geserialiseerd"""
+    _ensure_feed_parts()
+    atomic_write_bytes(FEED_PARTS_DIR / f"{topic_id}.json", encode_json(entry, compact=True))
+    assemble_feed()
+
+
+def build_entry(topic, result, now):
+    """Feed entry voor een geslaagde query; legt meteen een nieuwe versie vast in de content store"""
+    version = record_version(topic["id"], result["content"], result["citations"], now)
+    return {
+        "id": topic["id"],
+        "topic": topic["topic"],
+        "category": topic["category"],
+        "icon": topic["icon"],
+        "frequency": topic["frequency"],
+        "content": result["content"],
+        "citations": result["citations"],
+        "related_questions": result.get("related_questions", []),
+        "tokens_used": result["tokens_used"],
+        "scanned_at": now,
+        "model": result["model"],
+        "provider": result.get("provider", "perplexity"),
+        "version": version["version"],
+        "novelty": version["novelty"],
+        "new_citations": version["new_citations"],
+    }
 
 
-def append_history(entry):
-    """Append to history file for trend tracking"""
-    history = []
+def save_feed_meta(meta):
+    """Werk alleen de meta van de feed bij"""
+    _ensure_feed_parts()
+    atomic_write_bytes(FEED_PARTS_DIR / "_meta.json", encode_json(meta, compact=True))
+    assemble_feed()
+
+
+def load_history():
+    """Load history entries ({id, timestamp, tokens})"""
     if HISTORY_FILE.exists():
         try:
             with open(HISTORY_FILE) as f:
-                history = json.load(f)
+                return json.load(f)
         except (json.JSONDecodeError, IOError):
-            history = []
+            pass
+    return []
+
+
+def append_history(entry):
+    """Append to history file for trend tracking (volledige geschiedenis staat in history_store)"""
+    history_store.record(entry)
+    history = load_history()
 
     history.append(entry)
 
@@ -220,73 +553,153 @@ def append_history(entry):
     if len(history) > 500:
         history = history[-500:]
 
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    atomic_write_bytes(HISTORY_FILE, encode_json(history, FEED_COMPACT))
 
 
-def run_monitor(topic_indices=None, dry_run=False):
+def _parse_ts(ts):
+    try:
+        parsed = datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def budget_remaining(now=None):
+    """Resterende tokens binnen het strengste budget, of None als er geen budget is ingesteld.
+    Verbruik komt uit history_store (volledig), niet uit de JSON history die op 500 entries is afgekapt."""
+    remaining = []
+    if DAILY_TOKEN_BUDGET:
+        remaining.append(DAILY_TOKEN_BUDGET - history_store.tokens_since(86400, now))
+    if MONTHLY_TOKEN_BUDGET:
+        remaining.append(MONTHLY_TOKEN_BUDGET - history_store.tokens_since(30 * 86400, now))
+    return max(0, min(remaining)) if remaining else None
+
+
+def estimate_topic_tokens(topic_id, history):
+    """Gemiddelde van de laatste scans van dit topic; anders van alle topics; anders een default"""
+    own = [h.get("tokens", 0) for h in history if h.get("id") == topic_id][-ESTIMATE_SAMPLES:]
+    sample = own or [h.get("tokens", 0) for h in history][-ESTIMATE_SAMPLES * len(TOPICS):]
+    if not sample:
+        return DEFAULT_TOPIC_ESTIMATE
+    return int(sum(sample) / len(sample) + 0.5)
+
+
+def overdue_ratio(topic, feed, now=None):
+    """>= 1 betekent: topic is aan de beurt volgens zijn frequentie (nooit gescand = oneindig)"""
+    now = now or datetime.now(timezone.utc)
+    last = _parse_ts(feed.get("entries", {}).get(topic["id"], {}).get("scanned_at"))
+    if last is None:
+        return float("inf")
+    return (now - last).total_seconds() / FREQUENCY_SECONDS.get(topic["frequency"], 86400)
+
+
+def plan_scan(candidates, feed, history, due_only=False, now=None):
+    """Kies welke topics binnen het budget passen, in prioriteitsvolgorde.
+
+    Prioriteit: meest achterstallig eerst. Topics die niet passen worden uitgesteld
+    (volgende run), niet half gescand. Geeft (planned, deferred) terug:
+    planned = [(index, topic, estimate)], deferred = [(index, topic, reden)].
+    history (JSON, laatste 500) dient alleen voor de schattingen; het verbruik komt uit history_store.
+    """
+    remaining = budget_remaining(now)
+    ranked = sorted(candidates, key=lambda c: -overdue_ratio(c[1], feed, now))
+
+    planned, deferred = [], []
+    for i, topic in ranked:
+        if due_only and overdue_ratio(topic, feed, now) < 1:
+            continue
+        estimate = estimate_topic_tokens(topic["id"], history)
+        if remaining is not None and estimate > remaining:
+            deferred.append((i, topic, f"schatting {estimate} > resterend {remaining}"))
+            continue
+        planned.append((i, topic, estimate))
+        if remaining is not None:
+            remaining -= estimate
+    return planned, deferred
+
+
+def run_monitor(topic_indices=None, dry_run=False, providers=None, strategy="first", due_only=False):
     """Run the intelligence monitor"""
     print("=" * 60)
     print("🔍 SDK-HRM Perplexity Intelligence Monitor")
     print(f"   {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
+    topics_to_scan = []
+    for i, topic in enumerate(TOPICS):
+        if topic_indices and i not in topic_indices:
+            continue
+        topics_to_scan.append((i, topic))
+
+    history = load_history()
+    planned, deferred = plan_scan(topics_to_scan, load_existing_feed(), history, due_only)
+    remaining = budget_remaining()
+
     if dry_run:
         print("\n🔸 DRY RUN — geen API calls\n")
-        for i, t in enumerate(TOPICS):
-            if topic_indices and i not in topic_indices:
-                continue
-            print(f"  [{i}] {t['icon']} {t['topic']} ({t['frequency']})")
+        if remaining is not None:
+            print(f"   Budget resterend: {remaining} tokens\n")
+        for i, t, estimate in planned:
+            print(f"  [{i}] {t['icon']} {t['topic']} ({t['frequency']}, ~{estimate} tokens)")
             print(f"      Query: {t['query'][:80]}...")
+        for i, t, reason in deferred:
+            print(f"  [{i}] ⏸  {t['topic']} — uitgesteld: {reason}")
         return
 
-    api_key = load_api_key()
-    print(f"   API Key: {api_key[:12]}...{api_key[-4:]}")
+    providers = providers or DEFAULT_PROVIDERS
+    if providers == ["perplexity"]:
+        api_key = load_api_key()
+        print(f"   API Key: {api_key[:12]}...{api_key[-4:]}")
+        keys = {"perplexity": api_key}
+    else:
+        keys = load_provider_keys(providers)
+        if not keys:
+            print("❌ Geen enkele provider beschikbaar")
+            sys.exit(1)
+        print(f"   Providers: {', '.join(keys)} (strategy: {strategy})")
     print()
 
     feed = load_existing_feed()
     total_tokens = 0
     success_count = 0
     now = datetime.now(timezone.utc).isoformat()
-
-    topics_to_scan = []
-    for i, topic in enumerate(TOPICS):
-        if topic_indices and i not in topic_indices:
+    scan_start = time.monotonic()
+
+    if remaining is not None:
+        print(f"💰 Budget resterend: {remaining} tokens — {len(planned)} gepland, {len(deferred)} uitgesteld")
+    for i, topic, reason in deferred:
+        print(f"   ⏸  {topic['icon']} {topic['topic']}: {reason}")
+
+    for n, (i, topic, estimate) in enumerate(planned):
+        # Werkelijk verbruik kan afwijken van de schatting: vóór elke call opnieuw checken
+        remaining = budget_remaining()
+        if remaining is not None and estimate > remaining:
+            print(f"[{n+1}/{len(planned)}] ⏸  {topic['topic']}: uitgesteld (schatting {estimate} > resterend {remaining})")
+            deferred.append((i, topic, f"schatting {estimate} > resterend {remaining}"))
             continue
-        topics_to_scan.append((i, topic))
 
-    for i, topic in topics_to_scan:
-        print(f"[{i+1}/{len(topics_to_scan)}] {topic['icon']} {topic['topic']}...")
+        print(f"[{n+1}/{len(planned)}] {topic['icon']} {topic['topic']}...")
 
-        result = query_perplexity(api_key, topic)
+        result = query_topic(topic, keys, strategy)
 
         if result["success"]:
-            entry = {
-                "id": topic["id"],
-                "topic": topic["topic"],
-                "category": topic["category"],
-                "icon": topic["icon"],
-                "frequency": topic["frequency"],
-                "content": result["content"],
-                "citations": result["citations"],
-                "related_questions": result.get("related_questions", []),
-                "tokens_used": result["tokens_used"],
-                "scanned_at": now,
-                "model": result["model"]
-            }
-
+            entry = build_entry(topic, result, now)
             feed["entries"][topic["id"]] = entry
+            # Per topic wegschrijven: het dashboard ziet resultaten al tijdens de scan
+            save_feed_entry(topic["id"], entry)
             append_history({"id": topic["id"], "timestamp": now, "tokens": result["tokens_used"]})
 
             total_tokens += result["tokens_used"]
             success_count += 1
-            print(f"   ✅ {result['tokens_used']} tokens, {len(result['citations'])} bronnen")
+            print(f"   ✅ {result['tokens_used']} tokens, {len(result['citations'])} bronnen "
+                  f"({result.get('provider', 'perplexity')}, {result.get('latency_ms', 0)} ms) "
+                  f"— v{entry['version']}, novelty {entry['novelty']:.0%}")
         else:
             print(f"   ❌ {result['error']}")
 
         # Rate limit friendly
-        if i < len(topics_to_scan) - 1:
-            time.sleep(1)
+        if n < len(planned) - 1:
+            time.sleep(RATE_LIMIT_DELAY)
 
     # Update meta
     feed["meta"] = {
@@ -294,15 +707,17 @@ def run_monitor(topic_indices=None, dry_run=False):
         "total_tokens_this_scan": total_tokens,
         "topics_scanned": success_count,
         "total_topics": len(TOPICS),
-        "scan_duration_sec": 0,  # Will be updated
+        "scan_duration_sec": round(time.monotonic() - scan_start, 1),
+        "deferred_topics": [topic["id"] for _, topic, _ in deferred],
         "version": "1.0"
     }
 
-    save_feed(feed)
+    save_feed_meta(feed["meta"])
 
     print()
     print("=" * 60)
-    print(f"✅ {success_count}/{len(topics_to_scan)} topics gescand")
+    print(f"✅ {success_count}/{len(planned)} topics gescand"
+          + (f", {len(deferred)} uitgesteld (budget)" if deferred else ""))
     print(f"📊 {total_tokens} tokens gebruikt (~${total_tokens/1_000_000:.4f})")
     print(f"💾 Output: {OUTPUT_FILE}")
     print("=" * 60)
@@ -313,8 +728,29 @@ def main():
     parser.add_argument("--topic", type=int, nargs="*", help="Specifieke topic indices (0-7)")
     parser.add_argument("--dry-run", action="store_true", help="Toon topics zonder API calls")
     parser.add_argument("--list", action="store_true", help="Toon alle topics")
+    parser.add_argument("--providers", type=lambda v: [p.strip() for p in v.split(",") if p.strip()],
+                        default=None, help=f"Komma-gescheiden providers ({', '.join(PROVIDERS)})")
+    parser.add_argument("--strategy", choices=["first", "merge"], default="first",
+                        help="first = snelste acceptabele antwoord, merge = alle antwoorden samenvoegen")
+    parser.add_argument("--due", action="store_true", help="Alleen topics die volgens hun frequentie aan de beurt zijn")
+    parser.add_argument("--daily-budget", type=int, default=None, help="Max tokens per 24 uur (0 = geen limiet)")
+    parser.add_argument("--monthly-budget", type=int, default=None, help="Max tokens per 30 dagen (0 = geen limiet)")
+    parser.add_argument("--compact", action="store_true", help="Feed zonder indent wegschrijven")
+    parser.add_argument("--precompress", action="store_true", help="Schrijf .gz (en .br) sidecars naast de feed")
     args = parser.parse_args()
 
+    global FEED_COMPACT, FEED_PRECOMPRESS, DAILY_TOKEN_BUDGET, MONTHLY_TOKEN_BUDGET
+    if args.daily_budget is not None:
+        DAILY_TOKEN_BUDGET = args.daily_budget
+    if args.monthly_budget is not None:
+        MONTHLY_TOKEN_BUDGET = args.monthly_budget
+    FEED_COMPACT = FEED_COMPACT or args.compact
+    FEED_PRECOMPRESS = FEED_PRECOMPRESS or args.precompress
+
+    unknown = [p for p in (args.providers or []) if p not in PROVIDERS]
+    if unknown:
+        parser.error(f"Onbekende provider(s): {', '.join(unknown)}")
+
     if args.list:
         print("\n📋 Beschikbare topics:\n")
         for i, t in enumerate(TOPICS):
@@ -324,7 +760,8 @@ def main():
             print()
         return
 
-    run_monitor(topic_indices=args.topic, dry_run=args.dry_run)
+    run_monitor(topic_indices=args.topic, dry_run=args.dry_run, providers=args.providers,
+                strategy=args.strategy, due_only=args.due)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""Gedeelde pytest setup: scripts/ importeerbaar maken (de scripts draaien los, zonder package)"""
+
+import http.client
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+
+@pytest.fixture
+def api():
+    """local_api op een vrije poort: api(path, method, headers, body) → (status, headers, body bytes)"""
+    import local_api
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), local_api.LocalAPIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(path, method="GET", headers=None, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, response.read()
+        finally:
+            conn.close()
+
+    yield request
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def intel_dir(tmp_path, monkeypatch):
+    """Alle intelligence output (feed, parts, history JSON + SQLite, versies) in een tijdelijke map"""
+    import content_store
+    import history_store
+    import local_api
+    import perplexity_monitor
+
+    for module in (perplexity_monitor, local_api):
+        monkeypatch.setattr(module, "OUTPUT_DIR", tmp_path)
+        monkeypatch.setattr(module, "OUTPUT_FILE", tmp_path / "intelligence_feed.json")
+        monkeypatch.setattr(module, "HISTORY_FILE", tmp_path / "intelligence_history.json")
+    monkeypatch.setattr(perplexity_monitor, "FEED_PARTS_DIR", tmp_path / "feed_parts")
+    monkeypatch.setattr(history_store, "HISTORY_FILE", tmp_path / "intelligence_history.json")
+    monkeypatch.setattr(history_store, "HISTORY_DB", tmp_path / "intelligence_history.db")
+    monkeypatch.setattr(content_store, "VERSIONS_DIR", tmp_path / "versions")
+    return tmp_path
@@ -0,0 +1,118 @@
+"""Smoke tests voor bridge/claude-mem-bridge.py (stdlib + pytest)"""
+
+import argparse
+import importlib.util
+import sqlite3
+from pathlib import Path
+
+from benchmark import CLAUDE_MEM_SCHEMA
+
+BRIDGE = Path(__file__).resolve().parent.parent / "bridge" / "claude-mem-bridge.py"
+
+
+def load_bridge():
+    spec = importlib.util.spec_from_file_location("claude_mem_bridge", BRIDGE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def claude_mem_db(tmp_path, monkeypatch, bridge):
+    """Lege database met het schema (incl. FTS triggers) van de claude-mem plugin"""
+    db_path = tmp_path / "claude-mem.db"
+    db = sqlite3.connect(db_path)
+    db.executescript(CLAUDE_MEM_SCHEMA)
+    db.close()
+    monkeypatch.setattr(bridge, "DB_PATH", str(db_path))
+    monkeypatch.setattr(bridge, "ARCHIVE_PATH", str(tmp_path / "archive.db"))
+    monkeypatch.setattr(bridge, "SPOOL_DIR", str(tmp_path / "spool"))
+    return db_path
+
+
+def observation(bridge, n, epoch):
+    row = bridge.build_observation(argparse.Namespace(
+        source="manual", title=f"Deploy {n}", text=f"deploy {n} met wrangler naar pages " * 40, project=None,
+        type="discovery", subtitle=None, facts=None, concepts=None, files_read=None, files_modified=None))
+    row["created_at_epoch"] = epoch
+    return row
+
+
+def test_compress_leaves_plugin_columns_alone(tmp_path, monkeypatch, capsys):
+    bridge = load_bridge()
+    db_path = claude_mem_db(tmp_path, monkeypatch, bridge)
+    db = bridge.get_db()
+    bridge.write_observations(db, [observation(bridge, n, epoch) for n, epoch in enumerate([1000] * 3 + [2_000_000_000] * 2)])
+    db.close()
+
+    bridge.compress(argparse.Namespace(off=False, codec="zlib", min_chars=100, vacuum=False))
+    bridge.archive(argparse.Namespace(before=2000, older_than=365, dry_run=False))
+
+    db = sqlite3.connect(db_path)
+    assert db.execute("SELECT COUNT(*) FROM observations WHERE text = '' OR text_z IS NOT NULL").fetchone()[0] == 0
+    # De plugin herbouwt zijn FTS index uit de opgeslagen kolommen: niets mag wegvallen
+    db.execute("INSERT INTO observations_fts(observations_fts) VALUES('rebuild')")
+    assert db.execute("SELECT COUNT(*) FROM observations_fts WHERE observations_fts MATCH 'wrangler'").fetchone()[0] == 2
+    db.close()
+
+    db = bridge.get_db()
+    bridge.attach_archive(db)
+    assert db.execute("SELECT COUNT(*) FROM archive.observations WHERE text = '' AND text_z IS NOT NULL").fetchone()[0] == 3
+    hits = bridge.fts_query(db, "archive", "wrangler", 10)
+    assert len(hits) == 3 and all(">>>wrangler<<<" in hit[5] for hit in hits)
+    db.close()
+
+    bridge.compress(argparse.Namespace(off=True, codec="zlib", min_chars=100, vacuum=False))
+    db = bridge.get_db()
+    bridge.attach_archive(db)
+    assert db.execute("SELECT COUNT(*) FROM archive.observations WHERE text_z IS NOT NULL").fetchone()[0] == 0
+    assert len(bridge.fts_query(db, "archive", "wrangler", 10)) == 3
+    db.close()
+
+
+def test_compress_restores_hot_tier_rows_from_older_versions(tmp_path, monkeypatch):
+    bridge = load_bridge()
+    claude_mem_db(tmp_path, monkeypatch, bridge)
+    db = bridge.get_db()
+    ((obs_id, _),) = bridge.write_observations(db, [observation(bridge, 1, 2_000_000_000)])
+    # Zoals een eerdere versie het deed: lege plugin-kolommen, BLOBs ernaast, FTS met de platte tekst
+    row = dict(zip([d[0] for d in db.execute("SELECT * FROM observations").description],
+                   db.execute("SELECT * FROM observations").fetchone()))
+    blobs = {f"{f}_z": bridge.compress_text(row[f]) for f in bridge.BODY_FIELDS}
+    db.execute("UPDATE observations SET text = '', narrative = '', text_z = ?, narrative_z = ? WHERE id = ?",
+               (blobs["text_z"], blobs["narrative_z"], obs_id))
+    bridge.fts_swap(db, obs_id, bridge.stored_body({**row, **blobs}), row)
+    db.commit()
+    db.close()
+
+    bridge.compress(argparse.Namespace(off=False, codec="zlib", min_chars=100, vacuum=False))
+
+    db = bridge.get_db()
+    assert db.execute("SELECT text, text_z FROM observations").fetchone() == (row["text"], None)
+    assert db.execute("SELECT COUNT(*) FROM observations_fts WHERE observations_fts MATCH 'wrangler'").fetchone()[0] == 1
+    db.close()
+
+
+def test_bench_semantic_runs_end_to_end(capsys):
+    bridge = load_bridge()
+    bridge.bench_semantic(argparse.Namespace(n=200, words=20, vocab=300, queries=3))
+    out = capsys.readouterr().out
+    assert "Semantic index benchmark" in out
+    assert "Observations: 200" in out
+
+
+def test_bad_spool_row_is_set_aside(tmp_path, monkeypatch):
+    bridge = load_bridge()
+    db_path = tmp_path / "claude-mem.db"
+    columns = ", ".join(c for c in bridge.SPOOL_REQUIRED if c != "content_hash")
+    bridge.sqlite3.connect(db_path).execute(f"CREATE TABLE observations (id INTEGER PRIMARY KEY, {columns})").connection.close()
+    monkeypatch.setattr(bridge, "DB_PATH", str(db_path))
+    monkeypatch.setattr(bridge, "SPOOL_DIR", str(tmp_path / "spool"))
+
+    args = argparse.Namespace(source="manual", title="Spool test", text="hello spool", project=None, type="discovery",
+                              subtitle=None, facts=None, concepts=None, files_read=None, files_modified=None)
+    bridge.spool_observation(bridge.build_observation(args))
+    bridge.spool_observation({"title": "zonder de rest"})
+
+    assert bridge.flush_spool(wait=True, linger_ms=0) == 1
+    assert bridge.spooled_files() == []
+    assert len(list((tmp_path / "spool").glob("*.json.bad"))) == 1
@@ -0,0 +1,83 @@
+"""Versioned content store: reconstructie over keyframes, novelty en /changes?since="""
+
+import json
+
+import pytest
+
+import content_store as cs
+
+
+@pytest.fixture(autouse=True)
+def versions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cs, "VERSIONS_DIR", tmp_path / "versions")
+    monkeypatch.setattr(cs, "KEYFRAME_EVERY", 3)
+    return tmp_path / "versions"
+
+
+def scan(n):
+    return "\n".join(["# Overzicht"] + [f"- punt {i}" for i in range(n, n + 4)] + [f"regel {n}"])
+
+
+def test_reconstruction_across_keyframes(versions_dir):
+    texts = [scan(n) for n in range(8)]
+    for n, text in enumerate(texts):
+        cs.record_version("t", text, [], f"2026-01-0{n + 1}T00:00:00+00:00")
+
+    records = [json.loads(line) for line in (versions_dir / "t.jsonl").read_text().splitlines()]
+    assert [r["version"] for r in records if "base" in r] == [1, 4, 7]
+    for n, text in enumerate(texts):
+        assert cs.content_at("t", n + 1)["content"] == text
+    assert cs.content_at("t")["version"] == 8
+    assert cs.content_at("t", 9) is None
+
+
+def test_delta_roundtrip():
+    old, new = ["a", "b", "c", "d"], ["a", "x", "c", "d", "e"]
+    assert cs.apply_delta(old, cs.make_delta(old, new)) == new
+
+
+def test_novelty_score():
+    first = cs.record_version("t", "- a\n- b\n- c", ["https://x"])
+    assert first["novelty"] == 1.0 and first["version"] == 1
+
+    # 1 nieuwe bullet van 3, 1 nieuwe bron van 2 → 2/5
+    second = cs.record_version("t", "- a\n- b\n- d", ["https://x", "https://y"])
+    assert second["novelty"] == 0.4
+    assert second["added_bullets"] == ["d"] and second["removed_bullets"] == ["c"]
+    assert second["new_citations"] == ["https://y"]
+
+
+def test_identical_scan_has_no_novelty(versions_dir):
+    cs.record_version("t", "- a", ["https://x"])
+    cs.record_version("t", "- a\n- b", ["https://x", "https://y"])
+    same = cs.record_version("t", "- a\n- b", ["https://x", "https://y"])
+    assert same["version"] == 2
+    assert same["novelty"] == 0.0 and same["new_citations"] == [] and same["added_bullets"] == []
+    assert len((versions_dir / "t.jsonl").read_text().splitlines()) == 2
+
+
+def test_changes_since(api):
+    import local_api
+
+    topic = local_api.TOPICS[0]["id"]
+    for n in range(5):
+        cs.record_version(topic, scan(n), [f"https://{n}"], f"2026-01-0{n + 1}T00:00:00+00:00")
+
+    status, _, body = api(f"/api/intelligence/changes?topic={topic}&since=2")
+    data = json.loads(body)
+    assert status == 200 and data["latest_version"] == 5
+    assert [c["version"] for c in data["changes"]] == [3, 4, 5]
+    # Versie 4 is een keyframe, maar komt als delta t.o.v. versie 3 terug
+    lines = scan(1).splitlines()  # versie 2
+    for change in data["changes"]:
+        lines = cs.apply_delta(lines, change["delta"])
+    assert "\n".join(lines) == scan(4)
+
+    status, _, body = api(f"/api/intelligence/changes?topic={topic}&since=2026-01-04T00:00:00Z")
+    assert [c["version"] for c in json.loads(body)["changes"]] == [5]
+
+    status, _, body = api(f"/api/intelligence/changes?topic={topic}")
+    assert [c["version"] for c in json.loads(body)["changes"]] == [5]
+
+    assert api(f"/api/intelligence/changes?topic={topic}&since=gisteren")[0] == 400
+    assert api("/api/intelligence/changes?topic=bestaat-niet")[0] == 400
@@ -0,0 +1,153 @@
+"""scripts/dump_analyzer.py: prompt cache meting, model routing, map-reduce chunking en batch splitting"""
+
+import pytest
+
+pytest.importorskip("httpx")  # dump_analyzer importeert httpx op moduleniveau
+
+import dump_analyzer as da
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    logged = []
+    monkeypatch.setattr(da, "log", logged.append)
+    monkeypatch.setattr(da, "log_err", logged.append)
+    da.start_cycle()
+    return logged
+
+
+def test_system_prompt_is_a_cache_marked_block():
+    _, _, body = da._claude_request("prompt", 100)
+    assert body["system"] == [{"type": "text", "text": da.SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    assert body["messages"] == [{"role": "user", "content": "prompt"}]
+
+
+def test_cache_counters_per_call(monkeypatch, quiet):
+    usage = iter([
+        {"input_tokens": 50, "output_tokens": 9, "cache_creation_input_tokens": 1200, "cache_read_input_tokens": 0},
+        {"input_tokens": 40, "output_tokens": 7, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 1200},
+        {"input_tokens": 30, "output_tokens": 5},
+    ])
+    monkeypatch.setattr(da, "_post_claude", lambda prompt, max_tokens, model: {
+        "content": [{"type": "text", "text": "ok"}], "usage": next(usage)})
+
+    for _ in range(3):
+        assert da.ask_claude("prompt", stream=False) == "ok"
+
+    calls = [r for r in da.cycle_spans if r["stage"] == "ask_claude"]
+    assert [(r["cache_write_tokens"], r["cache_read_tokens"]) for r in calls] == [(1200, 0), (0, 1200), (0, 0)]
+    da.print_cycle_summary()
+    assert any("1200 read / 1200 write / 120 ongecached" in line for line in quiet)
+
+
+@pytest.mark.parametrize("kind, chars, memo, name", [
+    ("chunk", 5000, False, "chunk"),
+    ("note", 200, False, "short-generic"),
+    ("note", 200, True, "short-targeted"),
+    ("twitter", 3000, False, "default"),
+    ("youtube", 9000, True, "long"),
+])
+def test_pick_route(kind, chars, memo, name):
+    assert da.pick_route(kind, chars, memo)["name"] == name
+
+
+def test_split_chunks_covers_text_on_sentence_boundaries():
+    text = " ".join(f"Zin nummer {n} met wat woorden." for n in range(400))
+    chunks = da.split_chunks(text, size=1000, overlap=50)
+
+    assert len(chunks) > 1 and all(len(c) <= 1000 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    assert chunks[0].startswith("Zin nummer 0 ") and chunks[-1].endswith("Zin nummer 399 met wat woorden.")
+    assert da.split_chunks("kort") == ["kort"] and da.split_chunks("") == []
+
+
+def test_split_chunks_without_spaces_still_progresses():
+    chunks = da.split_chunks("x" * 2500, size=1000, overlap=100)
+    assert [len(c) for c in chunks] == [1000, 1000, 700]
+
+
+def test_short_text_is_a_single_call(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(da, "ask_claude", lambda prompt, **kw: prompts.append(prompt) or "analyse")
+    assert da.summarize_long({"memo": ""}, "URL: x", "Content", "kort") == "analyse"
+    assert len(prompts) == 1 and "Content: kort" in prompts[0]
+
+
+def test_long_text_maps_chunks_then_reduces(monkeypatch):
+    calls = []
+
+    def ask(prompt, max_tokens=None, stream=None, kind=None):
+        calls.append((kind, prompt))
+        if kind == "chunk":
+            part = prompt.split("Dit is deel ", 1)[1].split("/", 1)[0]
+            return f"samenvatting {part}"
+        return "eindanalyse"
+
+    monkeypatch.setattr(da, "ask_claude", ask)
+    text = " ".join(f"Feit {n}." for n in range(2000))
+    assert da.summarize_long({"memo": "tools"}, "URL: x", "Transcript", text) == "eindanalyse"
+
+    maps = [p for k, p in calls if k == "chunk"]
+    reduce_prompt = calls[-1][1]
+    assert len(maps) == len(da.split_chunks(text)) and calls[-1][0] is None
+    assert all("FOCUS: tools" in p for p in maps)
+    # Volgorde van de delen blijft behouden, ook al lopen de map calls parallel
+    assert reduce_prompt.index("Deel 1:\nsamenvatting 1") < reduce_prompt.index(f"Deel {len(maps)}:\nsamenvatting {len(maps)}")
+    assert [s["chunks"] for s in da.cycle_spans if s["stage"] == "map_reduce"] == [len(maps)]
+
+
+def test_batch_prompt_numbers_each_item():
+    prompt = da.build_batch_prompt(["eerste", "tweede"])
+    assert "<<<ITEM 1>>>\neerste" in prompt and "<<<ITEM 2>>>\ntweede" in prompt
+
+
+def test_split_batch_response():
+    text = "inleiding\n<<<ITEM 1>>>\neen\n<<<ITEM 2>>>  \n\n<<<ITEM 3>>>\ndrie\n<<<ITEM 3>>>\nnog eens\n<<<ITEM 9>>>\nnegen"
+    # 2 is leeg, 3 dubbel, 9 bestaat niet; tekst vóór de eerste marker telt niet mee
+    assert da.split_batch_response(text, 4) == {1: "een"}
+    assert da.split_batch_response("geen markers", 2) == {}
+
+
+@pytest.fixture
+def pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(da, "OUTBOX_DB", tmp_path / "outbox.db")
+    return [{"id": n, "type": "note", "content": f"notitie {n}"} for n in range(1, 4)]
+
+
+def test_batch_answers_are_mapped_to_item_ids(monkeypatch, pending):
+    monkeypatch.setattr(da, "ask_claude", lambda prompt, **kw: "<<<ITEM 1>>>\nA\n<<<ITEM 2>>>\nB\n<<<ITEM 3>>>\nC")
+    assert da.analyze_batch(pending) == {1: "A", 2: "B", 3: "C"}
+
+
+def test_unparsed_batch_items_fall_back_to_single_calls(monkeypatch, pending):
+    calls = []
+
+    def ask(prompt, max_tokens=None, stream=None, kind=None):
+        calls.append(kind)
+        return "<<<ITEM 2>>>\nB" if kind == "batch" else "los"
+
+    monkeypatch.setattr(da, "ask_claude", ask)
+    items, changed = da.analyze_pending(pending)
+
+    assert changed and calls == ["batch", None, None]
+    assert [i["analysis"] for i in items] == ["los", "B", "los"]
+    assert all(i["analyzed_by"] == "MM4-local" for i in items)
+
+
+def test_failed_batch_call_analyzes_everything_separately(monkeypatch, pending):
+    def ask(prompt, max_tokens=None, stream=None, kind=None):
+        if kind == "batch":
+            raise RuntimeError("timeout")
+        return "los"
+
+    monkeypatch.setattr(da, "ask_claude", ask)
+    items, _ = da.analyze_pending(pending)
+    assert [i["analysis"] for i in items] == ["los"] * 3
+
+
+def test_batch_size_one_disables_batching(monkeypatch, pending):
+    kinds = []
+    monkeypatch.setattr(da, "BATCH_SIZE", 1)
+    monkeypatch.setattr(da, "ask_claude", lambda prompt, **kw: kinds.append(kw.get("kind")) or "los")
+    da.analyze_pending(pending)
+    assert kinds == [None, None, None]
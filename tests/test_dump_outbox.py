@@ -0,0 +1,96 @@
+"""Outbox van scripts/dump_analyzer.py: hergebruik, backoff en batch flush"""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("httpx")  # dump_analyzer importeert httpx op moduleniveau
+
+import dump_analyzer as da
+
+
+@pytest.fixture(autouse=True)
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(da, "OUTBOX_DB", tmp_path / "outbox.db")
+    monkeypatch.setattr(da, "log", lambda msg: None)
+
+
+def put(item_id, analysis="analyse"):
+    da.outbox_put({"id": item_id, "analysis": analysis, "analyzed_by": "MM4-local", "analyzed_at": "2026-01-01"})
+
+
+def test_lookup_only_reuses_pending_rows():
+    put(1)
+    put(2)
+    put(3)
+    da.outbox_mark([2], "flushed")
+    da.outbox_mark([3], "rejected")
+    assert set(da.outbox_lookup([1, 2, 3, 4])) == {1}
+
+
+def test_reset_item_gets_a_fresh_analysis(monkeypatch):
+    # Geflusht en daarna in het dashboard gereset (♻️): niet de oude analyse terugzetten
+    put(7, "oude analyse")
+    da.outbox_mark([7], "flushed")
+    monkeypatch.setattr(da, "BATCH_SIZE", 1)
+    monkeypatch.setattr(da, "ANALYZERS", {"note": lambda item: "verse analyse"})
+    items = [{"id": 7, "type": "note", "content": "x", "analysis": "", "analyzed": False}]
+    items, changed = da.analyze_pending(items)
+    assert changed
+    assert items[0]["analysis"] == "verse analyse"
+
+
+def test_backoff_doubles_and_hides_rows_until_due(monkeypatch):
+    put("a")
+    now = [1000.0]
+    monkeypatch.setattr(da.time, "time", lambda: now[0])
+    da.outbox_backoff(["a"])
+    assert da.outbox_due() == []
+    now[0] += 10
+    (row,) = da.outbox_due()
+    assert row["attempts"] == 1 and row["next_attempt"] == 1010
+    da.outbox_backoff(["a"])
+    now[0] += 19
+    assert da.outbox_due() == []
+    now[0] += 1
+    assert da.outbox_due()[0]["attempts"] == 2
+
+
+def test_backoff_is_capped():
+    put("a")
+    for _ in range(15):
+        da.outbox_backoff(["a"])
+    db = sqlite3.connect(da.OUTBOX_DB)
+    attempts, next_attempt = db.execute("SELECT attempts, next_attempt FROM outbox").fetchone()
+    db.close()
+    assert attempts == 15
+    assert next_attempt - da.time.time() <= da.OUTBOX_MAX_BACKOFF
+
+
+def test_flush_full_list_in_batches(monkeypatch):
+    monkeypatch.setattr(da, "OUTBOX_BATCH", 2)
+    for i in range(5):
+        put(i, f"analyse {i}")
+    cloud = [{"id": i, "analysis": ""} for i in range(5)]
+    saves = []
+    monkeypatch.setattr(da, "get_dump_items", lambda: [dict(i) for i in cloud])
+    monkeypatch.setattr(da, "save_dump_items", lambda items: saves.append(items) or True)
+
+    da.flush_outbox(lease_mode=False)
+
+    assert len(saves) == 3
+    assert {i["id"]: i["analysis"] for i in saves[-1] if i["analysis"]} == {4: "analyse 4"}
+    assert da.outbox_due() == []
+    assert da.outbox_lookup(list(range(5))) == {}
+
+
+def test_flush_failure_backs_off_the_rest(monkeypatch):
+    monkeypatch.setattr(da, "OUTBOX_BATCH", 2)
+    for i in range(5):
+        put(i)
+    monkeypatch.setattr(da, "get_dump_items", lambda: [])
+
+    da.flush_outbox(lease_mode=False)
+
+    assert da.outbox_due() == []
+    assert set(da.outbox_lookup(list(range(5)))) == set(range(5))  # nog steeds pending, niets kwijt
@@ -0,0 +1,87 @@
+"""Streaming in scripts/dump_analyzer.py: SSE parsing en writeback alleen per item"""
+
+import json
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("httpx")  # dump_analyzer importeert httpx op moduleniveau
+
+import dump_analyzer as da
+
+
+class FakeStream:
+    def __init__(self, lines, status_code=200, body=b""):
+        self.lines = lines
+        self.status_code = status_code
+        self.body = body
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def read(self):
+        return self.body
+
+
+def sse(event):
+    return "data: " + json.dumps(event)
+
+
+def fake_stream(monkeypatch, response):
+    @contextmanager
+    def stream(method, url, headers=None, json=None, timeout=None):
+        assert json["stream"] is True
+        yield response
+    monkeypatch.setattr(da.httpx, "stream", stream)
+
+
+def test_stream_claude_parses_sse(monkeypatch):
+    fake_stream(monkeypatch, FakeStream([
+        "event: message_start",
+        sse({"type": "message_start", "message": {"usage": {"input_tokens": 12, "cache_read_input_tokens": 0}}}),
+        "",
+        sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+        sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "- een"}}),
+        ": ping",
+        sse({"type": "content_block_delta", "delta": {"type": "input_json_delta", "partial_json": "{}"}}),
+        sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "\n- twee"}}),
+        sse({"type": "message_delta", "usage": {"output_tokens": 7}}),
+        sse({"type": "message_stop"}),
+    ]))
+    seen, sp = [], {}
+    data = da._stream_claude("prompt", 100, seen.append, sp)
+    assert data["content"] == [{"type": "text", "text": "- een\n- twee"}]
+    assert data["usage"]["input_tokens"] == 12 and data["usage"]["output_tokens"] == 7
+    assert seen == ["- een", "- een\n- twee"]
+    assert "first_token_ms" in sp
+
+
+def test_stream_claude_error_event(monkeypatch):
+    fake_stream(monkeypatch, FakeStream([
+        sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "half"}}),
+        sse({"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}),
+    ]))
+    assert da._stream_claude("prompt", 100, lambda text: None, {}) == {
+        "error": {"type": "overloaded_error", "message": "Overloaded"}}
+
+
+def test_stream_claude_non_200_returns_json_body(monkeypatch):
+    fake_stream(monkeypatch, FakeStream([], status_code=529, body=b'{"error": {"message": "busy"}}'))
+    assert da._stream_claude("prompt", 100, lambda text: None, {}) == {"error": {"message": "busy"}}
+
+
+def test_streaming_without_publish_is_off(monkeypatch):
+    monkeypatch.setattr(da, "STREAM", True)
+    monkeypatch.setattr(da, "save_dump_items", lambda items: pytest.fail("hele lijst gepusht"))
+    with da.streaming_to({"id": 1}):
+        assert da._stream_sink.get() is None
+
+
+def test_streaming_publishes_single_item(monkeypatch):
+    monkeypatch.setattr(da, "STREAM", True)
+    published = []
+    item = {"id": 1}
+    with da.streaming_to(item, publish=lambda i: published.append(dict(i))):
+        da._stream_sink.get()("deel")
+        da._stream_sink.get()("deel twee")  # binnen STREAM_FLUSH_SECONDS: gethrottled
+    assert published == [{"id": 1, "analysis": "deel ⏳", "analyzing": True, "analyzed_by": da.STREAMING_MARKER}]
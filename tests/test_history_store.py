@@ -0,0 +1,85 @@
+"""scripts/history_store.py: import uit de JSON history, keyset-paginatie en aggregaten"""
+
+import json
+
+import pytest
+
+import history_store
+
+
+def entry(n, topic="ai", day=1):
+    return {"id": topic, "timestamp": f"2026-03-{day:02d}T{n % 24:02d}:00:00+00:00", "tokens": 10 * n}
+
+
+@pytest.fixture
+def store(intel_dir):
+    for n in range(7):
+        history_store.record(entry(n, topic="ai" if n % 2 else "sec", day=2 + n // 3))
+    return intel_dir
+
+
+def test_keyset_pages_cover_everything_once(store):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = history_store.query(limit=3, cursor=cursor)
+        seen.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert [i["tokens"] for i in seen] == [60, 50, 40, 30, 20, 10, 0]  # nieuwste eerst
+
+
+def test_new_rows_do_not_shift_later_pages(store):
+    first = history_store.query(limit=3)
+    history_store.record(entry(99))
+    second = history_store.query(limit=3, cursor=first["next_cursor"])
+    assert [i["tokens"] for i in second["items"]] == [30, 20, 10]
+
+
+def test_filters_and_exact_last_page(store):
+    page = history_store.query(topic="ai", limit=3)
+    assert [i["tokens"] for i in page["items"]] == [50, 30, 10]
+    assert page["next_cursor"] is None
+
+    page = history_store.query(since="2026-03-03T00:00:00+00:00", until="2026-03-04T00:00:00+00:00")
+    assert [i["tokens"] for i in page["items"]] == [50, 40, 30]
+
+
+def test_extra_fields_round_trip(intel_dir):
+    history_store.record({**entry(1), "novelty": 0.5})
+    assert history_store.query()["items"] == [{**entry(1), "novelty": 0.5}]
+
+
+def test_invalid_input_raises_value_error(store):
+    with pytest.raises(ValueError):
+        history_store.query(limit="veel")
+    with pytest.raises(ValueError):
+        history_store.query(since="gisteren")
+
+
+def test_aggregates(store):
+    result = history_store.aggregates()
+    assert result["total_scans"] == 7 and result["total_tokens"] == 210
+    assert {"day": "2026-03-02", "topic": "sec", "tokens": 20, "scans": 2} in result["tokens_per_day"]
+    assert sum(w["scans"] for w in result["scans_per_week"]) == 7
+
+    assert history_store.aggregates(topic="nope") == {
+        "tokens_per_day": [], "scans_per_week": [], "total_scans": 0, "total_tokens": 0}
+
+
+def test_legacy_json_is_imported_once(intel_dir):
+    (intel_dir / "intelligence_history.json").write_text(json.dumps([entry(1), entry(2)]))
+    assert len(history_store.query()["items"]) == 2
+    assert len(history_store.query()["items"]) == 2
+
+
+def test_history_endpoint_uses_cursor(api, store):
+    status, _, body = api("/api/intelligence/history?limit=4")
+    page = json.loads(body)
+    assert status == 200 and len(page["items"]) == 4
+
+    status, _, body = api(f"/api/intelligence/history?limit=4&cursor={page['next_cursor']}&fields=tokens")
+    assert json.loads(body) == {"items": [{"tokens": 20}, {"tokens": 10}, {"tokens": 0}], "next_cursor": None}
+    assert api("/api/intelligence/history?since=gisteren")[0] == 400
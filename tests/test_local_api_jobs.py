@@ -0,0 +1,165 @@
+"""Scan job queue van scripts/local_api.py: coalescing, prioriteit, annuleren en de worker"""
+
+import json
+
+import pytest
+
+import local_api
+
+
+@pytest.fixture(autouse=True)
+def queue(monkeypatch):
+    """Lege wachtrij zonder worker thread: jobs blijven 'queued' tot een test ze zelf draait"""
+    monkeypatch.setattr(local_api, "scan_jobs", {})
+    monkeypatch.setattr(local_api, "job_queue", [])
+    monkeypatch.setattr(local_api, "start_scan_worker", lambda: None)
+
+
+def start(job):
+    """Wat _scan_worker doet bij het oppakken van een job"""
+    with local_api.jobs_lock:
+        job["status"] = "running"
+
+
+def test_new_job_and_queued_overlap_merges():
+    first, coalesced = local_api.submit_scan([0, 1])
+    assert not coalesced and first["status"] == "queued"
+
+    merged, coalesced = local_api.submit_scan([1, 2])
+    assert coalesced and merged is first
+    assert first["topics"] == [0, 1, 2] and first["requesters"] == 2
+
+    other, coalesced = local_api.submit_scan([3])
+    assert not coalesced and other is not first
+
+
+def test_running_job_only_covers_a_subset():
+    job, _ = local_api.submit_scan([0, 1])
+    start(job)
+
+    joined, coalesced = local_api.submit_scan([1])
+    assert coalesced and joined is job and job["requesters"] == 2
+
+    # Topic 2 zit niet in de draaiende job: nieuwe job, de draaiende blijft ongewijzigd
+    extra, coalesced = local_api.submit_scan([1, 2])
+    assert not coalesced and job["topics"] == [0, 1]
+
+
+def test_priority_bump_reorders_queue():
+    low, _ = local_api.submit_scan([0])
+    high, _ = local_api.submit_scan([1])
+    assert local_api.queue_position(low["id"]) == 1
+
+    local_api.submit_scan([1], priority=5)
+    assert high["priority"] == 5
+    assert local_api.queue_position(high["id"]) == 1
+    assert local_api.queue_position(low["id"]) == 2
+
+
+def test_cancel_waits_for_last_requester():
+    job, _ = local_api.submit_scan([0])
+    local_api.submit_scan([0])
+
+    local_api.cancel_job(job["id"])
+    assert job["status"] == "queued" and job["requesters"] == 1
+    local_api.cancel_job(job["id"])
+    assert job["status"] == "cancelled" and job["finished_at"]
+    assert local_api.queue_position(job["id"]) == 0
+
+
+def test_cancel_running_job_requests_stop_and_blocks_coalescing():
+    job, _ = local_api.submit_scan([0])
+    start(job)
+    local_api.cancel_job(job["id"])
+    assert job["status"] == "running" and job["cancel_requested"]
+
+    fresh, coalesced = local_api.submit_scan([0])
+    assert not coalesced and fresh is not job
+    assert local_api.cancel_job("onbekend") is None
+
+
+def test_job_view_is_a_snapshot():
+    job, _ = local_api.submit_scan([0])
+    local_api._set_result(job, "x", {"success": True}, tokens=10)
+    with local_api.jobs_lock:
+        view = local_api._job_view(job)
+
+    local_api._set_result(job, "y", {"success": True})
+    job["results"]["x"]["success"] = False
+    assert "cancel_requested" not in view
+    assert view["results"] == {"x": {"success": True}} and view["tokens_used"] == 10
+
+
+@pytest.fixture
+def scanner(intel_dir, monkeypatch):
+    """_run_job zonder netwerk: query_topic geeft vaste content en roept optioneel een hook aan"""
+    calls = []
+    monkeypatch.setattr(local_api, "RATE_LIMIT_DELAY", 0)
+    monkeypatch.setattr(local_api, "load_provider_keys", lambda providers: {"perplexity": "key"})
+
+    def query_topic(topic, keys):
+        calls.append(topic["id"])
+        if scanner.hook:
+            scanner.hook()
+        return {"success": True, "content": f"- {topic['id']}", "citations": [], "tokens_used": 100,
+                "model": "sonar"}
+
+    monkeypatch.setattr(local_api, "query_topic", query_topic)
+    scanner.hook = None
+    scanner.calls = calls
+    return scanner
+
+
+def test_run_job_scans_all_topics(scanner, intel_dir):
+    job, _ = local_api.submit_scan([0, 1])
+    start(job)
+    local_api._run_job(job)
+
+    topic_ids = [local_api.TOPICS[i]["id"] for i in (0, 1)]
+    assert scanner.calls == topic_ids
+    assert job["status"] == "done" and job["tokens_used"] == 200
+    assert all(job["results"][t]["success"] for t in topic_ids)
+    feed = json.loads((intel_dir / "intelligence_feed.json").read_text())
+    assert set(topic_ids) <= feed["entries"].keys()
+
+
+def test_run_job_stops_after_cancel(scanner):
+    job, _ = local_api.submit_scan([0, 1, 2])
+    start(job)
+    scanner.hook = lambda: local_api.cancel_job(job["id"])
+    local_api._run_job(job)
+
+    assert len(scanner.calls) == 1
+    assert job["status"] == "cancelled"
+    assert job["progress"] == "Geannuleerd na 1/3 topics"
+
+
+def test_run_job_without_keys_is_an_error(scanner, monkeypatch):
+    monkeypatch.setattr(local_api, "load_provider_keys", lambda providers: {})
+    job, _ = local_api.submit_scan([0])
+    start(job)
+    local_api._run_job(job)
+    assert job["status"] == "error" and "API key" in job["error"]
+    assert scanner.calls == []
+
+
+def test_scan_and_cancel_endpoints(api):
+    status, _, body = api("/api/intelligence/scan", "POST", {"Content-Type": "application/json"},
+                          json.dumps({"topics": [0, 1], "priority": 2}))
+    created = json.loads(body)
+    assert status == 200 and created["status"] == "queued" and created["position"] == 1
+
+    status, _, body = api("/api/intelligence/scan", "POST", {"Content-Type": "application/json"},
+                          json.dumps({"topics": [1]}))
+    assert json.loads(body)["status"] == "coalesced"
+
+    status, _, body = api("/api/intelligence/scan", "POST", {"Content-Type": "application/json"},
+                          json.dumps({"topics": [999]}))
+    assert status == 400
+
+    job_id = created["job_id"]
+    assert json.loads(api(f"/api/intelligence/jobs/{job_id}")[2])["requesters"] == 2
+    api(f"/api/intelligence/jobs/{job_id}", "DELETE")
+    status, _, body = api(f"/api/intelligence/jobs/{job_id}/cancel", "POST")
+    assert status == 200 and json.loads(body)["status"] == "cancelled"
+    assert api("/api/intelligence/jobs/onbekend")[0] == 404
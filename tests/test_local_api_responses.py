@@ -0,0 +1,121 @@
+"""Responses van scripts/local_api.py: route labels, /metrics, compressie, ?fields= en paginatie"""
+
+import gzip
+import json
+
+import pytest
+
+import local_api
+
+
+@pytest.mark.parametrize("path, label", [
+    ("/health", "/health"),
+    ("/api/intelligence/feed?fields=id", "/api/intelligence/feed"),
+    ("/api/intelligence/jobs/abc123", "/api/intelligence/jobs/:id"),
+    ("/api/intelligence/jobs/abc123/cancel", "/api/intelligence/jobs/:id/cancel"),
+    ("/api/intelligence/versions/ai-news", "/api/intelligence/versions/:topic"),
+    ("/wp-login.php", "other"),
+    (None, "invalid"),
+])
+def test_route_label(path, label):
+    assert local_api.route_label(path) == label
+
+
+def test_route_label_with_static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_api, "STATIC_DIR", tmp_path)
+    assert local_api.route_label("/assets/index-abc123.js") == "/assets/:file"
+    assert local_api.route_label("/settings") == "static"
+    assert local_api.route_label("/api/unknown") == "other"
+
+
+def test_metrics_endpoint_counts_requests(api):
+    before = local_api.HTTP_REQUESTS.value(method="GET", route="other", status="404")
+    api("/nope/1")
+    api("/nope/2")
+    status, headers, body = api("/metrics")
+
+    assert status == 200 and headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert local_api.HTTP_REQUESTS.value(method="GET", route="other", status="404") == before + 2
+    assert "# TYPE ccc_http_request_duration_seconds histogram" in body.decode()
+
+
+@pytest.mark.parametrize("accept, available, expected", [
+    ("gzip, deflate, br", ("br", "gzip"), "br"),
+    ("gzip, br;q=0", ("br", "gzip"), "gzip"),
+    ("br", ("gzip",), None),
+    ("*", ("gzip",), "gzip"),
+    ("*, gzip;q=0", ("gzip",), None),
+    ("identity", ("br", "gzip"), None),
+    (None, ("gzip",), None),
+    ("gzip;q=abc", ("gzip",), None),
+])
+def test_negotiate_encoding(accept, available, expected):
+    assert local_api.negotiate_encoding(accept, available) == expected
+
+
+def test_compress_body_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(local_api, "_compress_cache", local_api.OrderedDict())
+    monkeypatch.setattr(local_api, "COMPRESS_CACHE_SIZE", 2)
+    for key in ("a", "b", "c"):
+        assert gzip.decompress(local_api.compress_body(key.encode() * 10, "gzip", key)) == key.encode() * 10
+    assert [k for k, _ in local_api._compress_cache] == ["b", "c"]
+    # Treffer komt uit de cache, ook als de body intussen anders is
+    assert gzip.decompress(local_api.compress_body(b"nieuw", "gzip", "c")) == b"c" * 10
+
+
+def test_apply_fields():
+    record = {"id": "a", "topic": "AI", "content": "lang"}
+    assert local_api.apply_fields(record, ["id", "topic"]) == {"id": "a", "topic": "AI"}
+    assert local_api.apply_fields(record, ["-content"]) == {"id": "a", "topic": "AI"}
+    assert local_api.apply_fields(record, []) is record
+    assert local_api.apply_fields("geen dict", ["id"]) == "geen dict"
+
+
+def test_paginate():
+    records = list(range(10))
+    assert local_api.paginate(records, {}) == (records, 10)
+    assert local_api.paginate(records, {"offset": "8"}) == ([8, 9], 10)
+    assert local_api.paginate(records, {"offset": "-3", "limit": "2"}) == ([0, 1], 10)
+
+
+@pytest.fixture
+def history_file(intel_dir):
+    entries = [{"id": f"t{i % 3}", "timestamp": f"2026-01-0{i + 1}T00:00:00+00:00", "tokens": i, "content": "x" * 50}
+               for i in range(6)]
+    (intel_dir / "intelligence_history.json").write_text(json.dumps(entries))
+    return entries
+
+
+def test_history_pagination_and_fields(api, history_file):
+    status, headers, body = api("/api/intelligence/history?offset=2&limit=3&fields=-content")
+    assert status == 200 and headers["x-total-count"] == "6"
+    assert json.loads(body) == [{k: v for k, v in e.items() if k != "content"} for e in history_file[2:5]]
+
+    status, headers, body = api("/api/intelligence/history")
+    assert json.loads(body) == history_file and "x-total-count" not in headers
+
+
+def test_invalid_offset_is_400_and_corrupt_file_is_500(api, intel_dir):
+    assert api("/api/intelligence/history?offset=x")[0] == 400
+    assert api("/api/intelligence/topics?limit=x")[0] == 400
+
+    (intel_dir / "intelligence_history.json").write_text("[{half")
+    status, _, body = api("/api/intelligence/history?offset=0")
+    assert status == 500 and json.loads(body) == {"error": "intelligence_history unavailable"}
+
+
+def test_large_json_is_gzipped_on_request(api, history_file, intel_dir):
+    entries = history_file * 20
+    (intel_dir / "intelligence_history.json").write_text(json.dumps(entries))
+
+    status, headers, body = api("/api/intelligence/history", headers={"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["content-encoding"] == "gzip" and headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(body)) == entries
+
+    status, headers, body = api("/api/intelligence/history", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in headers and json.loads(body) == entries
+
+
+def test_small_responses_stay_uncompressed(api):
+    status, headers, _ = api("/health", headers={"Accept-Encoding": "gzip"})
+    assert status == 200 and "content-encoding" not in headers
@@ -0,0 +1,48 @@
+"""local_api --static: asset cache (normalisatie, containment, LRU) en cache headers"""
+
+import pytest
+
+import local_api
+
+
+@pytest.fixture
+def dist(tmp_path, monkeypatch):
+    root = tmp_path / "dist"
+    (root / "assets").mkdir(parents=True)
+    (root / "index.html").write_text("<!doctype html><title>CCC</title>")
+    (root / "assets" / "index-AbCd1234.js").write_text("console.log(1)")
+    (root / "assets" / "app.min.js").write_text("console.log(2)")
+    (tmp_path / "secret.txt").write_text("geheim")
+    monkeypatch.setattr(local_api, "STATIC_DIR", root.resolve())
+    monkeypatch.setattr(local_api, "_static_cache", local_api.OrderedDict())
+    return root
+
+
+def test_path_variants_share_one_cache_entry(dist):
+    asset = local_api.static_asset("/assets/index-AbCd1234.js")
+    for variant in ("/./assets/index-AbCd1234.js", "/assets/../assets/index-AbCd1234.js",
+                    "//assets/index-AbCd1234.js", "/assets//index-AbCd1234.js"):
+        assert local_api.static_asset(variant) is asset
+    assert list(local_api._static_cache) == ["assets/index-AbCd1234.js"]
+
+
+def test_paths_outside_the_root_are_refused(dist):
+    assert local_api.static_asset("/../secret.txt") is None
+    assert local_api.static_asset("/assets/../../secret.txt") is None
+    assert local_api.static_asset("/bestaat-niet.js") is None
+    assert not local_api._static_cache
+
+
+def test_cache_is_bounded(dist, monkeypatch):
+    monkeypatch.setattr(local_api, "STATIC_CACHE_SIZE", 2)
+    for name in ("/index.html", "/assets/index-AbCd1234.js", "/assets/app.min.js"):
+        local_api.static_asset(name)
+    assert list(local_api._static_cache) == ["assets/index-AbCd1234.js", "assets/app.min.js"]
+
+
+def test_cache_headers(dist, api):
+    status, headers, _ = api("/assets/index-AbCd1234.js")
+    assert status == 200 and "immutable" in headers["cache-control"]
+    status, headers, _ = api("/assets/app.min.js")
+    assert status == 200 and headers["cache-control"] == "no-cache" and headers["etag"]
+    assert api("/assets/app.min.js", headers={"If-None-Match": headers["etag"]})[0] == 304
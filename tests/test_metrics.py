@@ -0,0 +1,55 @@
+"""scripts/metrics.py: Counter/Histogram registry en Prometheus text format"""
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Eigen registry per test: de metrics van local_api blijven erbuiten"""
+    monkeypatch.setattr(metrics, "_registry", [])
+
+
+def test_counter_per_label_combination():
+    requests = metrics.Counter("t_requests_total", "Requests", ["route", "status"])
+    requests.inc(route="/health", status=200)
+    requests.inc(route="/health", status=200)
+    requests.inc(3, route="/feed", status=500)
+
+    assert requests.value(route="/health", status=200) == 2
+    assert requests.value(route="/feed", status=500) == 3
+    assert requests.value(route="/feed", status=200) == 0
+    assert metrics.render() == (
+        "# HELP t_requests_total Requests\n"
+        "# TYPE t_requests_total counter\n"
+        't_requests_total{route="/feed",status="500"} 3\n'
+        't_requests_total{route="/health",status="200"} 2\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = metrics.Histogram("t_latency_seconds", "Latency", ["route"], buckets=(0.1, 1))
+    latency.observe(0.05, route="/x")
+    latency.observe(0.5, route="/x")
+    latency.observe(5, route="/x")
+
+    lines = metrics.render().splitlines()
+    assert lines[2:] == [
+        't_latency_seconds_bucket{route="/x",le="0.1"} 1',
+        't_latency_seconds_bucket{route="/x",le="1"} 2',
+        't_latency_seconds_bucket{route="/x",le="+Inf"} 3',
+        't_latency_seconds_sum{route="/x"} 5.55',
+        't_latency_seconds_count{route="/x"} 3',
+    ]
+
+
+def test_label_values_are_escaped_and_unlabeled_metrics_render_bare():
+    odd = metrics.Counter("t_odd_total", "Odd", ["path"])
+    odd.inc(path='a"b\\c\nd')
+    plain = metrics.Counter("t_plain_total", "Plain")
+    plain.inc()
+
+    text = metrics.render()
+    assert 't_odd_total{path="a\\"b\\\\c\\nd"} 1' in text
+    assert "\nt_plain_total 1\n" in text
@@ -0,0 +1,124 @@
+"""scripts/perplexity_monitor.py: token budget, schattingen en scan planning"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import perplexity_monitor as pm
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def isolated(intel_dir, monkeypatch):
+    monkeypatch.setattr(pm, "DAILY_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(pm, "MONTHLY_TOKEN_BUDGET", 0)
+    return intel_dir
+
+
+def scan(topic_id, tokens, age):
+    pm.append_history({"id": topic_id, "timestamp": (NOW - age).isoformat(), "tokens": tokens})
+
+
+def topic(topic_id, frequency="daily"):
+    return {"id": topic_id, "frequency": frequency}
+
+
+def feed_scanned(**ages):
+    return {"entries": {tid: {"scanned_at": (NOW - age).isoformat()} for tid, age in ages.items()}}
+
+
+def test_no_budget_means_unlimited():
+    assert pm.budget_remaining(NOW) is None
+
+
+def test_budget_windows(monkeypatch):
+    monkeypatch.setattr(pm, "DAILY_TOKEN_BUDGET", 1000)
+    monkeypatch.setattr(pm, "MONTHLY_TOKEN_BUDGET", 5000)
+    scan("a", 300, timedelta(hours=2))
+    scan("a", 2000, timedelta(days=3))
+    scan("a", 9999, timedelta(days=31))   # buiten beide vensters
+    assert pm.budget_remaining(NOW) == 700            # dag: 1000 - 300
+    monkeypatch.setattr(pm, "DAILY_TOKEN_BUDGET", 0)
+    assert pm.budget_remaining(NOW) == 2700           # maand: 5000 - 2300
+    scan("a", 4000, timedelta(days=1, hours=1))
+    assert pm.budget_remaining(NOW) == 0              # overschreden → 0, niet negatief
+
+
+def test_monthly_budget_counts_beyond_json_cap(monkeypatch):
+    # De JSON history houdt 500 entries; het budget moet alle scans in het venster tellen
+    monkeypatch.setattr(pm, "MONTHLY_TOKEN_BUDGET", 10_000)
+    for n in range(600):
+        scan(f"t{n % 6}", 10, timedelta(minutes=n))
+    assert len(pm.load_history()) == 500
+    assert pm.budget_remaining(NOW) == 4000
+
+
+def test_estimate_topic_tokens():
+    assert pm.estimate_topic_tokens("a", []) == pm.DEFAULT_TOPIC_ESTIMATE
+    history = [{"id": "a", "tokens": t} for t in (9999, 100, 200, 300, 400, 500)]
+    history.append({"id": "b", "tokens": 50})
+    assert pm.estimate_topic_tokens("a", history) == 300      # laatste ESTIMATE_SAMPLES van dit topic
+    assert pm.estimate_topic_tokens("nieuw", [{"id": "b", "tokens": 100}, {"id": "c", "tokens": 201}]) == 151
+
+
+def test_plan_scan_orders_by_overdue_and_defers(monkeypatch):
+    monkeypatch.setattr(pm, "DAILY_TOKEN_BUDGET", 2500)
+    history = [{"id": "a", "tokens": 1000}, {"id": "b", "tokens": 1000}, {"id": "c", "tokens": 2000}]
+    candidates = [(0, topic("a")), (1, topic("b")), (2, topic("c")), (3, topic("w", "weekly"))]
+    feed = feed_scanned(a=timedelta(hours=30), b=timedelta(days=3), c=timedelta(days=2), w=timedelta(days=1))
+
+    planned, deferred = pm.plan_scan(candidates, feed, history, now=NOW)
+
+    # b (3x achter) en c (2x) eerst; c past niet meer na b, a wel; w nog niet aan de beurt maar past ook niet
+    assert [(i, estimate) for i, _, estimate in planned] == [(1, 1000), (0, 1000)]
+    assert [i for i, _, _ in deferred] == [2, 3]
+    assert "schatting 2000 > resterend 1500" in deferred[0][2]
+
+
+def test_plan_scan_due_only_and_never_scanned():
+    candidates = [(0, topic("a")), (1, topic("w", "weekly")), (2, topic("nieuw"))]
+    feed = feed_scanned(a=timedelta(hours=25), w=timedelta(days=1))
+    planned, deferred = pm.plan_scan(candidates, feed, [], due_only=True, now=NOW)
+    assert [i for i, _, _ in planned] == [2, 0]   # nooit gescand = meest achterstallig
+    assert deferred == []
+
+
+def test_plan_scan_uses_full_history_for_budget(monkeypatch):
+    monkeypatch.setattr(pm, "MONTHLY_TOKEN_BUDGET", 1000)
+    scan("a", 900, timedelta(days=10))
+    planned, deferred = pm.plan_scan([(0, topic("a"))], {"entries": {}}, [{"id": "a", "tokens": 200}], now=NOW)
+    assert planned == [] and deferred[0][2] == "schatting 200 > resterend 100"
+
+
+def feed_with(*topic_ids):
+    return {"version": pm.FEED_VERSION,
+            "entries": {tid: {"id": tid, "content": f"inhoud {tid}\nregel 2"} for tid in sorted(topic_ids)},
+            "meta": {"last_scan": "2026-03-01"}}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_assembled_feed_matches_full_write(monkeypatch, compact):
+    monkeypatch.setattr(pm, "FEED_COMPACT", compact)
+    ids = [t["id"] for t in pm.TOPICS[:3]]
+    feed = feed_with(*ids)
+    pm.save_feed(feed)
+    expected = pm.OUTPUT_FILE.read_bytes()
+
+    pm.split_feed(feed)
+    pm.save_feed_entry(ids[0], feed["entries"][ids[0]])
+    assert pm.OUTPUT_FILE.read_bytes() == expected
+    assert (b"\n" in expected) is not compact
+
+
+def test_parts_of_removed_topics_are_not_served(monkeypatch):
+    current = pm.TOPICS[0]["id"]
+    pm.split_feed(feed_with(current, "verwijderd_topic"))
+    assert not (pm.FEED_PARTS_DIR / "verwijderd_topic.json").exists()
+
+    # Achtergebleven deel van een oudere run
+    (pm.FEED_PARTS_DIR / "nog_ouder.json").write_text('{"id": "nog_ouder"}')
+    pm.save_feed_meta({"last_scan": "2026-03-02"})
+    feed = pm.load_existing_feed()
+    assert set(feed["entries"]) == {current}
+    assert feed["meta"] == {"last_scan": "2026-03-02"}
@@ -12,6 +12,9 @@
  * - GET  /api/dump        → Get all dump items (cloud sync)
  * - POST /api/dump        → Save all dump items (cloud sync + vectorize)
  * - POST /api/dump/add    → Add single dump item
+ * - POST /api/dump/claim  → Claim pending dump items with an expiring lease (multi-analyzer)
+ * - POST /api/dump/renew  → Renew lease (+ optional partial analysis)
+ * - POST /api/dump/complete → Write results under a valid lease, release the rest
  * - GET  /api/tools       → Get tools per machine
  * - POST /api/tools       → Save tools for a machine
  * - GET  /api/search      → SQL text search
@@ -147,6 +150,9 @@ export default {
       if (path === '/api/dump' && request.method === 'GET') return await handleGetDump(request, env);
       if (path === '/api/dump' && request.method === 'POST') return await handleSaveDump(request, env);
       if (path === '/api/dump/add' && request.method === 'POST') return await handleAddDumpItem(request, env);
+      if (path === '/api/dump/claim' && request.method === 'POST') return await handleClaimDump(request, env);
+      if (path === '/api/dump/renew' && request.method === 'POST') return await handleRenewDump(request, env);
+      if (path === '/api/dump/complete' && request.method === 'POST') return await handleCompleteDump(request, env);
       if (path === '/api/scrape' && request.method === 'POST') return await handleScrape(request, env);
       if (path === '/api/dump/analyze' && request.method === 'POST') return await handleDumpAnalyze(request, env);
       if (path === '/api/tools' && request.method === 'GET') return await handleGetTools(request, env);
@@ -253,9 +259,20 @@ async function handleAIProxy(request, env) {
       model: body.model || 'claude-sonnet-4-20250514',
       max_tokens: body.max_tokens || 1000,
       messages: body.messages,
+      // System blocks (incl. cache_control) ongewijzigd doorgeven voor prompt caching
+      ...(body.system ? { system: body.system } : {}),
+      ...(body.stream ? { stream: true } : {}),
     }),
   });
 
+  // Streaming: SSE body direct doorgeven aan de client (dump analyzer)
+  if (body.stream && response.ok) {
+    return new Response(response.body, {
+      status: response.status,
+      headers: { ...CORS_HEADERS, 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache' },
+    });
+  }
+
   const data = await response.json();
 
   await logActivity(env, {
@@ -772,6 +789,134 @@ async function handleSaveDump(request, env) {
   return jsonResponse({ success: true, count: items.length, updated: data.updated });
 }
 
+// ═══════════════════════════════════════════════════════════════════════════════
+// DUMP LEASES - Meerdere analyzers: claim → renew → complete/release (D1 is bron van waarheid)
+// ═══════════════════════════════════════════════════════════════════════════════
+const LEASE_TTL_DEFAULT = 300;   // seconden
+const LEASE_TTL_MAX = 1800;
+const STREAMING_MARKER = 'MM4-streaming';
+
+function leaseTtl(body) {
+  return Math.min(Math.max(parseInt(body.ttl, 10) || LEASE_TTL_DEFAULT, 30), LEASE_TTL_MAX);
+}
+
+function dumpRowToItem(r) {
+  return {
+    ...r, analyzed: !!r.analyzed, pinned: !!r.pinned,
+    extraAnalyses: r.extra_analyses ? JSON.parse(r.extra_analyses) : undefined,
+    routedTo: r.routed_to ? JSON.parse(r.routed_to) : undefined,
+  };
+}
+
+// Houd de KV blob (fallback voor GET) in sync met wat via leases in D1 is geschreven
+async function patchKvDumpItems(env, updates) {
+  if (!env.LOGS || updates.length === 0) return;
+  const value = await env.LOGS.get(DUMP_KEY);
+  if (!value) return;
+  const data = JSON.parse(value);
+  const byId = new Map(updates.map(u => [u.id, u]));
+  data.items = (data.items || []).map(i => byId.has(i.id) ? { ...i, ...byId.get(i.id) } : i);
+  data.updated = new Date().toISOString();
+  await env.LOGS.put(DUMP_KEY, JSON.stringify(data));
+}
+
+async function handleClaimDump(request, env) {
+  if (!env.DB) return jsonResponse({ error: 'D1 not configured' }, 501);
+  const body = await request.json();
+  const owner = (body.worker || 'unknown').slice(0, 100);
+  const limit = Math.min(Math.max(parseInt(body.limit, 10) || 10, 1), 100);
+  const now = Math.floor(Date.now() / 1000);
+  const expires = now + leaseTtl(body);
+  const token = crypto.randomUUID();
+
+  // Kandidaten: zonder analyse (of blijven hangen tijdens streamen) en zonder geldige lease
+  const candidates = await env.DB.prepare(`
+    SELECT id FROM dump_items
+    WHERE (analysis IS NULL OR analysis = '' OR analyzed_by = ?)
+      AND id NOT IN (SELECT item_id FROM dump_leases WHERE expires > ?)
+    ORDER BY created ASC LIMIT ?
+  `).bind(STREAMING_MARKER, now, limit).all();
+
+  // Per item atomair claimen: alleen als er geen lease is of de bestaande verlopen is
+  const claimed = [];
+  for (const { id } of candidates.results || []) {
+    const res = await env.DB.prepare(`
+      INSERT INTO dump_leases (item_id, token, owner, expires) VALUES (?, ?, ?, ?)
+      ON CONFLICT(item_id) DO UPDATE SET token = excluded.token, owner = excluded.owner, expires = excluded.expires
+      WHERE dump_leases.expires <= ?
+    `).bind(id, token, owner, expires, now).run();
+    if (res.meta && res.meta.changes > 0) claimed.push(id);
+  }
+
+  let items = [];
+  if (claimed.length > 0) {
+    const placeholders = claimed.map(() => '?').join(',');
+    const rows = await env.DB.prepare(`SELECT * FROM dump_items WHERE id IN (${placeholders}) ORDER BY created ASC`).bind(...claimed).all();
+    items = (rows.results || []).map(dumpRowToItem);
+  }
+  return jsonResponse({ token, owner, expires, items });
+}
+
+async function handleRenewDump(request, env) {
+  if (!env.DB) return jsonResponse({ error: 'D1 not configured' }, 501);
+  const body = await request.json();
+  const now = Math.floor(Date.now() / 1000);
+  const expires = now + leaseTtl(body);
+  const ids = body.ids || [];
+  const renewed = [];
+  for (const id of ids) {
+    const res = await env.DB.prepare('UPDATE dump_leases SET expires = ? WHERE item_id = ? AND token = ? AND expires > ?')
+      .bind(expires, id, body.token, now).run();
+    if (res.meta && res.meta.changes > 0) renewed.push(id);
+  }
+
+  // Optioneel: deelanalyse (streaming) meeschrijven, alleen onder een geldige lease
+  const partial = body.partial || {};
+  const updates = [];
+  for (const id of renewed) {
+    if (partial[id] === undefined) continue;
+    await env.DB.prepare(`UPDATE dump_items SET analysis = ?, analyzed = 0, analyzed_by = ?, updated_at = datetime('now') WHERE id = ?`)
+      .bind(partial[id], STREAMING_MARKER, id).run();
+    updates.push({ id, analysis: partial[id], analyzed: false, analyzed_by: STREAMING_MARKER, analyzing: true });
+  }
+  await patchKvDumpItems(env, updates);
+  return jsonResponse({ renewed, lost: ids.filter(id => !renewed.includes(id)), expires });
+}
+
+async function handleCompleteDump(request, env) {
+  if (!env.DB) return jsonResponse({ error: 'D1 not configured' }, 501);
+  const body = await request.json();
+  const results = body.results || [];
+  const committed = [];
+  const updates = [];
+
+  // Fencing: resultaat telt alleen als de lease nog van deze token is → exactly-once
+  for (const r of results) {
+    const [write] = await env.DB.batch([
+      env.DB.prepare(`
+        UPDATE dump_items SET analysis = ?, analyzed = 1, analyzed_by = ?, analyzed_at = ?, updated_at = datetime('now')
+        WHERE id = ? AND EXISTS (SELECT 1 FROM dump_leases WHERE item_id = ? AND token = ?)
+      `).bind(r.analysis, r.analyzed_by || null, r.analyzed_at || new Date().toISOString(), r.id, r.id, body.token),
+      env.DB.prepare('DELETE FROM dump_leases WHERE item_id = ? AND token = ?').bind(r.id, body.token),
+    ]);
+    if (write.meta && write.meta.changes > 0) {
+      committed.push(r.id);
+      updates.push({ id: r.id, analysis: r.analysis, analyzed: true, analyzed_by: r.analyzed_by, analyzed_at: r.analyzed_at, analyzing: false });
+    }
+  }
+
+  // Items zonder resultaat teruggeven aan de pool
+  for (const id of body.release || []) {
+    await env.DB.prepare('DELETE FROM dump_leases WHERE item_id = ? AND token = ?').bind(id, body.token).run();
+  }
+
+  await patchKvDumpItems(env, updates);
+  for (const id of committed) {
+    await queueVectorize(env, 'dump', id);
+  }
+  return jsonResponse({ committed, rejected: results.map(r => r.id).filter(id => !committed.includes(id)) });
+}
+
 // ═══════════════════════════════════════════════════════════════════════════════
 // TOOLS PER MACHINE
 // ═══════════════════════════════════════════════════════════════════════════════
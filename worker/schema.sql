@@ -43,6 +43,15 @@ CREATE INDEX IF NOT EXISTS idx_dump_type ON dump_items(type);
 CREATE INDEX IF NOT EXISTS idx_dump_analyzed ON dump_items(analyzed);
 CREATE INDEX IF NOT EXISTS idx_dump_created ON dump_items(created DESC);
 
+-- Dump leases: één analyzer per item tegelijk (claim → renew → complete)
+CREATE TABLE IF NOT EXISTS dump_leases (
+  item_id INTEGER PRIMARY KEY,
+  token TEXT NOT NULL,
+  owner TEXT,
+  expires INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dump_leases_expires ON dump_leases(expires);
+
 -- Snapshots (was: KV SNAPSHOTS)
 CREATE TABLE IF NOT EXISTS snapshots (
   id TEXT PRIMARY KEY,